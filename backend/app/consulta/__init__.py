@@ -0,0 +1,4 @@
+from .dataset import DatasetEnxuto
+from .indices import IndiceDataset, indexar_codigos
+
+__all__ = ['DatasetEnxuto', 'IndiceDataset', 'indexar_codigos']
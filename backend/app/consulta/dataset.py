@@ -0,0 +1,138 @@
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Colunas numéricas guardadas como categóricas no modo enxuto (além das de texto)
+COLUNAS_CATEGORICAS = ('Cluster',)
+
+
+def _arquivo_mapeavel(caminho_parquet: Path, versao: str, diretorio: Path) -> Path:
+    """
+    Cópia Arrow IPC (sem compressão) do parquet, gerada uma vez por versão do dataset.
+    Diferente do parquet, ela pode ser mapeada em memória sem decodificar: os workers
+    do uvicorn passam a compartilhar as mesmas páginas do arquivo.
+    """
+    destino = diretorio / f"{caminho_parquet.stem}-{versao}.arrow"
+    if destino.exists():
+        return destino
+
+    diretorio.mkdir(parents=True, exist_ok=True)
+    tabela = pq.read_table(caminho_parquet)
+    temporario = destino.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with pa.OSFile(str(temporario), "wb") as arquivo, pa.ipc.new_file(arquivo, tabela.schema) as writer:
+            writer.write_table(tabela)
+        os.replace(temporario, destino)
+    finally:
+        temporario.unlink(missing_ok=True)
+    return destino
+
+
+def _enxugar(serie: pd.Series, categorica: bool) -> pd.Series:
+    """
+    Menor representação da coluna sem perda de informação:
+    - float64 -> float32 se todos os valores voltam idênticos para float64
+    - inteiros -> o menor tipo inteiro que comporta o intervalo
+    - texto (e as COLUNAS_CATEGORICAS) -> category; colunas de texto quase todas
+      distintas (ex.: Código de Acesso) ficam como estão, já que não economizariam nada
+    """
+    if categorica:
+        return serie.astype('category')
+    if pd.api.types.is_string_dtype(serie):
+        if serie.nunique(dropna=True) <= len(serie) // 2:
+            return serie.astype('category')
+        return serie
+    if serie.dtype.kind == 'f' and serie.dtype.itemsize > 4:
+        reduzida = serie.astype('float32')
+        if np.array_equal(reduzida.to_numpy(dtype='float64'), serie.to_numpy(), equal_nan=True):
+            return reduzida
+        return serie
+    if serie.dtype.kind in 'iu':
+        return pd.to_numeric(serie, downcast='integer' if serie.dtype.kind == 'i' else 'unsigned')
+    return serie
+
+
+class DatasetEnxuto:
+    """
+    Dataset de análise mapeado em memória (Arrow IPC via pyarrow), com as colunas
+    convertidas para pandas só no primeiro acesso (`dataset[coluna]`).
+
+    No modo enxuto cada coluna materializada passa por `_enxugar` (float32, inteiros
+    pequenos e categóricas, sempre sem perda). Fora dele, todas as colunas são
+    materializadas no carregamento com os mesmos dtypes de `pd.read_parquet`.
+
+    A tabela Arrow mapeada (`tabela`) continua disponível com o schema original do
+    parquet, para exportações que não precisam passar pelo pandas.
+    """
+
+    def __init__(self, caminho_parquet: str | Path, versao: str, enxuto: bool = True,
+                 diretorio_mapa: str | Path | None = None):
+        diretorio = Path(diretorio_mapa) if diretorio_mapa else Path(tempfile.gettempdir()) / "api_jogadores"
+        self.arquivo_mapeado = _arquivo_mapeavel(Path(caminho_parquet), versao, diretorio)
+        self.tabela = pa.ipc.open_file(pa.memory_map(str(self.arquivo_mapeado))).read_all()
+        self.columns = pd.Index(self.tabela.column_names)
+        self.enxuto = enxuto
+        self._series = {}
+        self._bytes_sem_conversao = {}
+        self._trava = threading.Lock()
+
+        if not enxuto:
+            for coluna in self.columns:
+                self[coluna]
+
+    def __len__(self) -> int:
+        return self.tabela.num_rows
+
+    def __getitem__(self, coluna: str) -> pd.Series:
+        serie = self._series.get(coluna)
+        if serie is not None:
+            return serie
+        if coluna not in self.columns:
+            raise KeyError(coluna)
+
+        with self._trava:
+            serie = self._series.get(coluna)
+            if serie is None:
+                serie = self.tabela.select([coluna]).to_pandas()[coluna]
+                self._bytes_sem_conversao[coluna] = int(serie.memory_usage(index=False, deep=True))
+                if self.enxuto:
+                    serie = _enxugar(serie, coluna in COLUNAS_CATEGORICAS)
+                self._series[coluna] = serie
+        return serie
+
+    def linhas(self, posicoes=slice(None), colunas: list | None = None) -> pd.DataFrame:
+        """DataFrame com as linhas (slice ou posições) e colunas pedidas (padrão: todas)."""
+        colunas = self.columns.tolist() if colunas is None else colunas
+        return pd.DataFrame({coluna: self[coluna].iloc[posicoes] for coluna in colunas})
+
+    def memoria(self) -> dict:
+        """Bytes mapeados (compartilhados) e materializados (privados do worker) por coluna."""
+        por_coluna = []
+        for coluna in self.columns:
+            serie = self._series.get(coluna)
+            por_coluna.append({
+                "coluna": coluna,
+                "tipo_arquivo": str(self.tabela.schema.field(coluna).type),
+                "bytes_mapeados": self.tabela.column(coluna).nbytes,
+                "materializada": serie is not None,
+                "dtype": str(serie.dtype) if serie is not None else None,
+                "bytes": int(serie.memory_usage(index=False, deep=True)) if serie is not None else 0,
+                "bytes_sem_conversao": self._bytes_sem_conversao.get(coluna),
+            })
+        return {
+            "modo": "enxuto" if self.enxuto else "completo",
+            "linhas": len(self),
+            "colunas": len(self.columns),
+            "colunas_materializadas": len(self._series),
+            "arquivo_mapeado": str(self.arquivo_mapeado),
+            "bytes_mapeados": self.tabela.nbytes,
+            "bytes_materializados": sum(c["bytes"] for c in por_coluna),
+            "bytes_sem_conversao": sum(c["bytes_sem_conversao"] or 0 for c in por_coluna),
+            "por_coluna": por_coluna,
+        }
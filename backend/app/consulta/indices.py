@@ -0,0 +1,257 @@
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Colunas com até esta quantidade de valores distintos ganham bitmaps por valor
+LIMITE_CATEGORIAS = 64
+
+# Linhas do índice ordenado examinadas por vez na busca dos primeiros resultados
+BLOCO_ORDENACAO = 65536
+
+
+def indexar_codigos(codigos: pd.Series) -> dict:
+    """
+    Índice hash Código de Acesso -> posição da linha, para buscar um jogador em O(1).
+    Códigos ausentes ficam de fora; se um código se repete, vale a última linha.
+    """
+    validos = codigos.notna().to_numpy()
+    posicoes = np.flatnonzero(validos).tolist()
+    return dict(zip(codigos[validos].astype(str).tolist(), posicoes))
+
+
+class _IndiceOrdenado:
+    """
+    Permutação que ordena uma coluna (valores ausentes no fim). Colunas numéricas e de
+    data são consultadas com `searchsorted(sorter=...)` direto sobre os valores da
+    coluna, sem guardar uma cópia ordenada; colunas de texto guardam os valores
+    válidos já ordenados.
+    """
+
+    def __init__(self, serie: pd.Series):
+        self.tipo = serie.dtype.kind
+        ausentes = serie.isna().to_numpy()
+        validos = np.flatnonzero(~ausentes)
+        self.n_validos = len(validos)
+        tipo_posicao = np.int32 if len(serie) < 2**31 else np.int64
+
+        if self.tipo in 'fiumM':
+            self.valores = serie.to_numpy()
+            # NaN/NaT já vão para o fim na ordenação do numpy
+            self.ordem = np.argsort(self.valores, kind='stable').astype(tipo_posicao)
+            self.ordenados = None
+        else:
+            texto = serie.to_numpy(dtype=object)[validos].astype(str)
+            ordem_validos = np.argsort(texto, kind='stable')
+            self.ordenados = texto[ordem_validos]
+            self.ordem = np.concatenate([validos[ordem_validos], np.flatnonzero(ausentes)]).astype(tipo_posicao)
+            self.valores = None
+
+    def _converter(self, valor):
+        if self.tipo in 'mM':
+            return np.datetime64(pd.Timestamp(valor))
+        if self.tipo in 'fiu':
+            if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                raise ValueError(f"valor numérico esperado, recebido {valor!r}")
+            return valor
+        return str(valor)
+
+    def _buscar(self, valor, lado: str) -> int:
+        if self.ordenados is not None:
+            return int(np.searchsorted(self.ordenados, valor, side=lado))
+        if self.tipo in 'fiu':
+            valor = self._no_tipo(valor, lado)
+            if valor is None:
+                return 0
+            if valor is np.inf:
+                return self.n_validos
+        return int(min(np.searchsorted(self.valores, valor, side=lado, sorter=self.ordem), self.n_validos))
+
+    def _no_tipo(self, valor, lado: str):
+        """
+        Valor da consulta no dtype da coluna (float32 e inteiros pequenos no modo enxuto),
+        arredondado para o lado que mantém a comparação com o valor exato: teto para o
+        limite inferior ('left'), piso para o superior ('right'). Fora do intervalo do
+        tipo inteiro, devolve None (antes de tudo) ou np.inf (depois de tudo).
+        """
+        tipo = self.valores.dtype
+        if tipo.kind == 'f':
+            with np.errstate(over='ignore'):
+                convertido = tipo.type(valor)
+            # Comparação em float64: um float do Python contra np.float32 seria feita em float32
+            if lado == 'left' and float(convertido) < valor:
+                convertido = np.nextafter(convertido, tipo.type(np.inf))
+            elif lado == 'right' and float(convertido) > valor:
+                convertido = np.nextafter(convertido, tipo.type(-np.inf))
+            return convertido
+
+        if math.isnan(valor):
+            return np.inf
+        if math.isinf(valor):
+            return np.inf if valor > 0 else None
+        limite = math.ceil(valor) if lado == 'left' else math.floor(valor)
+        info = np.iinfo(tipo)
+        if limite > info.max:
+            return np.inf
+        if limite < info.min:
+            return None
+        return tipo.type(limite)
+
+    def intervalo(self, minimo=None, maximo=None) -> np.ndarray:
+        """Posições (linhas) com minimo <= valor <= maximo; ausentes nunca entram."""
+        inicio = 0 if minimo is None else self._buscar(self._converter(minimo), 'left')
+        fim = self.n_validos if maximo is None else self._buscar(self._converter(maximo), 'right')
+        return self.ordem[inicio:max(inicio, fim)]
+
+
+class IndiceDataset:
+    """
+    Índices de consulta sobre o DataFrame de análise, montados uma única vez no
+    carregamento, para filtrar, ordenar e paginar sem varrer o DataFrame:
+
+    - Índice ordenado por coluna (numérica, data ou texto): filtros de intervalo e de
+      igualdade viram duas buscas binárias, e a ordenação/top-k só percorre a
+      permutação pronta até completar a página.
+    - Bitmaps por valor nas colunas categóricas (até LIMITE_CATEGORIAS valores
+      distintos, ex.: Cluster): filtros de igualdade/pertinência são OR/AND de bits.
+
+    Os filtros se combinam como bitmaps compactados (1 bit por linha). Na ordenação,
+    empates seguem a ordem das linhas (invertida na ordem decrescente).
+
+    Com `preguicoso=True` o índice de cada coluna só é montado na primeira consulta
+    que a usa (para não materializar todas as colunas de um `DatasetEnxuto`).
+    """
+
+    def __init__(self, df, limite_categorias: int = LIMITE_CATEGORIAS, preguicoso: bool = False):
+        self.total_linhas = len(df)
+        self.limite_categorias = limite_categorias
+        self.ordenados = {}
+        self.bitmaps = {}
+        self._df = df
+        self._sem_indice = set()
+        self._trava = threading.Lock()
+
+        if not preguicoso:
+            for col in df.columns:
+                self._indexar(col)
+
+    def _indexar(self, col: str):
+        serie = self._df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            # Índice ordenado sobre os valores (numéricos ou texto), não sobre os códigos
+            serie_valores = pd.Series(np.asarray(serie))
+        else:
+            serie_valores = serie
+        if serie_valores.dtype.kind == 'b' or serie_valores.dtype == object and not pd.api.types.is_string_dtype(serie_valores):
+            self._sem_indice.add(col)
+            return
+        self.ordenados[col] = _IndiceOrdenado(serie_valores)
+
+        if serie_valores.dtype.kind not in 'fmM' and serie.nunique(dropna=True) <= self.limite_categorias:
+            codigos, categorias = pd.factorize(serie)
+            self.bitmaps[col] = {
+                categoria: np.packbits(codigos == i)
+                for i, categoria in enumerate(categorias.tolist())
+            }
+
+    def _ordenado(self, campo: str) -> _IndiceOrdenado | None:
+        """Índice ordenado da coluna (montado agora, se ainda não existir) ou None se não indexável."""
+        indice = self.ordenados.get(campo)
+        if indice is None and campo not in self._sem_indice and campo in self._df.columns:
+            with self._trava:
+                if campo not in self.ordenados and campo not in self._sem_indice:
+                    self._indexar(campo)
+            indice = self.ordenados.get(campo)
+        return indice
+
+    def memoria(self) -> int:
+        """Bytes das permutações, valores de texto ordenados e bitmaps montados."""
+        total = 0
+        for indice in self.ordenados.values():
+            total += indice.ordem.nbytes
+            if indice.ordenados is not None:
+                total += int(pd.Series(indice.ordenados).memory_usage(index=False, deep=True))
+        for bitmaps in self.bitmaps.values():
+            total += sum(bits.nbytes for bits in bitmaps.values())
+        return total
+
+    def _bits_de_posicoes(self, posicoes: np.ndarray) -> np.ndarray:
+        mascara = np.zeros(self.total_linhas, dtype=bool)
+        mascara[posicoes] = True
+        return np.packbits(mascara)
+
+    def _bits_vazios(self) -> np.ndarray:
+        return np.zeros((self.total_linhas + 7) // 8, dtype=np.uint8)
+
+    def _bits_filtro(self, filtro: dict) -> np.ndarray:
+        campo = filtro["campo"]
+        if self._ordenado(campo) is None:
+            raise ValueError(f"Campo '{campo}' não existe ou não é indexado para consulta.")
+
+        if filtro.get("em") is not None or filtro.get("igual") is not None:
+            valores = filtro["em"] if filtro.get("em") is not None else [filtro["igual"]]
+            bits = self._bits_vazios()
+            for valor in valores:
+                if campo in self.bitmaps:
+                    try:
+                        bits |= self.bitmaps[campo].get(valor, 0)
+                    except TypeError:
+                        raise ValueError(f"Filtro inválido para '{campo}': valor {valor!r} não pode ser comparado")
+                else:
+                    bits |= self._bits_de_posicoes(self._intervalo(campo, valor, valor))
+            return bits
+
+        return self._bits_de_posicoes(self._intervalo(campo, filtro.get("min"), filtro.get("max")))
+
+    def _intervalo(self, campo: str, minimo, maximo) -> np.ndarray:
+        try:
+            return self.ordenados[campo].intervalo(minimo, maximo)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Filtro inválido para '{campo}': {e}")
+
+    def consultar(self, filtros: list, ordenar_por: str | None = None, decrescente: bool = False,
+                  deslocamento: int = 0, limite: int = 50) -> tuple[np.ndarray, int]:
+        """
+        Avalia os filtros (todos precisam valer) e devolve (posições da página, total
+        de linhas que passaram nos filtros). Cada filtro é um dict com `campo` e
+        `min`/`max`, `igual` ou `em`. Lança ValueError para campos ou valores inválidos.
+        """
+        bits = None
+        for filtro in filtros:
+            bits_filtro = self._bits_filtro(filtro)
+            bits = bits_filtro if bits is None else bits & bits_filtro
+
+        if bits is None:
+            mascara, total = None, self.total_linhas
+        else:
+            mascara = np.unpackbits(bits, count=self.total_linhas).view(bool)
+            total = int(np.bitwise_count(bits).sum())
+
+        if ordenar_por is None:
+            posicoes = np.arange(self.total_linhas) if mascara is None else np.flatnonzero(mascara)
+            return posicoes[deslocamento:deslocamento + limite], total
+
+        indice = self._ordenado(ordenar_por)
+        if indice is None:
+            raise ValueError(f"Campo '{ordenar_por}' não existe ou não é indexado para ordenação.")
+        validos, ausentes = indice.ordem[:indice.n_validos], indice.ordem[indice.n_validos:]
+        # Ausentes ficam no fim nas duas direções; a inversão é só uma view
+        segmentos = [validos[::-1] if decrescente else validos, ausentes]
+
+        # Top-k: percorre a permutação em blocos e para assim que a página está completa
+        necessarios = deslocamento + limite
+        encontrados, quantidade = [], 0
+        for segmento in segmentos:
+            for inicio in range(0, len(segmento), BLOCO_ORDENACAO):
+                bloco = segmento[inicio:inicio + BLOCO_ORDENACAO]
+                if mascara is not None:
+                    bloco = bloco[mascara[bloco]]
+                encontrados.append(bloco)
+                quantidade += len(bloco)
+                if quantidade >= necessarios:
+                    break
+            if quantidade >= necessarios:
+                break
+        posicoes = np.concatenate(encontrados) if encontrados else indice.ordem[:0]
+        return posicoes[deslocamento:necessarios], total
@@ -0,0 +1,437 @@
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _estimar_bytes(valor) -> int:
+    """Tamanho aproximado em memória de um resultado (DataFrames, arrays, listas, dicts)."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(index=True, deep=True))
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(_estimar_bytes(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(_estimar_bytes(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheResultados:
+    """
+    Cache endereçado por conteúdo dos uploads já processados e pontuados.
+
+    A chave é o hash SHA-256 dos bytes enviados, prefixado pela versão dos modelos
+    carregados (e por qualquer parâmetro que mude o resultado, como a extensão do
+    arquivo). Reenviar a mesma planilha — o dashboard manda o mesmo arquivo para o
+    JSON e para a exportação — pula leitura, pré-processamento e previsão.
+
+    - Memória: LRU limitado por `max_bytes` (estimativa do tamanho dos DataFrames).
+    - Disco (opcional): se `diretorio` for informado, cada entrada também é gravada
+      em pickle e sobrevive a reinícios; o disco é limitado por `max_bytes_disco`,
+      descartando os arquivos usados há mais tempo.
+    - Ao recarregar modelos com outra versão, as entradas antigas são descartadas.
+    """
+
+    def __init__(self, max_bytes: int, diretorio: str | Path | None = None, max_bytes_disco: int = 0):
+        self.max_bytes = max(0, max_bytes)
+        self.diretorio = Path(diretorio) if diretorio else None
+        self.max_bytes_disco = max(0, max_bytes_disco)
+        self.versao = ""
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._trava = threading.Lock()
+        self._contadores = {"acertos_memoria": 0, "acertos_disco": 0, "faltas": 0, "insercoes": 0, "descartes": 0}
+
+        if self.diretorio is not None:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def ativo(self) -> bool:
+        return self.max_bytes > 0 or self.diretorio is not None
+
+    def chave(self, contents: bytes, *partes, versao: str | None = None) -> str:
+        """
+        Chave do upload: versão dos modelos + parâmetros + SHA-256 do conteúdo.
+        `versao` é a versão dos modelos que vai pontuar o upload (padrão: a atual).
+        """
+        digest = hashlib.sha256()
+        for parte in partes:
+            digest.update(repr(parte).encode('utf-8') + b"\0")
+        digest.update(contents)
+        return f"{self.versao if versao is None else versao}-{digest.hexdigest()}"
+
+    def _arquivo(self, chave: str) -> Path:
+        return self.diretorio / f"{chave}.pkl"
+
+    def obter(self, chave: str):
+        """Resultado guardado para a chave (memória, depois disco) ou None."""
+        with self._trava:
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+                self._contadores["acertos_memoria"] += 1
+                return self._entradas[chave][0]
+
+        if self.diretorio is not None and chave.startswith(f"{self.versao}-"):
+            arquivo = self._arquivo(chave)
+            try:
+                with open(arquivo, "rb") as f:
+                    valor = pickle.load(f)
+                os.utime(arquivo)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"⚠️ Entrada de cache corrompida descartada ({arquivo.name}): {e}")
+                arquivo.unlink(missing_ok=True)
+            else:
+                with self._trava:
+                    self._contadores["acertos_disco"] += 1
+                self._guardar_memoria(chave, valor)
+                return valor
+
+        with self._trava:
+            self._contadores["faltas"] += 1
+        return None
+
+    def guardar(self, chave: str, valor):
+        """Guarda o resultado na memória e, se houver diretório configurado, no disco."""
+        if not chave.startswith(f"{self.versao}-"):
+            # Os modelos foram recarregados enquanto o upload era processado
+            return
+        with self._trava:
+            self._contadores["insercoes"] += 1
+        self._guardar_memoria(chave, valor)
+        if self.diretorio is not None:
+            self._guardar_disco(chave, valor)
+
+    def _guardar_memoria(self, chave: str, valor):
+        tamanho = _estimar_bytes(valor)
+        if tamanho > self.max_bytes:
+            return
+        with self._trava:
+            if chave in self._entradas:
+                self._bytes -= self._entradas.pop(chave)[1]
+            self._entradas[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            while self._bytes > self.max_bytes:
+                _, (_, tamanho_descartado) = self._entradas.popitem(last=False)
+                self._bytes -= tamanho_descartado
+                self._contadores["descartes"] += 1
+
+    def _guardar_disco(self, chave: str, valor):
+        arquivo = self._arquivo(chave)
+        temporario = arquivo.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with open(temporario, "wb") as f:
+                pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporario, arquivo)
+        except Exception as e:
+            temporario.unlink(missing_ok=True)
+            logger.warning(f"⚠️ Falha ao gravar entrada de cache em disco: {e}")
+            return
+
+        if self.max_bytes_disco:
+            try:
+                arquivos = sorted(
+                    ((p, p.stat()) for p in self.diretorio.glob("*.pkl")),
+                    key=lambda item: item[1].st_mtime
+                )
+            except FileNotFoundError:
+                # Outro worker removeu um arquivo durante a varredura; fica para a próxima gravação
+                return
+            total = sum(info.st_size for _, info in arquivos)
+            for antigo, info in arquivos:
+                if total <= self.max_bytes_disco:
+                    break
+                total -= info.st_size
+                antigo.unlink(missing_ok=True)
+
+    def definir_versao(self, versao: str):
+        """
+        Troca a versão dos modelos usada nas chaves. Entradas de outras versões são
+        descartadas da memória e do disco; com a mesma versão (ex.: reinício da API
+        com os mesmos modelos) o disco é preservado.
+        """
+        with self._trava:
+            if versao != self.versao:
+                self._entradas.clear()
+                self._bytes = 0
+            self.versao = versao
+
+        if self.diretorio is not None:
+            for arquivo in self.diretorio.glob("*.pkl"):
+                if not arquivo.name.startswith(f"{versao}-"):
+                    arquivo.unlink(missing_ok=True)
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            consultas = self._contadores["acertos_memoria"] + self._contadores["acertos_disco"] + self._contadores["faltas"]
+            acertos = self._contadores["acertos_memoria"] + self._contadores["acertos_disco"]
+            estado = {
+                "versao_modelos": self.versao,
+                "entradas_memoria": len(self._entradas),
+                "bytes_memoria": self._bytes,
+                "max_bytes_memoria": self.max_bytes,
+                **self._contadores,
+                "taxa_acerto": round(acertos / consultas, 4) if consultas else None,
+            }
+        if self.diretorio is not None:
+            arquivos = list(self.diretorio.glob("*.pkl"))
+            estado["diretorio"] = str(self.diretorio)
+            estado["entradas_disco"] = len(arquivos)
+            estado["bytes_disco"] = sum(p.stat().st_size for p in arquivos)
+            estado["max_bytes_disco"] = self.max_bytes_disco
+        return estado
+
+
+class CacheJogadores:
+    """
+    Vetores de features já processados por Código de Acesso, para POST /prever
+    pontuar um jogador conhecido só pelo código, sem refazer a engenharia de features.
+
+    Cada vetor segue a ordem do vetor-união do plano de inferência da versão dos
+    modelos publicada (`definir_versao`), então as entradas são descartadas sempre
+    que outra versão é publicada, e leituras/gravações de outra versão são ignoradas. O cache
+    recebe os jogadores pontuados com sucesso em cada upload (o upload mais recente
+    prevalece) e os do dataset de análise à medida que são consultados. LRU limitado
+    a `max_jogadores` entradas.
+    """
+
+    def __init__(self, max_jogadores: int):
+        self.max_jogadores = max(0, max_jogadores)
+        self.versao = None
+        self.features = []
+        self._entradas = OrderedDict()
+        self._trava = threading.Lock()
+        self._contadores = {"acertos": 0, "faltas": 0, "insercoes": 0, "descartes": 0}
+
+    def definir_versao(self, versao: str, features: list):
+        """Troca a versão dos modelos e o layout dos vetores (features na ordem do plano) e esvazia o cache."""
+        with self._trava:
+            self.versao = versao
+            self.features = list(features)
+            self._entradas.clear()
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+
+    def obter(self, codigo: str, versao: str) -> np.ndarray | None:
+        with self._trava:
+            x = self._entradas.get(codigo) if versao == self.versao else None
+            if x is None:
+                self._contadores["faltas"] += 1
+                return None
+            self._entradas.move_to_end(codigo)
+            self._contadores["acertos"] += 1
+            return x
+
+    def guardar(self, codigo: str, x: np.ndarray, versao: str):
+        """Guarda o vetor do jogador; ignorado se foi montado para outra versão dos modelos."""
+        with self._trava:
+            if versao != self.versao:
+                return
+            self._guardar(codigo, x)
+
+    def _guardar(self, codigo: str, x: np.ndarray):
+        if not self.max_jogadores:
+            return
+        self._entradas[codigo] = x
+        self._entradas.move_to_end(codigo)
+        self._contadores["insercoes"] += 1
+        while len(self._entradas) > self.max_jogadores:
+            self._entradas.popitem(last=False)
+            self._contadores["descartes"] += 1
+
+    def atualizar(self, df_processado: pd.DataFrame, validos: np.ndarray, versao: str) -> int:
+        """
+        Guarda o vetor de cada jogador pontuado com sucesso no upload (`validos`) pela
+        versão `versao` dos modelos, montado de uma vez a partir das colunas do
+        DataFrame processado. Retorna quantos jogadores foram guardados.
+        """
+        with self._trava:
+            features = self.features if versao == self.versao else None
+        if (not self.max_jogadores or not features or 'Código de Acesso' not in df_processado.columns
+                or any(f not in df_processado.columns for f in features)):
+            return 0
+
+        codigos = df_processado['Código de Acesso']
+        linhas = np.flatnonzero(np.asarray(validos, dtype=bool) & codigos.notna().to_numpy())
+        # Só as últimas `max_jogadores` linhas caberiam no cache de qualquer forma
+        linhas = linhas[-self.max_jogadores:]
+        if not len(linhas):
+            return 0
+        matriz = (
+            df_processado[features].iloc[linhas]
+            .apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64')
+        )
+        with self._trava:
+            if versao != self.versao:
+                # Os modelos foram recarregados enquanto o upload era processado
+                return 0
+            for codigo, x in zip(codigos.iloc[linhas].astype(str).tolist(), matriz):
+                self._guardar(codigo, x)
+        return len(linhas)
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            consultas = self._contadores["acertos"] + self._contadores["faltas"]
+            return {
+                "versao_modelos": self.versao,
+                "jogadores": len(self._entradas),
+                "max_jogadores": self.max_jogadores,
+                "total_features": len(self.features),
+                **self._contadores,
+                "taxa_acerto": round(self._contadores["acertos"] / consultas, 4) if consultas else None,
+            }
+
+
+class CachePrevisoes:
+    """
+    Memoização das previsões de POST /prever: jogadores reenviados com os mesmos
+    valores (dashboards e integrações repetem o mesmo payload) são respondidos sem
+    refazer a engenharia de features nem os três predicts.
+
+    A chave é um hash canônico só dos campos que determinam as features consumidas
+    pelos modelos (`campos`, definido a cada versão publicada): campos irrelevantes,
+    a ordem das chaves e 1 vs 1.0 não mudam a chave. Registros com valores não
+    numéricos não são memoizados (seguem o caminho normal, que devolve o erro).
+    Jogadores pontuados pelo `codigo_acesso` usam o hash do próprio vetor de features.
+
+    LRU limitado a `max_entradas`, com expiração de `ttl_s` segundos (0 = sem
+    expiração). As entradas são descartadas sempre que outra versão dos modelos é
+    publicada, e leituras/gravações de outra versão são ignoradas.
+    """
+
+    def __init__(self, max_entradas: int, ttl_s: float = 0):
+        self.max_entradas = max(0, max_entradas)
+        self.ttl_s = max(0.0, ttl_s)
+        self.versao = None
+        self.campos = ()
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._trava = threading.Lock()
+        self._contadores = {"acertos": 0, "faltas": 0, "insercoes": 0, "descartes": 0, "expiradas": 0}
+
+    @property
+    def ativo(self) -> bool:
+        return self.max_entradas > 0
+
+    def definir_versao(self, versao: str, campos: list):
+        """Troca a versão dos modelos e os campos que entram na chave, e esvazia o cache."""
+        with self._trava:
+            self.versao = versao
+            self.campos = tuple(campos)
+            self._entradas.clear()
+            self._bytes = 0
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def chave_registro(self, dados: dict, versao: str) -> str | None:
+        """
+        Chave do registro de um jogador: valores dos `campos` em float64 (None = NaN)
+        e um marcador de presença de cada campo. None se o registro não pode ser
+        memoizado (outra versão dos modelos ou valor não numérico).
+        """
+        if not self.ativo or versao != self.versao:
+            return None
+        valores = np.full(len(self.campos), np.nan)
+        presentes = np.zeros(len(self.campos), dtype=np.bool_)
+        for i, campo in enumerate(self.campos):
+            if campo not in dados:
+                continue
+            presentes[i] = True
+            valor = dados[campo]
+            if valor is None:
+                continue
+            if not isinstance(valor, (int, float, np.number)):
+                return None
+            valores[i] = valor
+        # Todo NaN com o mesmo padrão de bits
+        valores[np.isnan(valores)] = np.nan
+        digest = hashlib.blake2b(valores.tobytes() + presentes.tobytes(), digest_size=16)
+        return f"r-{digest.hexdigest()}"
+
+    def chave_vetor(self, x: np.ndarray, versao: str) -> str | None:
+        """Chave de um vetor-união já montado (jogador pontuado pelo código)."""
+        if not self.ativo or versao != self.versao:
+            return None
+        x = np.array(x, dtype='float64')
+        x[np.isnan(x)] = np.nan
+        return f"v-{hashlib.blake2b(x.tobytes(), digest_size=16).hexdigest()}"
+
+    def obter(self, chave: str | None, versao: str) -> dict | None:
+        if chave is None:
+            return None
+        with self._trava:
+            entrada = self._entradas.get(chave) if versao == self.versao else None
+            if entrada is not None and self.ttl_s and time.monotonic() > entrada[1]:
+                self._bytes -= self._entradas.pop(chave)[2]
+                self._contadores["expiradas"] += 1
+                entrada = None
+            if entrada is None:
+                self._contadores["faltas"] += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self._contadores["acertos"] += 1
+            return dict(entrada[0])
+
+    def guardar(self, chave: str | None, previsoes: dict, versao: str):
+        """Guarda as previsões; ignorado se foram calculadas por outra versão dos modelos."""
+        if chave is None:
+            return
+        tamanho = sys.getsizeof(chave) + _estimar_bytes(previsoes)
+        with self._trava:
+            if versao != self.versao:
+                return
+            if chave in self._entradas:
+                self._bytes -= self._entradas.pop(chave)[2]
+            self._entradas[chave] = (dict(previsoes), time.monotonic() + self.ttl_s, tamanho)
+            self._bytes += tamanho
+            self._contadores["insercoes"] += 1
+            while len(self._entradas) > self.max_entradas:
+                _, (_, _, tamanho_descartado) = self._entradas.popitem(last=False)
+                self._bytes -= tamanho_descartado
+                self._contadores["descartes"] += 1
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            consultas = self._contadores["acertos"] + self._contadores["faltas"]
+            return {
+                "versao_modelos": self.versao,
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl_s": self.ttl_s,
+                "bytes_memoria": self._bytes,
+                "total_campos_chave": len(self.campos),
+                **self._contadores,
+                "taxa_acerto": round(self._contadores["acertos"] / consultas, 4) if consultas else None,
+            }
+
+
+cache_resultados = CacheResultados(
+    max_bytes=settings.CACHE_RESULTADOS_MAX_MB * 1024 * 1024,
+    diretorio=settings.CACHE_RESULTADOS_DIR or None,
+    max_bytes_disco=settings.CACHE_RESULTADOS_DISCO_MAX_MB * 1024 * 1024
+)
+
+cache_jogadores = CacheJogadores(max_jogadores=settings.CACHE_JOGADORES_MAX)
+
+cache_previsoes = CachePrevisoes(max_entradas=settings.CACHE_PREVISOES_MAX, ttl_s=settings.CACHE_PREVISOES_TTL_S)
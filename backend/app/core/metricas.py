@@ -0,0 +1,175 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Medição da requisição em andamento: {"etapas": [(etapa, segundos), ...], "linhas": n},
+# criada pelo middleware de métricas. As etapas que rodam no pool de trabalho são
+# cronometradas no event loop, em volta do `await` (incluindo a espera na fila)
+medicao_da_requisicao: ContextVar[dict | None] = ContextVar("medicao_da_requisicao", default=None)
+
+
+def _rotulos(nomes: tuple, valores: tuple) -> str:
+    def escapar(valor) -> str:
+        return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return ",".join(f'{nome}="{escapar(valor)}"' for nome, valor in zip(nomes, valores))
+
+
+class _Histograma:
+    """Histograma cumulativo no formato do Prometheus (buckets `le`, _sum e _count) por combinação de rótulos."""
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple, buckets: tuple):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.buckets = buckets
+        self._series = {}
+
+    def observar(self, valores: tuple, segundos: float):
+        serie = self._series.get(valores)
+        if serie is None:
+            serie = self._series[valores] = [[0] * len(self.buckets), 0.0, 0]
+        for i, limite in enumerate(self.buckets):
+            if segundos <= limite:
+                serie[0][i] += 1
+        serie[1] += segundos
+        serie[2] += 1
+
+    def exportar(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        for valores, (contagens, soma, total) in sorted(self._series.items()):
+            rotulos = _rotulos(self.rotulos, valores)
+            for limite, contagem in zip(self.buckets, contagens):
+                linhas.append(f'{self.nome}_bucket{{{rotulos},le="{limite}"}} {contagem}')
+            linhas.append(f'{self.nome}_bucket{{{rotulos},le="+Inf"}} {total}')
+            linhas.append(f"{self.nome}_sum{{{rotulos}}} {soma}")
+            linhas.append(f"{self.nome}_count{{{rotulos}}} {total}")
+        return linhas
+
+
+class _Contador:
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._series = {}
+
+    def incrementar(self, valores: tuple, quantidade: float = 1):
+        self._series[valores] = self._series.get(valores, 0) + quantidade
+
+    def exportar(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        for valores, total in sorted(self._series.items()):
+            linhas.append(f"{self.nome}{{{_rotulos(self.rotulos, valores)}}} {total}")
+        return linhas
+
+
+class Metricas:
+    """
+    Métricas de latência e vazão da API, exportadas no formato texto do Prometheus
+    em GET /metrics.
+
+    - Por endpoint (rota, método, status): histograma de latência da requisição
+      (até o último byte da resposta, também nas respostas em streaming), total de
+      requisições e linhas (jogadores) processadas.
+    - Por etapa (leitura, cada etapa do pré-processamento, pontuação, serialização...):
+      histograma de duração e linhas processadas. As etapas da requisição também vão
+      para o cabeçalho Server-Timing.
+
+    As métricas são do processo: com vários workers do uvicorn, cada um exporta as suas.
+    """
+
+    def __init__(self, buckets: tuple = BUCKETS_LATENCIA):
+        self._trava = threading.Lock()
+        self._latencia = _Histograma(
+            "api_requisicao_duracao_segundos", "Latência das requisições por endpoint.",
+            ("rota", "metodo", "status"), buckets
+        )
+        self._requisicoes = _Contador("api_requisicoes_total", "Requisições atendidas por endpoint.",
+                                      ("rota", "metodo", "status"))
+        self._linhas = _Contador("api_linhas_processadas_total", "Linhas (jogadores) processadas por endpoint.",
+                                 ("rota",))
+        self._etapas = _Histograma("api_etapa_duracao_segundos", "Duração de cada etapa do processamento.",
+                                   ("etapa",), buckets)
+        self._linhas_etapas = _Contador("api_etapa_linhas_total", "Linhas (jogadores) processadas por etapa.",
+                                        ("etapa",))
+
+    def observar_etapa(self, etapa: str, segundos: float, linhas: int | None = None):
+        """Registra a duração (e as linhas) de uma etapa, também no Server-Timing da requisição em andamento."""
+        with self._trava:
+            self._etapas.observar((etapa,), segundos)
+            if linhas is not None:
+                self._linhas_etapas.incrementar((etapa,), linhas)
+        medicao = medicao_da_requisicao.get()
+        if medicao is not None:
+            medicao["etapas"].append((etapa, segundos))
+
+    @contextmanager
+    def etapa(self, nome: str, linhas: int | None = None):
+        """
+        Cronometra o bloco como a etapa `nome`. O dicionário entregue pode receber
+        as linhas processadas depois que elas são conhecidas (`medicao["linhas"] = n`).
+        """
+        medicao = {"linhas": linhas}
+        inicio = time.perf_counter()
+        try:
+            yield medicao
+        finally:
+            self.observar_etapa(nome, time.perf_counter() - inicio, medicao["linhas"])
+
+    def cronometrar_gerador(self, gerador, nome: str, linhas: int | None = None):
+        """
+        Repassa os itens de `gerador` (corpo de uma resposta em streaming) e registra
+        como a etapa `nome` o tempo gasto produzindo-os, sem contar a espera pelo cliente.
+        """
+        gasto = 0.0
+        try:
+            while True:
+                inicio = time.perf_counter()
+                try:
+                    item = next(gerador)
+                except StopIteration:
+                    return
+                finally:
+                    gasto += time.perf_counter() - inicio
+                yield item
+        finally:
+            self.observar_etapa(nome, gasto, linhas)
+
+    def contar_linhas(self, linhas: int):
+        """Soma linhas (jogadores) processadas à requisição em andamento."""
+        medicao = medicao_da_requisicao.get()
+        if medicao is not None:
+            medicao["linhas"] += linhas
+
+    def observar_requisicao(self, rota: str, metodo: str, status: int, segundos: float, linhas: int = 0):
+        with self._trava:
+            self._latencia.observar((rota, metodo, str(status)), segundos)
+            self._requisicoes.incrementar((rota, metodo, str(status)))
+            if linhas:
+                self._linhas.incrementar((rota,), linhas)
+
+    def exportar(self) -> str:
+        with self._trava:
+            linhas = []
+            for metrica in (self._latencia, self._requisicoes, self._linhas, self._etapas, self._linhas_etapas):
+                linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+def server_timing(etapas: list, total_s: float | None = None) -> str:
+    """Valor do cabeçalho Server-Timing: uma entrada por etapa (durações em ms; etapas repetidas somadas)."""
+    somadas = {}
+    for etapa, segundos in etapas:
+        somadas[etapa] = somadas.get(etapa, 0.0) + segundos
+    entradas = [f"{etapa};dur={segundos * 1000:.1f}" for etapa, segundos in somadas.items()]
+    if total_s is not None:
+        entradas.append(f"total;dur={total_s * 1000:.1f}")
+    return ", ".join(entradas)
+
+
+metricas = Metricas()
@@ -0,0 +1,69 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Estados que ainda impedem a API de atender
+ESTADOS_NAO_PRONTOS = {"pendente", "carregando", "erro"}
+
+
+class Prontidao:
+    """
+    Estado de carregamento de cada componente da API (modelos, dataset) e duração
+    de cada fase do cold start, para o endpoint GET /prontidao.
+
+    Estados de um componente: "pendente", "carregando", "pronto", "sob_demanda"
+    (carregado na primeira requisição que precisar dele) e "erro". A API está pronta
+    quando nenhum componente está pendente, carregando ou com erro.
+    """
+
+    def __init__(self, componentes: tuple = ()):
+        self.inicio = time.perf_counter()
+        self.pronta_em = None
+        self._componentes = {nome: {"estado": "pendente", "erro": None} for nome in componentes}
+        self._fases = {}
+        self._trava = threading.Lock()
+
+    def registrar_inicio(self, inicio: float):
+        """Marca o início do processo (antes dos imports) como origem dos tempos."""
+        self.inicio = inicio
+        self.registrar("importacao", time.perf_counter() - inicio)
+
+    def definir(self, componente: str, estado: str, erro: str | None = None):
+        with self._trava:
+            self._componentes[componente] = {"estado": estado, "erro": erro}
+            if self.pronta_em is None and self._pronta():
+                self.pronta_em = time.perf_counter() - self.inicio
+
+    def estado(self, componente: str) -> str:
+        with self._trava:
+            return self._componentes.get(componente, {}).get("estado", "pendente")
+
+    def registrar(self, fase: str, segundos: float):
+        with self._trava:
+            self._fases[fase] = segundos
+
+    @contextmanager
+    def medir(self, fase: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(fase, time.perf_counter() - inicio)
+
+    def _pronta(self) -> bool:
+        return bool(self._componentes) and all(
+            info["estado"] not in ESTADOS_NAO_PRONTOS for info in self._componentes.values()
+        )
+
+    def relatorio(self) -> dict:
+        with self._trava:
+            return {
+                "pronta": self._pronta(),
+                "componentes": {nome: dict(info) for nome, info in self._componentes.items()},
+                "fases_ms": {fase: round(segundos * 1000, 1) for fase, segundos in self._fases.items()},
+                "pronta_em_ms": round(self.pronta_em * 1000, 1) if self.pronta_em is not None else None,
+                "tempo_no_ar_s": round(time.perf_counter() - self.inicio, 1),
+            }
+
+
+prontidao = Prontidao(componentes=("dataset", "modelos"))
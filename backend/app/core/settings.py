@@ -5,6 +5,69 @@ class Settings(BaseSettings):
     API_SECRET_KEY: str = "chave-padrao-desenvolvimento"  # Valor padrão
     ENVIRONMENT: str = "development"
 
+    # Carregamento dos modelos: sob demanda (na primeira requisição que precisar deles)
+    # e aquecimento da inferência com um jogador sintético antes de declarar a API pronta
+    MODELOS_CARREGAMENTO_PREGUICOSO: bool = False
+    MODELOS_AQUECIMENTO: bool = True
+
+    # Registro de artefatos: observa app/models e app/results e publica uma nova versão dos
+    # modelos quando os arquivos mudam (intervalo da varredura em segundos)
+    REGISTRO_OBSERVAR: bool = True
+    REGISTRO_INTERVALO_S: float = 2.0
+
+    # Avaliador compilado dos ensembles de árvores (XGBoost e sklearn) para lotes de até
+    # INFERENCIA_COMPILADA_MAX_LINHAS jogadores; lotes maiores e modelos não suportados usam o predict nativo
+    INFERENCIA_COMPILADA: bool = True
+    INFERENCIA_COMPILADA_MAX_LINHAS: int = 128
+
+    # Micro-batching de POST /prever
+    MICROBATCH_ATIVO: bool = True
+    MICROBATCH_JANELA_MS: float = 2.0
+    MICROBATCH_TAMANHO_MAX: int = 64
+
+    # Pool de trabalho para as etapas pesadas (fora do event loop)
+    POOL_TIPO: str = "thread"  # "thread" ou "process"
+    POOL_WORKERS: int = 4
+    POOL_MAX_FILA: int = 16
+    POOL_TIMEOUT_LEITURA_S: float = 60.0
+    POOL_TIMEOUT_PREPROCESSAMENTO_S: float = 120.0
+    POOL_TIMEOUT_PREVISAO_S: float = 60.0
+
+    # Ingestão: ler do upload apenas as colunas de que os modelos carregados dependem
+    INGESTAO_PODAR_COLUNAS: bool = True
+
+    # Pré-processamento sem cópias entre etapas (buffer único com bloco numérico float64)
+    PREPROCESSAMENTO_MODO_PIPELINE: bool = True
+
+    # Pré-processamento: calcular só as features de engenharia que os modelos carregados consomem
+    PREPROCESSAMENTO_PODAR_FEATURES: bool = True
+
+    # Dataset de análise: mapeado em memória (cópia Arrow IPC em DATASET_DIR_MAPA, padrão: diretório
+    # temporário) e, no modo enxuto, com colunas materializadas sob demanda em dtypes menores
+    DATASET_MODO_ENXUTO: bool = True
+    DATASET_DIR_MAPA: str = ""
+
+    # Exportação em blocos (/processar/excel-para-csv-processado)
+    EXPORTACAO_LINHAS_POR_BLOCO: int = 5000
+
+    # Cache de resultados dos uploads em /processar (0 MB desativa a memória; diretório vazio desativa o disco)
+    CACHE_RESULTADOS_MAX_MB: int = 256
+    CACHE_RESULTADOS_DIR: str = ""
+    CACHE_RESULTADOS_DISCO_MAX_MB: int = 2048
+
+    # Vetores de features por Código de Acesso para POST /prever com `codigo_acesso` (0 desativa)
+    CACHE_JOGADORES_MAX: int = 100000
+
+    # Memoização das previsões de POST /prever por hash das features consumidas (0 desativa; TTL 0 = sem expiração)
+    CACHE_PREVISOES_MAX: int = 50000
+    CACHE_PREVISOES_TTL_S: float = 3600.0
+
+    # /metrics e /prontidao sem chave de API (para probes e scrapers que não enviam o cabeçalho X-API-Key)
+    ENDPOINTS_OPERACAO_PUBLICOS: bool = False
+
+    # Nível do log da aplicação (DEBUG mostra cada etapa do pré-processamento)
+    LOG_NIVEL: str = "INFO"
+
     class Config:
         env_file = ".env"
         env_file_encoding = 'utf-8'
@@ -0,0 +1,115 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from fastapi import HTTPException, status
+
+from .settings import settings
+
+# Estágios puramente Python (openpyxl, pandas linha a linha) seguram o GIL; eles vão para
+# o pool de processos quando POOL_TIPO="process". Os demais (numpy/sklearn/xgboost, que
+# liberam o GIL e dependem dos modelos carregados no processo principal) ficam em threads.
+ESTAGIOS_CPU_PURO = {"leitura", "preprocessamento"}
+
+
+class PoolDeTrabalho:
+    """
+    Executa o trabalho pesado (leitura de Excel, pré-processamento, previsão) fora do
+    event loop do uvicorn, para que um upload grande não trave as demais requisições.
+
+    - Profundidade limitada: no máximo `workers + max_fila` tarefas em andamento/na fila.
+      Acima disso a requisição é recusada com HTTP 503 (backpressure).
+    - Timeout por estágio: se o estágio não terminar a tempo, a requisição recebe HTTP 504.
+      A vaga só é liberada quando a tarefa realmente termina, para o limite continuar valendo.
+    """
+
+    def __init__(self, workers: int, max_fila: int, tipo: str = "thread", timeouts: dict | None = None):
+        self.workers = max(1, workers)
+        self.max_fila = max(0, max_fila)
+        self.tipo = tipo
+        self.timeouts = timeouts or {}
+        self._threads = None
+        self._processos = None
+        self._em_andamento = 0
+        self._trava = threading.Lock()
+        self._recusadas = 0
+        self._expiradas = 0
+
+    def _executor(self, estagio: str):
+        if self.tipo == "process" and estagio in ESTAGIOS_CPU_PURO:
+            if self._processos is None:
+                self._processos = ProcessPoolExecutor(max_workers=self.workers)
+            return self._processos
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pool-trabalho")
+        return self._threads
+
+    def _reservar(self) -> bool:
+        with self._trava:
+            if self._em_andamento >= self.workers + self.max_fila:
+                self._recusadas += 1
+                return False
+            self._em_andamento += 1
+            return True
+
+    def _liberar(self, _futuro=None):
+        with self._trava:
+            self._em_andamento -= 1
+
+    async def executar(self, estagio: str, func, *args, **kwargs):
+        """Executa `func(*args, **kwargs)` no pool, aplicando backpressure e o timeout do estágio."""
+        if not self._reservar():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servidor ocupado processando outras requisições. Tente novamente em instantes.",
+                headers={"Retry-After": "5"}
+            )
+
+        try:
+            futuro = self._executor(estagio).submit(functools.partial(func, *args, **kwargs))
+        except Exception:
+            self._liberar()
+            raise
+        futuro.add_done_callback(self._liberar)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(futuro), timeout=self.timeouts.get(estagio))
+        except asyncio.TimeoutError:
+            self._expiradas += 1
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=f"O estágio '{estagio}' excedeu o tempo limite de {self.timeouts.get(estagio)}s."
+            )
+
+    def estado(self) -> dict:
+        return {
+            "tipo": self.tipo,
+            "workers": self.workers,
+            "max_fila": self.max_fila,
+            "em_andamento": self._em_andamento,
+            "recusadas": self._recusadas,
+            "expiradas": self._expiradas
+        }
+
+    def encerrar(self):
+        for executor in (self._threads, self._processos):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._threads = None
+        self._processos = None
+
+
+pool_trabalho = PoolDeTrabalho(
+    workers=settings.POOL_WORKERS,
+    max_fila=settings.POOL_MAX_FILA,
+    tipo=settings.POOL_TIPO,
+    timeouts={
+        "leitura": settings.POOL_TIMEOUT_LEITURA_S,
+        "validacao": settings.POOL_TIMEOUT_LEITURA_S,
+        "preprocessamento": settings.POOL_TIMEOUT_PREPROCESSAMENTO_S,
+        "previsao": settings.POOL_TIMEOUT_PREVISAO_S,
+        "serializacao": settings.POOL_TIMEOUT_PREVISAO_S,
+        "cache": settings.POOL_TIMEOUT_LEITURA_S,
+    }
+)
@@ -0,0 +1,3 @@
+from .exportadores import FORMATOS, criar_exportador
+
+__all__ = ['FORMATOS', 'criar_exportador']
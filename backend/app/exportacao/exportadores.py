@@ -0,0 +1,153 @@
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+
+class _BufferDeSaida:
+    """
+    Destino de escrita para o pyarrow que acumula só os bytes produzidos desde a
+    última drenagem, mantendo a posição absoluta (necessária para o rodapé do Parquet).
+    """
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+        self.closed = False
+
+    def write(self, dados):
+        dados = bytes(dados)
+        self._partes.append(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drenar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes = []
+        return dados
+
+
+# Cada exportador recebe os blocos de linhas já pontuados em `escrever(bloco)`, que
+# devolve os bytes prontos para enviar, e `finalizar()` devolve os bytes restantes.
+
+class ExportadorCSV:
+    """CSV em blocos, no formato regional já usado pela API (separador ';' e decimal ',')."""
+    extensao = "csv"
+    media_type = "text/csv"
+
+    def __init__(self, df_modelo: pd.DataFrame):
+        self._cabecalho = True
+
+    def escrever(self, bloco: pd.DataFrame) -> bytes:
+        texto = bloco.to_csv(index=False, header=self._cabecalho, sep=';', decimal=',')
+        self._cabecalho = False
+        return texto.encode('utf-8')
+
+    def finalizar(self):
+        return iter(())
+
+
+class ExportadorParquet:
+    """Parquet com um row group por bloco; os bytes de cada row group saem assim que escritos."""
+    extensao = "parquet"
+    media_type = "application/vnd.apache.parquet"
+
+    def __init__(self, df_modelo: pd.DataFrame):
+        self._df_modelo = df_modelo
+        self._esquema = None
+        self._saida = _BufferDeSaida()
+        self._writer = None
+
+    def _inferir_esquema(self, bloco: pd.DataFrame) -> pa.Schema:
+        # O esquema precisa ser o mesmo em todos os blocos. Colunas 'object' podem estar
+        # inteiramente nulas no primeiro bloco, então o tipo delas é inferido a partir de
+        # uma amostra dos valores não nulos da coluna inteira em df_modelo (a planilha
+        # processada ou, quando ela só existe bloco a bloco, a planilha lida).
+        campos = []
+        for col in bloco.columns:
+            if bloco[col].dtype == object:
+                serie = self._df_modelo[col] if col in self._df_modelo.columns else bloco[col]
+                amostra = serie.dropna().head(1000)
+                tipo = pa.infer_type(amostra.tolist()) if len(amostra) else pa.null()
+            else:
+                tipo = pa.Schema.from_pandas(bloco[[col]].head(0), preserve_index=False).field(0).type
+            campos.append(pa.field(str(col), tipo))
+        return pa.schema(campos)
+
+    def _converter(self, bloco: pd.DataFrame) -> pa.Table:
+        try:
+            return pa.Table.from_pandas(bloco, schema=self._esquema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # O dtype de uma coluna mudou desde o primeiro bloco (ex.: inteiramente nula,
+            # ou int64 que virou float64 por causa de um NaN): a conversão é feita com os
+            # tipos do próprio bloco e ajustada ao esquema (os campos do Arrow aceitam nulos).
+            # Um valor que não cabe no esquema continua sendo um erro.
+            tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+            return tabela.select(self._esquema.names).cast(self._esquema)
+
+    def escrever(self, bloco: pd.DataFrame) -> bytes:
+        if self._writer is None:
+            self._esquema = self._inferir_esquema(bloco)
+            self._writer = pq.ParquetWriter(pa.PythonFile(self._saida, mode='w'), self._esquema)
+        self._writer.write_table(self._converter(bloco))
+        return self._saida.drenar()
+
+    def finalizar(self):
+        if self._writer is not None:
+            self._writer.close()
+        yield self._saida.drenar()
+
+
+class ExportadorXLSX:
+    """
+    XLSX em modo write-only do openpyxl: as linhas são serializadas em um arquivo
+    temporário à medida que chegam, sem manter a planilha inteira em memória.
+    O arquivo só fica completo no final (o formato é um ZIP).
+    """
+    extensao = "xlsx"
+    media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    tamanho_pedaco = 1024 * 1024
+
+    def __init__(self, df_modelo: pd.DataFrame):
+        self._workbook = Workbook(write_only=True)
+        self._planilha = self._workbook.create_sheet("Resultados")
+        self._cabecalho = True
+
+    def escrever(self, bloco: pd.DataFrame) -> bytes:
+        if self._cabecalho:
+            self._planilha.append([str(col) for col in bloco.columns])
+            self._cabecalho = False
+        bloco = bloco.astype(object).where(bloco.notna(), None)
+        for linha in bloco.itertuples(index=False, name=None):
+            self._planilha.append(linha)
+        return b""
+
+    def finalizar(self):
+        with tempfile.TemporaryFile() as arquivo:
+            self._workbook.save(arquivo)
+            arquivo.seek(0)
+            while pedaco := arquivo.read(self.tamanho_pedaco):
+                yield pedaco
+
+
+FORMATOS = {
+    "csv": ExportadorCSV,
+    "parquet": ExportadorParquet,
+    "xlsx": ExportadorXLSX,
+}
+
+
+def criar_exportador(formato: str, df_modelo: pd.DataFrame):
+    """Cria o exportador do formato pedido ('csv', 'parquet' ou 'xlsx')."""
+    return FORMATOS[formato](df_modelo)
@@ -0,0 +1,3 @@
+from .scoring import TARGETS, pontuar_lote, pontuar_lote_sem_repeticoes
+
+__all__ = ['TARGETS', 'pontuar_lote', 'pontuar_lote_sem_repeticoes']
@@ -0,0 +1,282 @@
+import json
+import logging
+import warnings
+
+import numpy as np
+
+from .scoring import _modelo_aceita_nan
+
+logger = logging.getLogger(__name__)
+
+# Elementos (linhas x árvores) avaliados por bloco: limita a memória dos índices de nó
+ELEMENTOS_POR_BLOCO = 1 << 16
+
+# Objetivos do XGBoost cuja previsão é a própria margem (sem função de ligação)
+OBJETIVOS_XGBOOST = {"reg:squarederror", "reg:squaredlogerror", "reg:absoluteerror", "reg:pseudohubererror"}
+
+# Linhas da amostra usada para conferir o avaliador compilado contra o predict nativo
+LINHAS_CONFERENCIA = 512
+
+
+class EnsembleCompilado:
+    """
+    Ensemble de árvores de regressão achatado em arrays contíguos do numpy (um nó
+    por posição, com as árvores concatenadas) e avaliado para o lote inteiro de uma
+    vez: a cada nível, todas as linhas descem um nó em todas as árvores.
+
+    Folhas apontam para si mesmas, então o percurso tem sempre `profundidade` passos.
+    A aritmética segue a do estimador original para dar o mesmo resultado do
+    `predict` nativo:
+    - XGBoost: entrada e limiares em float32, `x < limiar` vai para a esquerda e
+      as folhas são somadas em float32, na ordem das árvores, a partir do base_score
+    - sklearn: entrada convertida para float32 e comparada (`x <= limiar`) com os
+      limiares em float64; folhas somadas em float64 na ordem das árvores, a partir
+      do valor inicial (Gradient Boosting, já multiplicadas pelo learning rate) e
+      divididas pelo número de árvores (Random Forest)
+    NaN segue o filho padrão de cada nó. Entradas que o estimador recusaria (NaN para
+    modelos que não aceitam NaN, infinitos) vão para o `predict` nativo, que levanta
+    o mesmo erro de antes.
+
+    Lotes com mais de `max_linhas` linhas também vão para o `predict` nativo: o
+    ganho do avaliador compilado está em pular a validação e o overhead por chamada
+    do estimador; em lotes grandes o laço em C (multithread, no XGBoost) é mais rápido.
+    """
+
+    def __init__(self, modelo, descricao: str, feature, limiar, esquerda, direita, padrao, valores, raizes,
+                 profundidade: int, inicial: float, divisor: float, estrita: bool, tipo, max_linhas: int | None = None):
+        self.modelo = modelo
+        self.max_linhas = max_linhas
+        self.descricao = descricao
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.limiar = np.ascontiguousarray(limiar, dtype=tipo if estrita else np.float64)
+        # Filhos intercalados: filhos[2 * no] é o da esquerda e filhos[2 * no + 1] o da direita
+        self.filhos = np.ascontiguousarray(np.stack([esquerda, direita], axis=1).ravel(), dtype=np.int32)
+        self.nan_direita = np.asarray(padrao) != np.asarray(esquerda)
+        self.valores = np.ascontiguousarray(valores, dtype=tipo)
+        self.raizes = np.ascontiguousarray(raizes, dtype=np.int32)
+        self.profundidade = profundidade
+        self.inicial = tipo(inicial)
+        self.divisor = divisor
+        self.estrita = estrita
+        self.tipo = tipo
+        self.aceita_nan = _modelo_aceita_nan(modelo)
+        self.missing = getattr(modelo, "missing", np.nan) if estrita else np.nan
+
+    @property
+    def total_arvores(self) -> int:
+        return len(self.raizes)
+
+    def _entrada(self, X: np.ndarray) -> np.ndarray | None:
+        """Entrada em float32 (como o estimador a veria) ou None se ela precisa do predict nativo."""
+        X32 = np.asarray(X, dtype=np.float64).astype(np.float32)
+        if self.missing is not None and not np.isnan(self.missing):
+            X32[X32 == np.float32(self.missing)] = np.nan
+        if np.isinf(X32).any() or (not self.aceita_nan and np.isnan(X32).any()):
+            return None
+        return X32 if self.estrita else X32.astype(np.float64)
+
+    def prever(self, X: np.ndarray) -> np.ndarray:
+        """Previsões para a matriz X (linhas x features do modelo), com o dtype do predict nativo."""
+        entrada = None if self.max_linhas is not None and len(X) > self.max_linhas else self._entrada(X)
+        if entrada is None:
+            return np.asarray(self.modelo.predict(X))
+
+        n, n_features = entrada.shape
+        saida = np.empty(n, dtype=self.tipo)
+        bloco = max(1, ELEMENTOS_POR_BLOCO // self.total_arvores)
+        for inicio in range(0, n, bloco):
+            Xb = entrada[inicio:inicio + bloco]
+            planos = Xb.ravel()
+            tem_nan = self.aceita_nan and bool(np.isnan(planos).any())
+            base = (np.arange(len(Xb), dtype=np.int32) * n_features)[:, None]
+            nos = np.broadcast_to(self.raizes, (len(Xb), self.total_arvores)).copy()
+            for _ in range(self.profundidade):
+                x = planos[base + self.feature[nos]]
+                # Vai para a direita se não for para a esquerda (XGBoost: x < limiar; sklearn: x <= limiar)
+                direita = x >= self.limiar[nos] if self.estrita else x > self.limiar[nos]
+                if tem_nan:
+                    nan = np.isnan(x)
+                    direita[nan] = self.nan_direita[nos[nan]]
+                nos = self.filhos[2 * nos + direita]
+
+            # Soma sequencial (cumsum) das folhas, na mesma ordem do estimador original
+            parcelas = np.empty((len(Xb), self.total_arvores + 1), dtype=self.tipo)
+            parcelas[:, 0] = self.inicial
+            parcelas[:, 1:] = self.valores[nos]
+            saida[inicio:inicio + bloco] = np.cumsum(parcelas, axis=1, dtype=self.tipo)[:, -1]
+        if self.divisor != 1:
+            saida /= self.divisor
+        return saida
+
+
+def _achatar(arvores: list) -> dict:
+    """
+    Concatena as árvores, cada uma dada como (feature, limiar, esquerda, direita,
+    padrao, valor, profundidade) com índices locais e -1 nos filhos das folhas.
+    """
+    partes = {nome: [] for nome in ("feature", "limiar", "esquerda", "direita", "padrao", "valores")}
+    raizes, profundidade, deslocamento = [], 0, 0
+    for feature, limiar, esquerda, direita, padrao, valores, prof in arvores:
+        n = len(feature)
+        proprios = np.arange(n) + deslocamento
+        folha = np.asarray(esquerda) < 0
+        partes["feature"].append(np.where(folha, 0, feature))
+        partes["limiar"].append(np.where(folha, 0, limiar))
+        partes["esquerda"].append(np.where(folha, proprios, np.asarray(esquerda) + deslocamento))
+        partes["direita"].append(np.where(folha, proprios, np.asarray(direita) + deslocamento))
+        partes["padrao"].append(np.where(folha, proprios, np.asarray(padrao) + deslocamento))
+        partes["valores"].append(np.where(folha, valores, 0))
+        raizes.append(deslocamento)
+        profundidade = max(profundidade, prof)
+        deslocamento += n
+    achatado = {nome: np.concatenate(valores) for nome, valores in partes.items()}
+    achatado["raizes"] = np.array(raizes)
+    achatado["profundidade"] = profundidade
+    return achatado
+
+
+def _profundidade(esquerda, direita) -> int:
+    profundidade, nivel = 0, [0]
+    while True:
+        filhos = [f for no in nivel for f in (esquerda[no], direita[no]) if f >= 0]
+        if not filhos:
+            return profundidade
+        profundidade += 1
+        nivel = filhos
+
+
+def _compilar_xgboost(modelo, features: list) -> EnsembleCompilado | None:
+    booster = modelo.get_booster()
+    if booster.feature_names is not None and list(booster.feature_names) != list(features):
+        return None
+    dados = json.loads(booster.save_raw("json"))
+    learner = dados["learner"]
+    gradient_booster = learner["gradient_booster"]
+    parametros = learner["learner_model_param"]
+    if (gradient_booster["name"] != "gbtree" or learner["objective"]["name"] not in OBJETIVOS_XGBOOST
+            or int(parametros.get("num_target", 1)) > 1):
+        return None
+
+    arvores_json = gradient_booster["model"]["trees"]
+    melhor_iteracao = booster.attr("best_iteration")
+    if melhor_iteracao is not None:
+        por_iteracao = int(gradient_booster["model"]["gbtree_model_param"]["num_parallel_tree"])
+        arvores_json = arvores_json[:(int(melhor_iteracao) + 1) * por_iteracao]
+
+    arvores = []
+    for arvore in arvores_json:
+        if any(arvore["split_type"]) or int(arvore["tree_param"].get("size_leaf_vector", 1)) > 1:
+            return None
+        esquerda = np.array(arvore["left_children"])
+        direita = np.array(arvore["right_children"])
+        condicoes = np.array(arvore["split_conditions"], dtype=np.float32)
+        padrao = np.where(np.array(arvore["default_left"], dtype=bool), esquerda, direita)
+        # Nas folhas, split_conditions guarda o valor da folha
+        arvores.append((arvore["split_indices"], condicoes, esquerda, direita, padrao, condicoes,
+                        _profundidade(esquerda, direita)))
+    if not arvores:
+        return None
+
+    base_score = float(str(parametros["base_score"]).strip("[]"))
+    return EnsembleCompilado(
+        modelo, f"{type(modelo).__name__} ({len(arvores)} árvores)", **_achatar(arvores),
+        inicial=base_score, divisor=1, estrita=True, tipo=np.float32
+    )
+
+
+def _arvore_sklearn(tree_, escala: float = 1.0) -> tuple:
+    esquerda = tree_.children_left
+    padrao = np.where(tree_.missing_go_to_left.astype(bool), esquerda, tree_.children_right)
+    return (tree_.feature, tree_.threshold, esquerda, tree_.children_right, padrao,
+            tree_.value[:, 0, 0] * escala, tree_.max_depth)
+
+
+def _compilar_sklearn(modelo, features: list) -> EnsembleCompilado | None:
+    from sklearn.dummy import DummyRegressor
+    from sklearn.ensemble import ExtraTreesRegressor, GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.tree import DecisionTreeRegressor
+
+    nomes = getattr(modelo, "feature_names_in_", None)
+    if nomes is not None and list(nomes) != list(features):
+        return None
+    if getattr(modelo, "n_outputs_", 1) != 1:
+        return None
+
+    if isinstance(modelo, DecisionTreeRegressor):
+        arvores, inicial, divisor = [_arvore_sklearn(modelo.tree_)], 0.0, 1
+    elif isinstance(modelo, (RandomForestRegressor, ExtraTreesRegressor)):
+        arvores, inicial, divisor = [_arvore_sklearn(e.tree_) for e in modelo.estimators_], 0.0, len(modelo.estimators_)
+    elif isinstance(modelo, GradientBoostingRegressor):
+        if isinstance(modelo.init_, str) and modelo.init_ == "zero":
+            inicial = 0.0
+        elif isinstance(modelo.init_, DummyRegressor):
+            inicial = float(np.ravel(modelo.init_.constant_)[0])
+        else:
+            return None
+        arvores = [_arvore_sklearn(e.tree_, modelo.learning_rate) for e in modelo.estimators_[:, 0]]
+        divisor = 1
+    else:
+        return None
+
+    return EnsembleCompilado(
+        modelo, f"{type(modelo).__name__} ({len(arvores)} árvores)", **_achatar(arvores),
+        inicial=inicial, divisor=divisor, estrita=False, tipo=np.float64
+    )
+
+
+def _amostra_conferencia(compilado: EnsembleCompilado, n_features: int, semente: int = 0) -> np.ndarray:
+    """
+    Linhas sintéticas em torno dos limiares de cada feature (o próprio limiar e os
+    vizinhos de ponto flutuante), para exercitar os dois lados de cada divisão,
+    com NaN se o modelo aceitar.
+    """
+    rng = np.random.default_rng(semente)
+    internos = compilado.filhos[0::2] != np.arange(len(compilado.feature))
+    X = rng.normal(size=(LINHAS_CONFERENCIA, n_features))
+    for feature in range(n_features):
+        limiares = compilado.limiar[internos & (compilado.feature == feature)].astype(np.float32)
+        # Divisões "ausente x presente" do sklearn têm limiar infinito, que o estimador não aceita na entrada
+        limiares = limiares[np.isfinite(limiares)]
+        if len(limiares):
+            candidatos = np.concatenate([
+                limiares, np.nextafter(limiares, np.float32(-np.inf)), np.nextafter(limiares, np.float32(np.inf))
+            ]).astype(np.float64)
+            X[:, feature] = rng.choice(candidatos, size=LINHAS_CONFERENCIA)
+    if compilado.aceita_nan:
+        X[rng.random(X.shape) < 0.05] = np.nan
+    return X
+
+
+def compilar_ensemble(modelo, features: list, max_linhas: int | None = None) -> EnsembleCompilado | None:
+    """
+    Avaliador compilado do modelo de um target, ou None se o tipo de modelo não é
+    suportado (aí a inferência continua no `predict` nativo). Lotes com mais de
+    `max_linhas` linhas (None = sem limite) são pontuados pelo `predict` nativo.
+
+    Suporta XGBRegressor (gbtree, objetivos sem função de ligação) e os regressores
+    de árvores do sklearn (DecisionTree, RandomForest, ExtraTrees, GradientBoosting).
+    O avaliador só é usado se reproduzir exatamente o `predict` nativo em uma
+    amostra sintética em torno dos limiares.
+    """
+    try:
+        if type(modelo).__module__.startswith("xgboost") and hasattr(modelo, "get_booster"):
+            compilado = _compilar_xgboost(modelo, features)
+        elif type(modelo).__module__.startswith("sklearn"):
+            compilado = _compilar_sklearn(modelo, features)
+        else:
+            compilado = None
+        if compilado is None:
+            return None
+
+        X = _amostra_conferencia(compilado, len(features))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            nativo = np.asarray(modelo.predict(X))
+        if not np.array_equal(compilado.prever(X), nativo, equal_nan=True):
+            logger.warning(f"⚠️ Avaliador compilado de {type(modelo).__name__} diverge do predict nativo; usando o nativo.")
+            return None
+        compilado.max_linhas = max_linhas
+        return compilado
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível compilar {type(modelo).__name__}: {e}")
+        return None
@@ -0,0 +1,182 @@
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+
+from .plano import prever_matriz
+
+# Limites (em número de jogadores) dos buckets do histograma de tamanho de lote
+BUCKETS_LOTE = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def _prever_lote(plano: dict, X: np.ndarray) -> list:
+    """
+    Pontua o lote empilhado; se o predict vetorizado falhar, isola a falha linha a
+    linha para que um jogador inválido não derrube os demais.
+    Retorna, por jogador, o dict de previsões ou a exceção correspondente.
+    """
+    try:
+        previsoes = prever_matriz(plano, X)
+        return [
+            {target_name: float(valores[i]) for target_name, valores in previsoes.items()}
+            for i in range(len(X))
+        ]
+    except Exception:
+        resultados = []
+        for x in X:
+            try:
+                previsoes = prever_matriz(plano, x.reshape(1, -1))
+                resultados.append({t: float(v[0]) for t, v in previsoes.items()})
+            except Exception as e:
+                resultados.append(e)
+        return resultados
+
+
+async def _executar_no_loop(func, *args):
+    return func(*args)
+
+
+class MicroBatcher:
+    """
+    Agrupa previsões de jogadores únicos que chegam concorrentemente em POST /prever
+    e executa UM `predict` vetorizado por target para o lote inteiro.
+
+    Um lote é disparado quando atinge `tamanho_max` jogadores ou quando a janela de
+    `janela_ms` expira. A janela é adaptativa: se não há outras requisições na fila e
+    o último lote teve um único jogador (carga baixa), o lote sai imediatamente, sem
+    somar a janela à latência.
+
+    Cada jogador chega com o plano de inferência da versão dos modelos que a sua
+    requisição pegou; durante a troca de versão, um lote com planos diferentes é
+    pontuado em um predict por plano.
+
+    `executar` é a corrotina que roda o predict do lote (ex.: o pool de trabalho);
+    por padrão ele roda no próprio event loop.
+    """
+
+    def __init__(self, janela_ms: float = 2.0, tamanho_max: int = 64,
+                 amostras_atraso: int = 2048, executar=None):
+        self.executar = executar or _executar_no_loop
+        self.janela = janela_ms / 1000
+        self.tamanho_max = max(1, tamanho_max)
+        self._fila = None
+        self._worker = None
+        self._loop = None
+        self._ultimo_lote = 1
+
+        self._total_lotes = 0
+        self._total_jogadores = 0
+        self._histograma = {limite: 0 for limite in BUCKETS_LOTE}
+        self._histograma_excedente = 0
+        self._atrasos = deque(maxlen=amostras_atraso)
+        self._atraso_max = 0.0
+
+    async def prever(self, plano: dict, x: np.ndarray) -> dict:
+        """Enfileira o vetor-união de um jogador (no layout de `plano`) e aguarda as previsões do seu lote."""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._fila = asyncio.Queue()
+            self._worker = loop.create_task(self._executar())
+
+        futuro = loop.create_future()
+        await self._fila.put((x, plano, futuro, time.perf_counter()))
+        return await futuro
+
+    async def parar(self):
+        """Cancela o worker (usado no shutdown da aplicação)."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def _coletar_lote(self) -> list:
+        lote = [await self._fila.get()]
+        esperar = self._ultimo_lote > 1 or not self._fila.empty()
+        prazo = time.perf_counter() + self.janela
+
+        while len(lote) < self.tamanho_max:
+            if not self._fila.empty():
+                lote.append(self._fila.get_nowait())
+                continue
+            restante = prazo - time.perf_counter()
+            if not esperar or restante <= 0:
+                break
+            try:
+                lote.append(await asyncio.wait_for(self._fila.get(), timeout=restante))
+            except asyncio.TimeoutError:
+                break
+        return lote
+
+    async def _executar(self):
+        while True:
+            lote = await self._coletar_lote()
+            self._registrar(lote)
+
+            por_plano = {}
+            for item in lote:
+                por_plano.setdefault(id(item[1]), []).append(item)
+
+            for itens in por_plano.values():
+                X = np.vstack([x for x, _, _, _ in itens])
+                try:
+                    resultados = await self.executar(_prever_lote, itens[0][1], X)
+                except Exception as e:
+                    # Falha do próprio executor (ex.: pool saturado ou timeout) vale para o lote todo
+                    resultados = [e] * len(itens)
+
+                for (_, _, futuro, _), resultado in zip(itens, resultados):
+                    if futuro.done():
+                        continue
+                    if isinstance(resultado, Exception):
+                        futuro.set_exception(resultado)
+                    else:
+                        futuro.set_result(resultado)
+
+    def _registrar(self, lote: list):
+        agora = time.perf_counter()
+        tamanho = len(lote)
+        self._ultimo_lote = tamanho
+        self._total_lotes += 1
+        self._total_jogadores += tamanho
+
+        for limite in BUCKETS_LOTE:
+            if tamanho <= limite:
+                self._histograma[limite] += 1
+                break
+        else:
+            self._histograma_excedente += 1
+
+        for _, _, _, enfileirado_em in lote:
+            atraso = agora - enfileirado_em
+            self._atrasos.append(atraso)
+            self._atraso_max = max(self._atraso_max, atraso)
+
+    def metricas(self) -> dict:
+        """Distribuição dos tamanhos de lote e do atraso de fila (ms) para ajuste de janela/tamanho."""
+        atrasos_ms = np.array(self._atrasos) * 1000
+        percentis = {}
+        if len(atrasos_ms):
+            for p in (50, 90, 99):
+                percentis[f"p{p}"] = round(float(np.percentile(atrasos_ms, p)), 3)
+
+        histograma = {f"<={limite}": total for limite, total in self._histograma.items()}
+        histograma[f">{BUCKETS_LOTE[-1]}"] = self._histograma_excedente
+
+        return {
+            "janela_ms": self.janela * 1000,
+            "tamanho_max": self.tamanho_max,
+            "total_lotes": self._total_lotes,
+            "total_jogadores": self._total_jogadores,
+            "tamanho_medio_lote": round(self._total_jogadores / self._total_lotes, 2) if self._total_lotes else None,
+            "histograma_tamanho_lote": histograma,
+            "atraso_fila_ms": {
+                **percentis,
+                "max": round(self._atraso_max * 1000, 3),
+                "amostras": len(atrasos_ms)
+            }
+        }
@@ -0,0 +1,118 @@
+import numpy as np
+
+from .scoring import TARGETS
+
+
+def _dobrar_scaler(scaler):
+    """
+    Converte um scaler elemento-a-elemento (StandardScaler, MinMaxScaler, RobustScaler...)
+    em um par (a, b) tal que `scaler.transform(X) == X * a + b`.
+
+    Os coeficientes são obtidos avaliando o próprio scaler em vetores de zeros e uns;
+    um terceiro ponto confirma que a transformação é realmente afim. Retorna None
+    se o scaler não puder ser dobrado.
+    """
+    n = len(scaler.feature_names_in_)
+    try:
+        b = np.asarray(scaler.transform(np.zeros((1, n))), dtype='float64')[0]
+        a = np.asarray(scaler.transform(np.ones((1, n))), dtype='float64')[0] - b
+        teste = np.asarray(scaler.transform(np.full((1, n), 3.0)), dtype='float64')[0]
+    except Exception:
+        return None
+    if not np.allclose(teste, 3.0 * a + b):
+        return None
+    return a, b
+
+
+def compilar_plano(artefatos: dict) -> dict | None:
+    """
+    Monta, uma única vez no carregamento dos modelos, o plano de inferência usado
+    por POST /prever para pontuar um jogador sem passar pelo pandas.
+
+    O plano guarda:
+        features:  vetor-união com todas as features consumidas pelos três modelos
+        targets:   para cada target, os índices das suas features no vetor-união,
+                   o scaler dobrado em (a, b) apenas nas posições que ele escala e o
+                   avaliador compilado do modelo (None = predict nativo)
+
+    Retorna None se algum target não puder ser compilado (ex.: scaler não afim);
+    nesse caso o endpoint continua usando o caminho com DataFrame.
+    """
+    features_uniao = []
+    for target_name in TARGETS:
+        key = target_name.lower()
+        if key in artefatos:
+            features_uniao.extend(artefatos[key]["features"])
+    features_uniao = list(dict.fromkeys(features_uniao))
+    indice = {feature: i for i, feature in enumerate(features_uniao)}
+
+    targets = {}
+    for target_name in TARGETS:
+        key = target_name.lower()
+        if key not in artefatos:
+            continue
+
+        scaler = artefatos[key]["scaler"]
+        features_modelo = list(artefatos[key]["features"])
+        dobrado = _dobrar_scaler(scaler)
+        if dobrado is None:
+            return None
+        a, b = dobrado
+
+        posicao_scaler = {feature: i for i, feature in enumerate(scaler.feature_names_in_)}
+        posicoes_escaladas = [i for i, f in enumerate(features_modelo) if f in posicao_scaler]
+        colunas_scaler = [posicao_scaler[features_modelo[i]] for i in posicoes_escaladas]
+
+        targets[target_name] = {
+            "modelo": artefatos[key]["modelo"],
+            "compilado": artefatos[key].get("compilado"),
+            "indices": np.array([indice[f] for f in features_modelo], dtype=np.intp),
+            "posicoes_escaladas": np.array(posicoes_escaladas, dtype=np.intp),
+            "a": a[colunas_scaler],
+            "b": b[colunas_scaler],
+        }
+
+    return {"features": features_uniao, "targets": targets}
+
+
+def vetorizar_registro(plano: dict, dados: dict) -> np.ndarray:
+    """
+    Copia o dicionário de um jogador para o vetor-união do plano.
+    Lança KeyError com as features ausentes e ValueError para valores não numéricos.
+    """
+    ausentes = [f for f in plano["features"] if f not in dados]
+    if ausentes:
+        raise KeyError(ausentes)
+
+    x = np.empty(len(plano["features"]), dtype='float64')
+    for i, feature in enumerate(plano["features"]):
+        valor = dados[feature]
+        try:
+            x[i] = np.nan if valor is None else float(valor)
+        except (TypeError, ValueError):
+            raise ValueError(f"A feature '{feature}' tem valor não numérico: {valor!r}")
+    return x
+
+
+def prever_matriz(plano: dict, X: np.ndarray) -> dict:
+    """
+    Aplica o scaler dobrado e o modelo de cada target a uma matriz (jogadores x vetor-união).
+    Retorna {target: array de previsões}.
+    """
+    previsoes = {}
+    for target_name, alvo in plano["targets"].items():
+        entrada = X[:, alvo["indices"]]
+        posicoes = alvo["posicoes_escaladas"]
+        entrada[:, posicoes] = entrada[:, posicoes] * alvo["a"] + alvo["b"]
+        if alvo["compilado"] is not None:
+            valores = alvo["compilado"].prever(entrada)
+        else:
+            valores = alvo["modelo"].predict(entrada)
+        previsoes[target_name] = np.asarray(valores, dtype='float64')
+    return previsoes
+
+
+def prever_vetor(plano: dict, x: np.ndarray) -> dict:
+    """Atalho de `prever_matriz` para o vetor-união de um único jogador."""
+    previsoes = prever_matriz(plano, x.reshape(1, -1))
+    return {target_name: float(valores[0]) for target_name, valores in previsoes.items()}
@@ -0,0 +1,604 @@
+import hashlib
+import importlib
+import io
+import json
+import logging
+import os
+import pickletools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+from app.core.cache import cache_resultados, cache_jogadores, cache_previsoes
+from app.core.prontidao import prontidao
+from app.core.settings import settings
+from app.preprocessing import carregar_ou_ajustar_estado
+from app.preprocessing.dependencias import campos_de_entrada, podar_features
+from .arvores import compilar_ensemble
+from .plano import compilar_plano, vetorizar_registro, prever_vetor
+from .scoring import pontuar_lote
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+TARGET_FOLDERS = {"Target1": "target1", "Target2": "Target2", "Target3": "Target3"}
+RELATORIOS = ("final_report.json", "final_report_aprimorado.json")
+
+# Versão dos modelos usada pela requisição em andamento (lida pelo middleware que
+# marca a resposta); cada requisição recebe um dict próprio
+versao_da_requisicao: ContextVar[dict | None] = ContextVar("versao_da_requisicao", default=None)
+
+
+def marcar_versao(versao: str):
+    """Registra, na requisição em andamento, a versão dos modelos que a respondeu."""
+    marcador = versao_da_requisicao.get()
+    if marcador is not None:
+        marcador["versao"] = versao
+
+
+def _hash(conteudo: bytes) -> str:
+    return hashlib.sha256(conteudo).hexdigest()[:16]
+
+
+def _ler(caminho: Path) -> bytes | None:
+    try:
+        return caminho.read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def _modulos_do_pickle(conteudo: bytes) -> set:
+    """
+    Módulos das classes referenciadas por um pickle, lidos dos opcodes sem
+    desserializar nada. Arquivos do joblib com compressão não são inspecionados,
+    e a leitura para no primeiro trecho que não é opcode (dados crus de arrays).
+    """
+    modulos = set()
+    if conteudo[:1] != b"\x80":
+        return modulos
+    # Valor (texto ou None) de cada item empilhado, e o memo, para resolver STACK_GLOBAL
+    empilhados, memo = [], {}
+    try:
+        for opcode, arg, _ in pickletools.genops(io.BytesIO(conteudo)):
+            nome = opcode.name
+            if nome == "GLOBAL":
+                modulos.add(arg.split(" ", 1)[0])
+            elif nome == "STACK_GLOBAL" and len(empilhados) >= 2 and empilhados[-2]:
+                modulos.add(empilhados[-2])
+            if nome in ("SHORT_BINUNICODE", "BINUNICODE", "BINUNICODE8", "UNICODE"):
+                empilhados.append(arg)
+            elif nome in ("BINGET", "LONG_BINGET", "GET"):
+                empilhados.append(memo.get(arg))
+            elif nome == "MEMOIZE":
+                memo[len(memo)] = empilhados[-1] if empilhados else None
+            elif nome in ("BINPUT", "LONG_BINPUT", "PUT"):
+                memo[arg] = empilhados[-1] if empilhados else None
+            else:
+                empilhados.append(None)
+    except Exception:
+        pass
+    return modulos
+
+
+def _importar_dependencias(conteudos: dict):
+    """
+    Importa, uma vez e em sequência, os módulos usados pelos pickles dos modelos.
+    Desserializar os targets em paralelo com o sklearn/xgboost ainda não importados
+    faz as threads disputarem o lock de import do mesmo módulo (o Python aborta uma
+    delas com "deadlock detected by _ModuleLock").
+    """
+    modulos = set()
+    for caminho, conteudo in conteudos.items():
+        if conteudo is not None and caminho.suffix == ".pkl":
+            modulos |= _modulos_do_pickle(conteudo)
+    for modulo in sorted(modulos - {"__main__", "__builtin__", "builtins"}):
+        try:
+            importlib.import_module(modulo)
+        except Exception:
+            # O joblib.load do target vai reportar o erro real
+            pass
+
+
+def _desserializar(caminho: Path, conteudos: dict):
+    conteudo = conteudos.get(caminho)
+    if conteudo is None:
+        raise FileNotFoundError(2, "No such file or directory", str(caminho))
+    return joblib.load(io.BytesIO(conteudo))
+
+
+def _metadados(report: dict | None, modelo, artefato: dict, versao: str) -> dict:
+    if report is None:
+        return {
+            "nome_modelo": type(modelo).__name__,
+            "parametros": {},
+            "versao": versao,
+            "metricas_treino": {"r2": None, "rmse": None, "mae": None, "mape": None},
+            "metricas_teste": {"r2": None, "rmse": None, "mae": None, "mape": None},
+            "overfitting": {"diferenca_r2": None, "queda_percentual": None, "status": "unknown"},
+            "total_features": len(artefato["features"]),
+            "features_originais": None,
+            "reducao_features": None
+        }
+    return {
+        "nome_modelo": report["model"]["name"],
+        "parametros": report["model"]["best_params"],
+        "versao": versao,
+        "metricas_treino": {
+            "r2": round(report["metrics"]["train"]["r2"], 4),
+            "rmse": round(report["metrics"]["train"]["rmse"], 2),
+            "mae": round(report["metrics"]["train"]["mae"], 2),
+            "mape": round(report["metrics"]["train"].get("mape", 0), 2)
+        },
+        "metricas_teste": {
+            "r2": round(report["metrics"]["test"]["r2"], 4),
+            "rmse": round(report["metrics"]["test"]["rmse"], 2),
+            "mae": round(report["metrics"]["test"]["mae"], 2),
+            "mape": round(report["metrics"]["test"].get("mape", 0), 2)
+        },
+        "overfitting": {
+            "diferenca_r2": round(report["overfitting_analysis"]["r2_difference"], 4),
+            "queda_percentual": round(report["overfitting_analysis"]["relative_drop_percentage"], 2),
+            "status": report["overfitting_analysis"]["status"]
+        },
+        "total_features": report["features"]["final_selected"],
+        "features_originais": report["features"]["original_count"],
+        "reducao_features": round(report["features"]["reduction_percentage"], 2)
+    }
+
+
+def _ler_relatorios(target_api: str, conteudos_relatorios: dict, log: list) -> dict:
+    """
+    Reports do target ({nome: dict}) a partir dos bytes lidos. Um report corrompido
+    é tratado como ausente (aviso no log), sem impedir a carga do modelo.
+    """
+    relatorios = {}
+    for nome, conteudo in conteudos_relatorios.items():
+        if conteudo is None:
+            continue
+        try:
+            relatorios[nome] = json.loads(conteudo)
+        except ValueError as e:
+            log.append((logging.WARNING, f"⚠️ {target_api}: {nome} inválido, ignorado (tratado como ausente): {e}"))
+    return relatorios
+
+
+def _carregar_target(target_api: str, arquivos: dict, conteudos: dict, conteudos_relatorios: dict) -> dict:
+    """
+    Desserializa modelo, scaler e lista de features de um target (a partir dos bytes
+    já lidos) e monta os metadados a partir do report. Os targets são carregados em
+    paralelo, então as mensagens (nível, texto) vão para `log` e são registradas na
+    ordem dos targets depois que todos terminam.
+    """
+    key = target_api.lower()
+    log = []
+    resultado = {"key": key, "artefato": None, "metadados": None, "relatorios": {}, "log": log, "falhou": False}
+    inicio = time.perf_counter()
+
+    relatorios = resultado["relatorios"] = _ler_relatorios(target_api, conteudos_relatorios, log)
+    try:
+        versao = arquivos["versao"]
+        log.append((logging.INFO, f"📊 {target_api}:"))
+        log.append((logging.INFO, f"   Versão: {versao}"))
+        log.append((logging.INFO, f"   Modelo: {arquivos['modelo'].name}"))
+        log.append((logging.INFO, f"   Features: {arquivos['features'].name}"))
+
+        modelo_carregado = _desserializar(arquivos["modelo"], conteudos)
+        resultado["artefato"] = {
+            "modelo": modelo_carregado,
+            "scaler": _desserializar(arquivos["scaler"], conteudos),
+            "features": _desserializar(arquivos["features"], conteudos),
+            "versao": versao
+        }
+
+        # Sempre priorizar o report aprimorado (independente do modelo)
+        report = relatorios.get("final_report_aprimorado.json")
+        if report is not None:
+            log.append((logging.INFO, f"   Report: final_report_aprimorado.json ✅"))
+        else:
+            report = relatorios.get("final_report.json")
+            log.append((logging.INFO, f"   Report: final_report.json"))
+            if report is None:
+                log.append((logging.WARNING, f"   ⚠️ Nenhum report encontrado"))
+        resultado["metadados"] = _metadados(report, modelo_carregado, resultado["artefato"], versao)
+
+        log.append((logging.INFO, f"   ✅ R² Treino: {resultado['metadados']['metricas_treino']['r2']}"))
+        log.append((logging.INFO, f"   ✅ R² Teste: {resultado['metadados']['metricas_teste']['r2']}"))
+        log.append((logging.INFO, f"   ✅ MAPE Teste: {resultado['metadados']['metricas_teste']['mape']}%"))
+        log.append((logging.INFO, f"   ✅ Total Features: {resultado['metadados']['total_features']}\n"))
+
+    except FileNotFoundError as e:
+        log.append((logging.WARNING, f"  ⚠️ AVISO: Falha ao carregar artefatos para {target_api}. Arquivo não encontrado: {e}\n"))
+    except Exception as e:
+        log.append((logging.ERROR, f"  ❌ ERRO ao carregar {target_api}: {e}\n"))
+        resultado["falhou"] = True
+
+    resultado["segundos"] = time.perf_counter() - inicio
+    return resultado
+
+
+def _aquecer(modelos: dict):
+    """
+    Inferência com um jogador sintético (medianas do estado ajustado; 0 nas demais
+    features) pelos dois caminhos de previsão, para que a primeira requisição real
+    não pague a inicialização do XGBoost/sklearn.
+    """
+    medianas = (modelos["estado"] or {}).get("medianas", {})
+    jogador = {feature: float(medianas.get(feature, 0.0)) for feature in modelos["poda"]["consumidas"]}
+    pontuar_lote(pd.DataFrame([jogador]), modelos["artefatos"])
+    if modelos["plano"]:
+        prever_vetor(modelos["plano"], vetorizar_registro(modelos["plano"], jogador))
+
+
+class RegistroArtefatos:
+    """
+    Registro único dos artefatos de Machine Learning (modelos, scalers, listas de
+    features, reports e estado do pré-processamento).
+
+    Cada carga lê cada arquivo uma única vez e produz uma versão imutável (dict) com
+    tudo o que a inferência precisa, identificada pelo hash do conteúdo dos arquivos:
+        versao, arquivos ({caminho relativo: hash}), artefatos, metadados, relatorios,
+        plano, estado, poda, carregado_em
+
+    As requisições pegam a versão `atual` uma vez e a usam do início ao fim. Uma
+    nova versão é montada e aquecida fora das requisições e publicada trocando uma
+    única referência; requisições em andamento terminam com a versão que pegaram.
+
+    O observador (thread) compara a assinatura (mtime, tamanho) dos arquivos de
+    `dir_modelos` e `dir_resultados` a cada `intervalo_s` e recarrega quando ela
+    muda e fica estável por uma varredura. Conteúdo igual ao da versão atual (ex.:
+    arquivo só regravado) não gera nova versão. Uma recarga que perderia targets já
+    carregados é rejeitada e a versão atual continua valendo.
+    """
+
+    def __init__(self, dir_modelos: Path, dir_resultados: Path, caminho_estado: Path, caminho_referencia: Path):
+        self.dir_modelos = dir_modelos
+        self.dir_resultados = dir_resultados
+        self.caminho_estado = caminho_estado
+        self.caminho_referencia = caminho_referencia
+        # Os arquivos aparecem na versão pelo caminho relativo à raiz comum (ex.: models/target1/scaler.pkl)
+        self._raiz = Path(os.path.commonpath([dir_modelos, dir_resultados, caminho_estado.parent]))
+        self._atual = None
+        self._trava_carga = threading.Lock()
+        self._assinatura_carregada = None
+        self._recargas = 0
+        self._ultimo_erro = None
+        self._observador = None
+        self._intervalo = None
+        self._parar = threading.Event()
+
+    @property
+    def atual(self) -> dict | None:
+        return self._atual
+
+    @property
+    def versao(self) -> str | None:
+        atual = self._atual
+        return atual["versao"] if atual is not None else None
+
+    def garantir(self) -> dict:
+        """Versão atual; no modo sob demanda, a primeira chamada carrega (as concorrentes esperam)."""
+        atual = self._atual
+        if atual is not None:
+            return atual
+        with self._trava_carga:
+            if self._atual is None:
+                self._carregar()
+            return self._atual
+
+    def carregar(self) -> dict:
+        """Carrega (ou recarrega) os artefatos do disco e publica a nova versão, se mudou."""
+        with self._trava_carga:
+            return self._carregar()
+
+    def _carregar(self) -> dict:
+        primeira = self._atual is None
+        if primeira:
+            prontidao.definir("modelos", "carregando")
+        try:
+            modelos = self._montar(primeira)
+        except Exception as e:
+            self._ultimo_erro = str(e)
+            if primeira:
+                prontidao.definir("modelos", "erro", str(e))
+            raise
+        self._ultimo_erro = None
+        if modelos is not self._atual:
+            self._publicar(modelos, primeira)
+        if primeira:
+            prontidao.definir("modelos", "pronto")
+        return self._atual
+
+    def _publicar(self, modelos: dict, primeira: bool):
+        # Resultados, vetores e previsões em cache só valem para a versão dos modelos que os gerou
+        cache_resultados.definir_versao(modelos["versao"])
+        cache_jogadores.definir_versao(modelos["versao"], modelos["plano"].get("features", []))
+        cache_previsoes.definir_versao(modelos["versao"], modelos["poda"]["entradas"])
+        self._atual = modelos
+        if not primeira:
+            self._recargas += 1
+        logger.info(f"🗃️ Versão dos modelos publicada: {modelos['versao']}")
+
+    def _selecionar_arquivos(self, pasta: str) -> dict:
+        """Arquivos do target: versão aprimorada do modelo (e das features) quando existir."""
+        pasta_modelo = self.dir_modelos / pasta
+        modelo_aprimorado = pasta_modelo / "final_model_aprimorado.pkl"
+        features_aprimoradas = pasta_modelo / "selected_features_aprimoradas.pkl"
+        features_normal = pasta_modelo / "selected_features.pkl"
+
+        if modelo_aprimorado.exists():
+            return {
+                "modelo": modelo_aprimorado,
+                "features": features_aprimoradas if features_aprimoradas.exists() else features_normal,
+                "scaler": pasta_modelo / "scaler.pkl",
+                "versao": "APRIMORADO",
+            }
+        return {
+            "modelo": pasta_modelo / "final_model.pkl",
+            "features": features_normal,
+            "scaler": pasta_modelo / "scaler.pkl",
+            "versao": "NORMAL",
+        }
+
+    def _medir(self, fase: str, primeira: bool):
+        # Só a primeira carga entra nas fases do cold start de /prontidao
+        return prontidao.medir(fase) if primeira else nullcontext()
+
+    def _montar(self, primeira: bool) -> dict:
+        logger.info("Carregando artefatos de Machine Learning (estrutura modular)..." if primeira
+              else "🔄 Relendo os artefatos do disco para verificar se há nova versão dos modelos...")
+        logger.info(f"📁 Diretório de modelos: {self.dir_modelos}\n")
+
+        # Estado ajustado do pré-processamento (medianas de imputação), salvo junto dos modelos
+        try:
+            with self._medir("estado_preprocessamento", primeira):
+                estado = carregar_ou_ajustar_estado(self.caminho_estado, self.caminho_referencia)
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao carregar/ajustar o estado do pré-processamento: {e}")
+            estado = None
+
+        # A assinatura é tirada depois que o estado foi salvo (ele fica em dir_modelos):
+        # o arquivo gerado pela própria carga não conta como mudança para o observador
+        self._assinatura_carregada = self.assinatura()
+
+        # Cada arquivo é lido uma única vez: os mesmos bytes dão o hash da versão e
+        # são desserializados
+        selecionados = {target_api: self._selecionar_arquivos(pasta) for target_api, pasta in TARGET_FOLDERS.items()}
+        caminhos = [
+            caminho for arquivos in selecionados.values()
+            for caminho in (arquivos["modelo"], arquivos["scaler"], arquivos["features"])
+        ]
+        caminhos += [self.dir_resultados / pasta / nome for pasta in TARGET_FOLDERS.values() for nome in RELATORIOS]
+        if estado is not None:
+            caminhos.append(self.caminho_estado)
+        conteudos = {caminho: _ler(caminho) for caminho in caminhos}
+
+        hashes = {
+            caminho.relative_to(self._raiz).as_posix(): _hash(conteudo)
+            for caminho, conteudo in conteudos.items() if conteudo is not None
+        }
+        digest = hashlib.sha256()
+        for nome, valor in sorted(hashes.items()):
+            digest.update(f"{nome}\0{valor}\0".encode('utf-8'))
+        versao = digest.hexdigest()[:16]
+
+        atual = self._atual
+        if atual is not None and atual["versao"] == versao:
+            logger.info(f"✅ Conteúdo dos artefatos inalterado: mantida a versão {versao}")
+            return atual
+
+        conteudos_relatorios = {
+            target_api: {nome: conteudos[self.dir_resultados / pasta / nome] for nome in RELATORIOS}
+            for target_api, pasta in TARGET_FOLDERS.items()
+        }
+
+        with self._medir("importacao_modelos", primeira):
+            _importar_dependencias(conteudos)
+
+        # Um target por thread: o joblib.load passa a maior parte do tempo
+        # desserializando arrays, e os três targets são independentes
+        def carregar(target_api):
+            return _carregar_target(target_api, selecionados[target_api], conteudos, conteudos_relatorios[target_api])
+
+        with self._medir("modelos", primeira):
+            with ThreadPoolExecutor(max_workers=len(TARGET_FOLDERS)) as executor:
+                carregados = list(executor.map(carregar, TARGET_FOLDERS))
+            # Falhas da carga em paralelo têm uma segunda chance, sozinhas
+            carregados = [
+                carregar(target_api) if resultado["falhou"] else resultado
+                for resultado, target_api in zip(carregados, TARGET_FOLDERS)
+            ]
+
+        artefatos, metadados, relatorios = {}, {}, {}
+        for resultado in carregados:
+            relatorios[resultado["key"]] = resultado["relatorios"]
+            for nivel, linha in resultado["log"]:
+                logger.log(nivel, linha)
+            if primeira:
+                prontidao.registrar(f"modelos.{resultado['key']}", resultado["segundos"])
+            if resultado["artefato"] is not None:
+                artefatos[resultado["key"]] = resultado["artefato"]
+            if resultado["metadados"] is not None:
+                metadados[resultado["key"]] = resultado["metadados"]
+
+        if not artefatos:
+            raise RuntimeError("Nenhum artefato de modelo foi carregado. A API não pode fazer previsões.")
+        if atual is not None:
+            perdidos = sorted(set(atual["artefatos"]) - set(artefatos))
+            if perdidos or any(resultado["falhou"] for resultado in carregados):
+                raise RuntimeError(
+                    f"Nova versão {versao} incompleta (targets com falha: {perdidos or 'ver log'}); "
+                    f"mantida a versão {atual['versao']}."
+                )
+
+        # Ensembles de árvores achatados em arrays para a avaliação vetorizada
+        if settings.INFERENCIA_COMPILADA:
+            with self._medir("compilacao_arvores", primeira):
+                for key, dados in artefatos.items():
+                    dados["compilado"] = compilar_ensemble(
+                        dados["modelo"], list(dados["features"]), settings.INFERENCIA_COMPILADA_MAX_LINHAS
+                    )
+                    if dados["compilado"] is not None:
+                        logger.info(f"🌲 {key}: {dados['compilado'].descricao} compilado "
+                              f"(profundidade {dados['compilado'].profundidade})")
+                    else:
+                        logger.info(f"↩️ {key}: {type(dados['modelo']).__name__} sem avaliador compilado; usando o predict nativo")
+
+        # Poda do grafo de features: só o que os modelos (e seus scalers) consomem
+        inicio_plano = time.perf_counter()
+        consumidas = []
+        for dados in artefatos.values():
+            consumidas.extend(dados["features"])
+            consumidas.extend(dados["scaler"].feature_names_in_)
+        consumidas = list(dict.fromkeys(consumidas))
+        poda = {
+            "consumidas": consumidas,
+            "necessarias": podar_features(consumidas),
+            "entradas": campos_de_entrada(consumidas),
+        }
+        logger.info(f"✂️ Grafo de features podado: {len(poda['necessarias'])} features de engenharia necessárias")
+
+        # Plano de inferência usado por POST /prever (caminho sem pandas)
+        plano = compilar_plano(artefatos)
+        if plano is not None:
+            logger.info(f"⚡ Plano de inferência compilado: {len(plano['features'])} features na união dos targets")
+        else:
+            plano = {}
+            logger.warning("⚠️ Plano de inferência não compilado (scaler não afim). /prever usará o caminho com DataFrame.")
+        if primeira:
+            prontidao.registrar("plano", time.perf_counter() - inicio_plano)
+
+        if estado is not None:
+            logger.info(f"🔧 Pré-processamento ajustado: {len(estado['medianas'])} medianas "
+                  f"({estado['linhas_referencia']} linhas de referência)")
+        else:
+            logger.warning("⚠️ Sem estado ajustado do pré-processamento: uploads usarão as medianas do próprio lote.")
+
+        modelos = {
+            "versao": versao,
+            "arquivos": hashes,
+            "artefatos": artefatos,
+            "metadados": metadados,
+            "relatorios": relatorios,
+            "plano": plano,
+            "estado": estado,
+            "poda": poda,
+            "carregado_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+
+        # A nova versão é aquecida antes de ser publicada
+        if settings.MODELOS_AQUECIMENTO:
+            try:
+                inicio = time.perf_counter()
+                _aquecer(modelos)
+                segundos = time.perf_counter() - inicio
+                if primeira:
+                    prontidao.registrar("aquecimento", segundos)
+                logger.info(f"🔥 Inferência aquecida com um jogador sintético ({round(segundos * 1000, 1)} ms)")
+            except Exception as e:
+                logger.warning(f"⚠️ Falha no aquecimento da inferência: {e}")
+
+        logger.info(f"✅ Todos os artefatos disponíveis foram carregados! (versão {versao})")
+        return modelos
+
+    def assinatura(self) -> dict:
+        """(mtime, tamanho) de cada arquivo sob os diretórios de modelos e de resultados."""
+        assinatura = {}
+        for diretorio in (self.dir_modelos, self.dir_resultados):
+            for caminho in diretorio.rglob("*"):
+                if caminho.name.endswith(".tmp"):
+                    continue
+                try:
+                    if caminho.is_file():
+                        info = caminho.stat()
+                        assinatura[str(caminho)] = (info.st_mtime_ns, info.st_size)
+                except OSError:
+                    # Removido durante a varredura
+                    continue
+        return assinatura
+
+    def iniciar_observador(self, intervalo_s: float):
+        """Passa a observar os diretórios em uma thread (intervalo <= 0 desativa)."""
+        if intervalo_s <= 0 or (self._observador is not None and self._observador.is_alive()):
+            return
+        self._intervalo = intervalo_s
+        self._parar.clear()
+        self._observador = threading.Thread(
+            target=self._observar, args=(intervalo_s,), name="registro-artefatos", daemon=True
+        )
+        self._observador.start()
+        logger.info(f"👀 Observando {self.dir_modelos.name}/ e {self.dir_resultados.name}/ a cada {intervalo_s}s")
+
+    def parar_observador(self):
+        self._parar.set()
+        if self._observador is not None:
+            self._observador.join(timeout=5)
+            self._observador = None
+
+    def _observar(self, intervalo_s: float):
+        anterior = None
+        while not self._parar.wait(intervalo_s):
+            assinatura = self.assinatura()
+            # Só recarrega depois que a cópia dos arquivos terminou (assinatura estável)
+            estavel = assinatura == anterior
+            anterior = assinatura
+            if not estavel or self._atual is None or assinatura == self._assinatura_carregada:
+                continue
+            try:
+                self.carregar()
+            except Exception as e:
+                logger.warning(f"⚠️ Recarga dos modelos falhou, mantida a versão {self.versao}: {e}")
+
+    def relatorio(self, key: str, nome: str = "final_report.json") -> tuple[dict | None, str | None]:
+        """
+        Report de um target ('target1', ...) e a versão de onde ele veio. Com uma versão
+        publicada, é o report dessa versão; sem nenhuma (modo sob demanda antes da
+        primeira carga, ou carga com falha), é lido direto de `dir_resultados`, sem
+        carregar os modelos (versão None).
+        """
+        atual = self._atual
+        if atual is not None:
+            return atual["relatorios"].get(key, {}).get(nome), atual["versao"]
+
+        target_api = next(target_api for target_api in TARGET_FOLDERS if target_api.lower() == key)
+        log = []
+        relatorios = _ler_relatorios(
+            target_api, {nome: _ler(self.dir_resultados / TARGET_FOLDERS[target_api] / nome)}, log
+        )
+        for nivel, linha in log:
+            logger.log(nivel, linha)
+        return relatorios.get(nome), None
+
+    def descrever(self) -> dict:
+        """Versão publicada, hash de cada arquivo e estado do observador."""
+        atual = self._atual
+        return {
+            "versao": atual["versao"] if atual is not None else None,
+            "carregado_em": atual["carregado_em"] if atual is not None else None,
+            "targets": {key: dados["versao"] for key, dados in atual["artefatos"].items()} if atual is not None else {},
+            "arquivos": dict(atual["arquivos"]) if atual is not None else {},
+            "inferencia_compilada": {
+                key: dados["compilado"].descricao if dados.get("compilado") is not None else None
+                for key, dados in atual["artefatos"].items()
+            } if atual is not None else {},
+            "recargas": self._recargas,
+            "ultimo_erro": self._ultimo_erro,
+            "observador": {
+                "ativo": self._observador is not None and self._observador.is_alive(),
+                "intervalo_s": self._intervalo,
+            },
+        }
+
+
+registro_modelos = RegistroArtefatos(
+    dir_modelos=BASE_DIR / "models",
+    dir_resultados=BASE_DIR / "results",
+    caminho_estado=BASE_DIR / "models" / "preprocessador.pkl",
+    caminho_referencia=BASE_DIR / "data" / "processed" / "dados_processados.parquet",
+)
@@ -0,0 +1,186 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TARGETS = ["Target1", "Target2", "Target3"]
+
+
+def _modelo_aceita_nan(modelo) -> bool:
+    """Descobre se o estimador aceita NaN na entrada (XGBoost, HistGradientBoosting, etc.)."""
+    if type(modelo).__module__.startswith("xgboost"):
+        return True
+    try:
+        return bool(modelo.__sklearn_tags__().input_tags.allow_nan)
+    except Exception:
+        pass
+    try:
+        return bool(modelo._get_tags().get("allow_nan", False))
+    except Exception:
+        return False
+
+
+def _matriz_numerica(df: pd.DataFrame, colunas) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Converte as colunas pedidas para float e devolve também uma máscara (linhas x colunas)
+    marcando os valores que existiam mas não puderam ser convertidos.
+    """
+    originais = df[list(colunas)]
+    numericos = originais.apply(pd.to_numeric, errors='coerce').astype('float64')
+    nao_convertidos = numericos.isna().to_numpy() & originais.notna().to_numpy()
+    return numericos, nao_convertidos
+
+
+def pontuar_lote(df: pd.DataFrame, artefatos: dict, deslocamento: int = 0) -> tuple[pd.DataFrame, np.ndarray, list]:
+    """
+    Faz a previsão dos três targets para TODAS as linhas do DataFrame de uma só vez:
+    um `scaler.transform` e um `modelo.predict` por target, em vez de um por jogador
+    (ou o avaliador compilado do modelo, em `artefatos[key]["compilado"]`, se houver).
+
+    Linhas que não podem ser pontuadas (feature ausente, valor não numérico ou NaN
+    para modelos que não aceitam NaN) são identificadas por uma máscara de validade
+    e registradas em `erros`, sem interromper o restante do lote.
+
+    Retorna:
+        previsoes: DataFrame (mesmo índice de `df`) com uma coluna por target carregado.
+                   Linhas com erro ficam com NaN em todos os targets.
+        validos:   array booleano com as linhas pontuadas com sucesso.
+        erros:     lista de {"codigo_acesso", "erro", "linha"} na ordem das linhas.
+                   `deslocamento` é somado ao número da linha quando `df` é um bloco
+                   de uma planilha maior.
+    """
+    n = len(df)
+    mensagens = np.full(n, None, dtype=object)
+    previsoes = {}
+
+    for target_name in TARGETS:
+        key = target_name.lower()
+        if key not in artefatos:
+            continue
+
+        modelo = artefatos[key]["modelo"]
+        scaler = artefatos[key]["scaler"]
+        features_modelo = list(artefatos[key]["features"])
+        features_scaler = list(scaler.feature_names_in_)
+        valores = np.full(n, np.nan)
+
+        ausentes = [col for col in dict.fromkeys(features_scaler + features_modelo) if col not in df.columns]
+        if ausentes:
+            mensagens[pd.isna(mensagens)] = f"Feature(s) ausente(s) para {target_name}: {ausentes}"
+            previsoes[target_name] = valores
+            continue
+
+        # Scaler aplicado ao lote inteiro; features não escaladas entram como estão
+        set_scaler = set(features_scaler)
+        restantes = [col for col in features_modelo if col not in set_scaler]
+        dados_scaler, invalidos_scaler = _matriz_numerica(df, features_scaler)
+        dados_restantes, invalidos_restantes = _matriz_numerica(df, restantes)
+
+        dados_scaled = pd.DataFrame(scaler.transform(dados_scaler), columns=features_scaler, index=df.index)
+        df_final = pd.concat([dados_scaled, dados_restantes], axis=1)[features_modelo]
+
+        # Máscara de validade: valores não numéricos (e NaN, se o modelo não aceitar)
+        invalidos = np.concatenate([invalidos_scaler, invalidos_restantes], axis=1)
+        colunas_checadas = features_scaler + restantes
+        if not _modelo_aceita_nan(modelo):
+            nulos = df_final.isna().to_numpy()
+            invalidos = np.concatenate([invalidos, nulos], axis=1)
+            colunas_checadas = colunas_checadas + features_modelo
+        linhas_invalidas = invalidos.any(axis=1)
+
+        if linhas_invalidas.any():
+            primeira_coluna = invalidos.argmax(axis=1)
+            for idx in np.flatnonzero(linhas_invalidas & pd.isna(mensagens)):
+                col = colunas_checadas[primeira_coluna[idx]]
+                mensagens[idx] = f"Valor inválido na feature '{col}' ({target_name})"
+
+        validos_target = ~linhas_invalidas
+        if validos_target.any():
+            try:
+                compilado = artefatos[key].get("compilado")
+                if compilado is not None:
+                    valores[validos_target] = compilado.prever(df_final.loc[validos_target].to_numpy(dtype='float64'))
+                else:
+                    valores[validos_target] = modelo.predict(df_final.loc[validos_target])
+            except Exception as e:
+                mensagens[validos_target & pd.isna(mensagens)] = f"Erro no modelo {target_name}: {e}"
+
+        previsoes[target_name] = valores
+
+    validos = pd.isna(mensagens)
+    df_previsoes = pd.DataFrame(previsoes, index=df.index)
+    df_previsoes.loc[~validos] = np.nan
+
+    return df_previsoes, validos, _listar_erros(df, mensagens, validos, deslocamento)
+
+
+def _listar_erros(df: pd.DataFrame, mensagens: np.ndarray, validos: np.ndarray, deslocamento: int) -> list:
+    erros = []
+    if not validos.all():
+        if 'Código de Acesso' in df.columns:
+            codigos = df['Código de Acesso'].to_numpy()
+        else:
+            codigos = np.full(len(df), None, dtype=object)
+        for idx in np.flatnonzero(~validos):
+            codigo = codigos[idx]
+            linha = deslocamento + int(idx) + 1
+            erros.append({
+                "codigo_acesso": codigo if pd.notna(codigo) else f'Jogador_{linha}',
+                "erro": mensagens[idx],
+                "linha": linha
+            })
+    return erros
+
+
+def pontuar_lote_sem_repeticoes(df: pd.DataFrame, artefatos: dict, deslocamento: int = 0) -> tuple[pd.DataFrame, np.ndarray, list]:
+    """
+    `pontuar_lote` pontuando uma única vez cada jogador repetido no lote.
+
+    Linhas com o mesmo Código de Acesso e os mesmos valores em todas as features
+    lidas pelos modelos e scalers têm a mesma previsão: só a primeira ocorrência vai
+    para o predict e o resultado (ou o erro) é replicado para as demais. Linhas com
+    o mesmo código e dados diferentes continuam sendo pontuadas separadamente.
+    O retorno é idêntico ao de `pontuar_lote`.
+    """
+    n = len(df)
+    if 'Código de Acesso' not in df.columns:
+        return pontuar_lote(df, artefatos, deslocamento)
+
+    codigos = df['Código de Acesso']
+    repetidas = np.flatnonzero(codigos.duplicated(keep=False).to_numpy() & codigos.notna().to_numpy())
+    if not len(repetidas):
+        return pontuar_lote(df, artefatos, deslocamento)
+
+    features = [
+        col
+        for dados in artefatos.values()
+        for col in [*dados["scaler"].feature_names_in_, *dados["features"]]
+        if col in df.columns
+    ]
+    chave = list(dict.fromkeys(['Código de Acesso', *features]))
+    # Grupos numerados na ordem de aparição: o primeiro índice de cada grupo é o representante
+    grupos = df.iloc[repetidas].groupby(chave, dropna=False, sort=False).ngroup().to_numpy()
+    _, primeiras = np.unique(grupos, return_index=True)
+    representante = np.arange(n)
+    representante[repetidas] = repetidas[primeiras][grupos]
+
+    unicas = np.flatnonzero(representante == np.arange(n))
+    if len(unicas) == n:
+        return pontuar_lote(df, artefatos, deslocamento)
+
+    previsoes_unicas, validos_unicos, erros_unicos = pontuar_lote(df.iloc[unicas], artefatos)
+    posicao_unica = np.empty(n, dtype=np.intp)
+    posicao_unica[unicas] = np.arange(len(unicas))
+    origem = posicao_unica[representante]
+
+    df_previsoes = pd.DataFrame(
+        previsoes_unicas.to_numpy()[origem], columns=previsoes_unicas.columns, index=df.index
+    )
+    validos = validos_unicos[origem]
+    mensagens_unicas = np.full(len(unicas), None, dtype=object)
+    for erro in erros_unicos:
+        mensagens_unicas[erro["linha"] - 1] = erro["erro"]
+    logger.debug(f"♻️ {n - len(unicas)} linhas repetidas no lote reaproveitaram a previsão da primeira ocorrência")
+    return df_previsoes, validos, _listar_erros(df, mensagens_unicas[origem], validos, deslocamento)
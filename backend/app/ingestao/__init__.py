@@ -0,0 +1,3 @@
+from .leitor import EXTENSOES_SUPORTADAS, MOTOR_EXCEL, ler_planilha, ler_abas_excel
+
+__all__ = ['EXTENSOES_SUPORTADAS', 'MOTOR_EXCEL', 'ler_planilha', 'ler_abas_excel']
@@ -0,0 +1,88 @@
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+# Motor de leitura do Excel: python-calamine (Rust) quando instalado, bem mais rápido
+# que o openpyxl; caso contrário, openpyxl (que o pandas já abre em modo read-only).
+try:
+    import python_calamine  # noqa: F401
+    MOTOR_EXCEL = "calamine"
+except ImportError:
+    MOTOR_EXCEL = "openpyxl"
+
+ABA_PADRAO = 'Session Activities'
+EXTENSOES_EXCEL = ('.xlsx', '.xls')
+EXTENSOES_CSV = ('.csv',)
+EXTENSOES_PARQUET = ('.parquet',)
+EXTENSOES_ARROW = ('.arrow', '.feather', '.ipc')
+EXTENSOES_SUPORTADAS = EXTENSOES_EXCEL + EXTENSOES_CSV + EXTENSOES_PARQUET + EXTENSOES_ARROW
+
+
+def _selecionar(colunas, usecols) -> list | None:
+    if usecols is None:
+        return None
+    return [col for col in colunas if usecols(col)]
+
+
+def _ler_excel(contents: bytes, usecols) -> pd.DataFrame:
+    # Lê apenas a aba de jogadores; as demais abas não são tocadas
+    return pd.read_excel(io.BytesIO(contents), sheet_name=ABA_PADRAO, engine=MOTOR_EXCEL, usecols=usecols)
+
+
+def _ler_csv(contents: bytes, usecols) -> pd.DataFrame:
+    # Aceita tanto o CSV regional exportado pela própria API (';' e decimal ',')
+    # quanto o CSV padrão (',' e decimal '.')
+    primeira_linha = contents[:contents.find(b'\n')] if b'\n' in contents else contents
+    if b';' in primeira_linha:
+        return pd.read_csv(io.BytesIO(contents), sep=';', decimal=',', usecols=usecols)
+    return pd.read_csv(io.BytesIO(contents), usecols=usecols)
+
+
+def _ler_parquet(contents: bytes, usecols) -> pd.DataFrame:
+    colunas = _selecionar(pq.read_schema(io.BytesIO(contents)).names, usecols)
+    return pd.read_parquet(io.BytesIO(contents), columns=colunas)
+
+
+def _ler_arrow(contents: bytes, usecols) -> pd.DataFrame:
+    # Arrow IPC em formato de arquivo (Feather v2), com projeção de colunas na leitura,
+    # ou em formato de stream
+    try:
+        colunas = _selecionar(ipc.open_file(io.BytesIO(contents)).schema.names, usecols)
+        tabela = feather.read_table(io.BytesIO(contents), columns=colunas, use_threads=False)
+    except pa.ArrowInvalid:
+        tabela = ipc.open_stream(io.BytesIO(contents)).read_all()
+        colunas = _selecionar(tabela.column_names, usecols)
+        if colunas is not None:
+            tabela = tabela.select(colunas)
+    return tabela.to_pandas()
+
+
+def ler_planilha(contents: bytes, nome_arquivo: str, usecols=None) -> pd.DataFrame:
+    """
+    Lê os dados brutos de jogadores de um upload. Excel (.xlsx/.xls) é lido apenas na
+    aba 'Session Activities'; CSV, Parquet e Arrow/Feather não passam por parsing de XML.
+
+    `usecols` é um predicado (nome da coluna -> bool) com as colunas realmente
+    necessárias; as demais nem chegam a ser materializadas.
+    """
+    extensao = nome_arquivo.lower()
+    if extensao.endswith(EXTENSOES_EXCEL):
+        return _ler_excel(contents, usecols)
+    if extensao.endswith(EXTENSOES_CSV):
+        return _ler_csv(contents, usecols)
+    if extensao.endswith(EXTENSOES_PARQUET):
+        return _ler_parquet(contents, usecols)
+    if extensao.endswith(EXTENSOES_ARROW):
+        return _ler_arrow(contents, usecols)
+    raise ValueError(f"Formato de arquivo não suportado: {nome_arquivo}")
+
+
+def ler_abas_excel(contents: bytes, abas) -> dict:
+    """Lê somente as abas pedidas que existirem no arquivo (as ausentes ficam fora do dict)."""
+    arquivo = pd.ExcelFile(io.BytesIO(contents), engine=MOTOR_EXCEL)
+    presentes = [aba for aba in abas if aba in arquivo.sheet_names]
+    return {aba: arquivo.parse(aba) for aba in presentes}
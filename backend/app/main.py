@@ -1,10 +1,28 @@
-from fastapi import FastAPI, Request
+import time
+_inicio_importacao = time.perf_counter()
+
+import logging
+
+from fastapi import Depends, FastAPI, Request, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from .routers import analise, upload, previsao, upload_e_prever
 from .core.settings import settings
+from .core.workers import pool_trabalho
+from .core.prontidao import prontidao
+from .core.metricas import metricas, medicao_da_requisicao, server_timing
+from .inference.registro import registro_modelos, versao_da_requisicao
+from .security.auth import get_api_key_operacao
+
+prontidao.registrar_inicio(_inicio_importacao)
+
+logging.basicConfig(
+    level=settings.LOG_NIVEL.upper(),
+    format="%(asctime)s %(levelname)s [%(name)s] %(message)s"
+)
 
 # Configuração do Rate Limiter: 5 requisições por minuto por IP
 limiter = Limiter(key_func=get_remote_address, default_limits=["5/minute"])
@@ -32,16 +50,91 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST"],
     allow_headers=["*"],
+    expose_headers=["X-Versao-Modelos", "Server-Timing"],
 )
 
+@app.middleware("http")
+async def marcar_versao_modelos(request: Request, call_next):
+    """
+    Cabeçalho X-Versao-Modelos em toda resposta: a versão dos modelos que a
+    requisição usou (mesmo que outra tenha sido publicada enquanto ela rodava) ou,
+    se ela não usou modelos, a versão publicada no momento.
+    """
+    marcador = {}
+    token = versao_da_requisicao.set(marcador)
+    try:
+        response = await call_next(request)
+    finally:
+        versao_da_requisicao.reset(token)
+    versao = marcador.get("versao") or registro_modelos.versao
+    if versao:
+        response.headers["X-Versao-Modelos"] = versao
+    return response
+
+@app.middleware("http")
+async def medir_requisicao(request: Request, call_next):
+    """
+    Latência, status e linhas processadas de cada requisição, por rota, para
+    GET /metrics, e cabeçalho Server-Timing com a duração de cada etapa (leitura,
+    pré-processamento, pontuação, serialização...). Nas respostas em streaming, a
+    latência vai até o último byte enviado.
+    """
+    medicao = {"etapas": [], "linhas": 0}
+    token = medicao_da_requisicao.set(medicao)
+    inicio = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        medicao_da_requisicao.reset(token)
+    response.headers["Server-Timing"] = server_timing(medicao["etapas"], time.perf_counter() - inicio)
+
+    rota = getattr(request.scope.get("route"), "path", "desconhecida")
+    corpo = response.body_iterator
+
+    async def corpo_medido():
+        try:
+            async for parte in corpo:
+                yield parte
+        finally:
+            metricas.observar_requisicao(
+                rota, request.method, response.status_code, time.perf_counter() - inicio, medicao["linhas"]
+            )
+
+    response.body_iterator = corpo_medido()
+    return response
+
 app.include_router(analise.router)
 app.include_router(upload.router)
 app.include_router(previsao.router)
 app.include_router(upload_e_prever.router)
 
+@app.on_event("shutdown")
+def encerrar_pool_trabalho():
+    pool_trabalho.encerrar()
+
 @app.get("/", tags=["Root"])
 def read_root():
     """
     Verifica se a API está funcionando.
     """
-    return {"message": "API funcionando"}
\ No newline at end of file
+    return {"message": "API funcionando"}
+
+@app.get("/prontidao", tags=["Root"], dependencies=[Depends(get_api_key_operacao)])
+def verificar_prontidao(response: Response):
+    """
+    Estado de carregamento dos modelos e do dataset e duração de cada fase do
+    cold start (importação, carga por target, plano, aquecimento...).
+    Responde 503 enquanto a API não está pronta para atender.
+    """
+    relatorio = prontidao.relatorio()
+    if not relatorio["pronta"]:
+        response.status_code = 503
+    return relatorio
+
+@app.get("/metrics", tags=["Root"], response_class=PlainTextResponse, dependencies=[Depends(get_api_key_operacao)])
+def exportar_metricas():
+    """
+    Métricas no formato texto do Prometheus: histogramas de latência por endpoint
+    e por etapa e contadores de requisições e de linhas processadas.
+    """
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,3 +1,3 @@
-from .preprocessor import DataPreprocessor
+from .preprocessor import DataPreprocessor, carregar_ou_ajustar_estado
 
-__all__ = ['DataPreprocessor']
\ No newline at end of file
+__all__ = ['DataPreprocessor', 'carregar_ou_ajustar_estado']
\ No newline at end of file
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+# Estatísticas por linha que o kernel sabe calcular
+ESTATISTICAS = ('soma', 'media', 'std', 'min', 'max', 'faltantes', 'excede')
+
+
+def agregar_linhas(valores: np.ndarray, estatisticas: tuple, limite: float | None = None) -> dict:
+    """
+    Kernel de agregação por linha: recebe o bloco numérico de um grupo de colunas
+    (linhas x colunas, float64 ou inteiro) e calcula de uma vez as estatísticas
+    pedidas, reaproveitando a máscara de NaN, a contagem e a soma entre elas.
+
+    A semântica é a do pandas com `axis=1, skipna=True` (pandas.core.nanops),
+    inclusive na ordem das somas quando o grupo tem NaN, para o resultado sair
+    idêntico. Sem nenhum NaN no grupo, o pandas soma na ordem da memória e pode
+    diferir no último dígito; aqui a soma é sempre a da ordem C, que só depende da
+    própria linha:
+    - soma: NaN conta como 0 (linha toda NaN soma 0); inteiros continuam inteiros
+    - media: NaN se a linha não tem nenhum valor
+    - std: ddof=1, em duas passadas; NaN com menos de 2 valores
+    - min/max: NaN se a linha não tem nenhum valor
+    - faltantes: quantidade de NaN da linha
+    - excede: 1 se algum valor da linha é maior que `limite` (NaN não conta)
+    """
+    desconhecidas = set(estatisticas) - set(ESTATISTICAS)
+    if desconhecidas:
+        raise ValueError(f"Estatísticas desconhecidas: {sorted(desconhecidas)}")
+
+    n_colunas = valores.shape[1]
+    resultado = {}
+
+    if valores.dtype.kind == 'i':
+        # Inteiros não têm NaN: soma/min/max ficam inteiros e média/std usam float64
+        contagem = np.float64(n_colunas)
+        if 'soma' in estatisticas or 'media' in estatisticas:
+            soma = valores.sum(axis=1, dtype=np.int64)
+            soma_float = valores.sum(axis=1, dtype=np.float64)
+            if 'soma' in estatisticas:
+                resultado['soma'] = soma
+            if 'media' in estatisticas:
+                resultado['media'] = soma_float / contagem
+        if 'std' in estatisticas:
+            resultado['std'] = _desvio_padrao(valores.astype(np.float64), None, contagem)
+        if 'min' in estatisticas:
+            resultado['min'] = valores.min(axis=1)
+        if 'max' in estatisticas:
+            resultado['max'] = valores.max(axis=1)
+        if 'faltantes' in estatisticas:
+            resultado['faltantes'] = np.zeros(len(valores), dtype=np.int64)
+        if 'excede' in estatisticas:
+            resultado['excede'] = (valores > limite).any(axis=1).astype(int)
+        return resultado
+
+    faltante = np.isnan(valores)
+    n_faltantes = faltante.sum(axis=1)
+    contagem = (n_colunas - n_faltantes).astype(np.float64)
+    vazia = n_faltantes == n_colunas
+
+    # Mesma cópia (ordem C) que o pandas faz antes de somar quando há NaN. Ela é feita
+    # sempre, mesmo sem NaN: somada em ordem C, cada linha é reduzida sozinha, então o
+    # resultado de um jogador não depende das outras linhas do lote (nem do tamanho do bloco)
+    zerado = valores.copy()
+    np.putmask(zerado, faltante, 0)
+
+    if 'soma' in estatisticas or 'media' in estatisticas:
+        soma = zerado.sum(axis=1, dtype=np.float64)
+        if 'soma' in estatisticas:
+            resultado['soma'] = soma
+        if 'media' in estatisticas:
+            with np.errstate(all='ignore'):
+                media = soma / contagem
+            media[vazia] = np.nan
+            resultado['media'] = media
+    if 'std' in estatisticas:
+        resultado['std'] = _desvio_padrao(zerado, faltante, contagem)
+    for nome, preenchimento, reducao in (('min', np.inf, np.min), ('max', -np.inf, np.max)):
+        if nome in estatisticas:
+            extremo = reducao(np.where(faltante, preenchimento, valores), axis=1)
+            extremo[vazia] = np.nan
+            resultado[nome] = extremo
+    if 'faltantes' in estatisticas:
+        resultado['faltantes'] = n_faltantes.astype(np.int64)
+    if 'excede' in estatisticas:
+        resultado['excede'] = (valores > limite).any(axis=1).astype(int)
+    return resultado
+
+
+def _desvio_padrao(zerado: np.ndarray, faltante: np.ndarray | None, contagem) -> np.ndarray:
+    """Desvio padrão amostral (ddof=1) em duas passadas, como nanops.nanvar."""
+    contagem = np.array(contagem, dtype=np.float64, ndmin=1)
+    graus = contagem - 1
+    insuficiente = contagem <= 1
+    if insuficiente.any():
+        contagem = contagem.copy()
+        contagem[insuficiente] = np.nan
+        graus[insuficiente] = np.nan
+
+    media = zerado.sum(axis=1, dtype=np.float64) / contagem
+    quadrados = (media[:, None] - zerado) ** 2
+    if faltante is not None:
+        np.putmask(quadrados, faltante, 0)
+    with np.errstate(all='ignore'):
+        return np.sqrt(quadrados.sum(axis=1, dtype=np.float64) / graus)
+
+
+def agregar_linhas_pandas(grupo: pd.DataFrame, estatisticas: tuple, limite: float | None = None) -> dict:
+    """As mesmas estatísticas calculadas com pandas, uma passada `axis=1` por estatística."""
+    calculos = {
+        'soma': lambda: grupo.sum(axis=1),
+        'media': lambda: grupo.mean(axis=1),
+        'std': lambda: grupo.std(axis=1),
+        'min': lambda: grupo.min(axis=1),
+        'max': lambda: grupo.max(axis=1),
+        'faltantes': lambda: grupo.isnull().sum(axis=1),
+        'excede': lambda: (grupo > limite).any(axis=1).astype(int),
+    }
+    return {nome: calculos[nome]() for nome in estatisticas}
+
+
+def agregar_grupo(grupo: pd.DataFrame, estatisticas: tuple, limite: float | None = None) -> dict:
+    """
+    Estatísticas por linha de um grupo de colunas. Grupos float64/inteiros com linhas
+    passam pelo kernel; os demais (colunas object ou bool que sobraram da limpeza,
+    upload sem linhas) usam o pandas, que já define o resultado nesses casos.
+    """
+    valores = grupo.to_numpy()
+    if len(valores) and (valores.dtype == np.float64 or valores.dtype.kind == 'i'):
+        return agregar_linhas(valores, estatisticas, limite)
+    return agregar_linhas_pandas(grupo, estatisticas, limite)
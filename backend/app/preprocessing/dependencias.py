@@ -0,0 +1,172 @@
+# Predicados da classificação de colunas do DataPreprocessor, compartilhados pelo
+# PlanoColunas (plano_colunas.py), e grafo das features de engenharia, usado para
+# podar o que é lido na ingestão e o que é calculado no pré-processamento
+PADROES_TEXTO = ['Cor', 'Expl', 'Explicação', 'Acordar', ' - ']
+
+
+def eh_texto(col: str) -> bool:
+    return any(pattern in col for pattern in PADROES_TEXTO)
+
+
+def eh_likert(col: str) -> bool:
+    return col.startswith('F07') or (col.startswith('F11') and 'Tempo' not in col and not eh_texto(col))
+
+
+def eh_tempo(col: str) -> bool:
+    return (col.startswith('T') or 'Tempo' in col) and not eh_texto(col)
+
+
+def eh_q04(col: str) -> bool:
+    return col.startswith('Q04')
+
+
+def eh_p(col: str) -> bool:
+    return col.startswith('P') and len(col) > 1 and col[1].isdigit()
+
+
+def eh_qtd(col: str) -> bool:
+    return col.startswith('Qtd')
+
+
+def eh_f07(col: str) -> bool:
+    return col.startswith('F07') and col[3:].isdigit()
+
+
+def eh_f11(col: str) -> bool:
+    return col.startswith('F11') and col[3:].isdigit()
+
+
+# Grafo das features de engenharia: feature -> entradas de que ela depende. Uma
+# entrada é outra feature do grafo, o nome exato de uma coluna bruta ou um predicado
+# sobre os nomes das colunas brutas (grupos como Likert e Tempo)
+GRAFO_FEATURES = {
+    'Idade_Anos': ['F0103'],
+    'Idade_Anos_Sq': ['Idade_Anos'],
+    'Likert_Score_Medio': [eh_likert],
+    'Likert_Score_Std': [eh_likert],
+    'Likert_Score_Min': [eh_likert],
+    'Likert_Score_Max': [eh_likert],
+    'Likert_Missing_Count': [eh_likert],
+    'Tempo_Total': [eh_tempo],
+    'Tempo_Medio': [eh_tempo],
+    'Tempo_Std': [eh_tempo],
+    'Tempo_Min': [eh_tempo],
+    'Tempo_Max': [eh_tempo],
+    'Tem_Timeout': [eh_tempo],
+    'Performance_Score_Total': [eh_q04],
+    'Performance_Score_Medio': [eh_q04],
+    'Respostas_P_Media': [eh_p],
+    'Respostas_P_Std': [eh_p],
+    'Respostas_P_Missing': [eh_p],
+    'Quantidade_Total': [eh_qtd],
+    'Quantidade_Media': [eh_qtd],
+    'Razao_Sono': ['QtdHorasDormi', 'QtdHorasSono'],
+    'Razao_Q0413_Q0414': ['Q0413', 'Q0414'],
+    'Hora_do_Dia': ['Data/Hora Último'],
+    'Dia_da_Semana': ['Data/Hora Último'],
+    'Fim_de_Semana': ['Dia_da_Semana'],
+    'Consistencia_F07': [eh_f07],
+    'Consistencia_F11': [eh_f11],
+    'Eficiencia_Performance': ['Performance_Score_Total', 'Tempo_Total'],
+    'Atitude_Consistente': ['Likert_Score_Medio', 'Consistencia_F07'],
+}
+
+# Fórmulas das features calculadas a partir de outras features, com os argumentos na
+# ordem das entradas do grafo. Valem tanto para Series/arrays (lotes) quanto para
+# floats (um jogador em POST /prever), então as duas rotas não divergem
+FORMULAS_DERIVADAS = {
+    'Eficiencia_Performance': lambda performance_total, tempo_total: performance_total / (tempo_total + 1e-6),
+    'Atitude_Consistente': lambda likert_medio, consistencia_f07: likert_medio * consistencia_f07,
+    'Idade_Anos_Sq': lambda idade: idade ** 2,
+}
+
+
+def colunas_brutas(feature: str) -> list:
+    """Colunas brutas (nomes ou predicados) de que uma feature depende, seguindo o grafo."""
+    if feature not in GRAFO_FEATURES:
+        return [feature]
+    brutas = []
+    for entrada in GRAFO_FEATURES[feature]:
+        if callable(entrada):
+            brutas.append(entrada)
+        else:
+            brutas.extend(colunas_brutas(entrada))
+    return brutas
+
+
+def podar_features(features) -> frozenset:
+    """
+    Features de engenharia que precisam ser calculadas para produzir `features` (as
+    consumidas pelos modelos): as que aparecem na lista mais as features
+    intermediárias de que elas dependem.
+    """
+    necessarias = set()
+    pendentes = [feature for feature in features if feature in GRAFO_FEATURES]
+    while pendentes:
+        feature = pendentes.pop()
+        if feature in necessarias:
+            continue
+        necessarias.add(feature)
+        pendentes.extend(e for e in GRAFO_FEATURES[feature] if not callable(e) and e in GRAFO_FEATURES)
+    return frozenset(necessarias)
+
+
+def campos_de_entrada(consumidas) -> list:
+    """
+    Campos do registro de um jogador que determinam as features `consumidas` em
+    POST /prever: as próprias features consumidas mais as entradas nomeadas das
+    fórmulas de FORMULAS_DERIVADAS que precisam ser calculadas para elas. Dois
+    registros iguais nesses campos produzem as mesmas previsões.
+    """
+    campos = list(consumidas)
+    for feature in podar_features(consumidas):
+        if feature in FORMULAS_DERIVADAS:
+            campos.extend(e for e in GRAFO_FEATURES[feature] if not callable(e))
+    return list(dict.fromkeys(campos))
+
+
+def calcular_derivadas(dados, features=None, obter=None) -> dict:
+    """
+    Calcula as features de FORMULAS_DERIVADAS cujas entradas estão em `dados` (um
+    DataFrame, um dict de um jogador ou um ChainMap das features já criadas), na ordem
+    da tabela. Com `features` (conjunto podado), calcula só as que estão nele.
+    `obter(dados, nome)` lê uma entrada; o padrão é `dados[nome]`.
+    """
+    novas = {}
+    for feature, formula in FORMULAS_DERIVADAS.items():
+        if features is not None and feature not in features:
+            continue
+        entradas = GRAFO_FEATURES[feature]
+        if all(entrada in novas or entrada in dados for entrada in entradas):
+            novas[feature] = formula(*(
+                novas[entrada] if entrada in novas else (obter(dados, entrada) if obter else dados[entrada])
+                for entrada in entradas
+            ))
+    return novas
+
+
+# Colunas sempre lidas: identificação e targets originais
+COLUNAS_SEMPRE_LIDAS = ['Código de Acesso', 'Target1', 'Target2', 'Target3']
+
+
+class FiltroColunas:
+    """
+    Decide se uma coluna bruta da planilha precisa ser lida para produzir as features
+    consumidas pelos modelos. Usado como `usecols` na ingestão (classe, e não lambda,
+    para poder ir ao pool de processos).
+    """
+
+    def __init__(self, features):
+        self.nomes = set(COLUNAS_SEMPRE_LIDAS)
+        predicados = {}
+        for feature in features:
+            for dependencia in colunas_brutas(feature):
+                if callable(dependencia):
+                    predicados[dependencia.__name__] = dependencia
+                else:
+                    self.nomes.add(dependencia)
+        self.predicados = list(predicados.values())
+
+    def __call__(self, col) -> bool:
+        col = str(col)
+        return col in self.nomes or any(predicado(col) for predicado in self.predicados)
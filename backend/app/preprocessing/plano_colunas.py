@@ -0,0 +1,74 @@
+from functools import lru_cache
+
+import numpy as np
+
+from .dependencias import eh_texto, eh_likert, eh_q04, eh_p, eh_qtd, eh_f07, eh_f11
+
+COL_ID = ['Código de Acesso']
+COL_DATETIME = ['Data/Hora Último']
+COL_TARGETS = ['Target1', 'Target2', 'Target3']
+
+# Quantos layouts de planilha diferentes ficam memorizados
+LIMITE_PLANOS = 64
+
+
+class PlanoColunas:
+    """
+    Classificação das colunas de um cabeçalho de upload, compilada uma única vez:
+    colunas descartadas (__EMPTY e targets vazios), grupos Texto/Likert/Tempo/NãoLikert,
+    os grupos de prefixo usados em `criar_features` (Q04, P<dígito>, Qtd, F07, F11)
+    e a posição de cada grupo no cabeçalho limpo, para as etapas seguintes
+    selecionarem as colunas por posição.
+
+    As features criadas são sempre anexadas ao final do DataFrame, então as posições
+    das colunas originais continuam válidas durante todo o pré-processamento.
+    """
+
+    def __init__(self, cabecalho: tuple, descartar: tuple = ()):
+        descartar = set(descartar)
+        self.descartadas = [col for col in cabecalho if '__EMPTY' in str(col) or col in descartar]
+        descartadas = set(self.descartadas)
+        self.colunas = tuple(col for col in cabecalho if col not in descartadas)
+        colunas = self.colunas
+
+        # Mesma classificação (e mesma ordem) de DataPreprocessor._classificar_colunas
+        self.col_texto = [col for col in colunas if eh_texto(col)]
+        texto = set(self.col_texto)
+        self.col_likert = [col for col in colunas if eh_likert(col)]
+        t_cols = [col for col in colunas if col.startswith('T') and col not in texto]
+        tempo_cols = [col for col in colunas if 'Tempo' in col and col not in texto]
+        # Na ordem do cabeçalho: a ordem de um set muda com a semente de hash de cada
+        # processo, e com ela a ordem da soma de Tempo_Total (e o último dígito)
+        tempo = set(t_cols + tempo_cols)
+        self.col_tempo = [col for col in colunas if col in tempo]
+
+        presentes = set(colunas)
+        self.targets_existentes = [col for col in COL_TARGETS if col in presentes]
+        classificadas = set(COL_ID + COL_DATETIME + self.targets_existentes +
+                            self.col_texto + self.col_likert + self.col_tempo)
+        self.col_nao_likert = [col for col in colunas if col not in classificadas]
+
+        # Colunas convertidas para número na limpeza, na ordem do cabeçalho
+        numericas = set(self.col_likert + self.col_tempo + self.col_nao_likert) - texto
+        self.col_numericas = [col for col in colunas if col in numericas]
+
+        self.grupos = {
+            'likert': self.col_likert,
+            'tempo': self.col_tempo,
+            'q04': [col for col in colunas if eh_q04(col)],
+            'p': [col for col in colunas if eh_p(col)],
+            'qtd': [col for col in colunas if eh_qtd(col)],
+            'f07': [col for col in colunas if eh_f07(col)],
+            'f11': [col for col in colunas if eh_f11(col)],
+        }
+        posicao = {col: i for i, col in enumerate(colunas)}
+        self.posicoes = {
+            nome: np.array([posicao[col] for col in grupo], dtype=np.intp)
+            for nome, grupo in self.grupos.items()
+        }
+
+
+@lru_cache(maxsize=LIMITE_PLANOS)
+def plano_colunas(cabecalho: tuple, descartar: tuple = ()) -> PlanoColunas:
+    """Plano memorizado pela tupla de nomes de colunas do upload (e colunas descartadas)."""
+    return PlanoColunas(cabecalho, descartar)
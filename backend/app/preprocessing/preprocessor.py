@@ -1,75 +1,174 @@
+import logging
+import time
+
 import pandas as pd
 import numpy as np
-from sklearn.impute import SimpleImputer
+import joblib
+from collections import ChainMap
 from pathlib import Path
 
+from .agregacao import agregar_grupo
+from .dependencias import calcular_derivadas
+from .plano_colunas import COL_ID, COL_DATETIME, COL_TARGETS, PlanoColunas, plano_colunas
+
+logger = logging.getLogger(__name__)
+
+# Códigos de status que aparecem no lugar da resposta em colunas numéricas
+CODIGOS_STATUS = ['00', '01', '02', '10', '11', '12']
+
 class DataPreprocessor:
     """
     Classe que replica toda a lógica de pré-processamento do notebook.
     ✅ Agora lida corretamente com planilhas SEM colunas Target.
+    
+    Com `modo_pipeline=True`, `processar` trabalha sobre UM buffer próprio, alterado
+    no lugar etapa a etapa (sem o `df.copy()` de cada etapa): as colunas numéricas
+    (Likert, Tempo, NãoLikert) ficam num único bloco float64 contíguo, onde os -1 e
+    a imputação por mediana são aplicados direto em numpy. O resultado é o mesmo
+    do modo padrão.
+    
+    Ajuste/transformação: `fit` calcula as medianas de imputação numa base de
+    referência (o dataset processado do treino) e `transform` aplica o
+    pré-processamento usando apenas esse estado, sem nenhum ajuste no upload;
+    um único jogador passa pelo mesmo caminho de um lote. O estado é salvo com
+    `salvar_estado` e pode ser passado pronto no construtor (`estado=`).
+    Sem estado, `processar` mantém o comportamento original (medianas do lote).
+    
+    Poda: com `features` (ver `dependencias.podar_features`), `criar_features`
+    calcula apenas essas features de engenharia; sem ele, calcula todas.
+    
+    Após `processar`, `tempos` guarda a duração (em segundos) de cada etapa, para as
+    métricas da API (o pré-processamento pode rodar em outro processo).
     """
     
-    def __init__(self):
+    def __init__(self, modo_pipeline: bool = False, estado: dict | None = None, features=None):
+        self.modo_pipeline = modo_pipeline
+        self.estado = estado
+        self.features = frozenset(features) if features is not None else None
+        
         # Classificação de colunas (do seu dicionário de dados)
-        self.col_id = ['Código de Acesso']
-        self.col_datetime = ['Data/Hora Último']
-        self.col_targets = ['Target1', 'Target2', 'Target3']
+        self.col_id = list(COL_ID)
+        self.col_datetime = list(COL_DATETIME)
+        self.col_targets = list(COL_TARGETS)
         
         # Colunas de texto, Likert, Tempo, NãoLikert (serão preenchidas dinamicamente)
         self.col_texto = []
         self.col_likert = []
         self.col_tempo = []
         self.col_nao_likert = []
+        self.plano = None
+        self.tempos = {}
+        self._decisoes = {"targets_vazios": [], "medianas_targets": {}, "dtypes": {}}
+        
+        # Modo pipeline: bloco float64 (linhas x colunas numéricas, ordem Fortran) que
+        # sustenta as colunas numéricas do buffer de trabalho
+        self._bloco = None
+        self._posicao_bloco = {}
     
-    def _classificar_colunas(self, df: pd.DataFrame):
-        """Classifica todas as colunas do DataFrame."""
-        # Colunas de texto (cores, explicações)
-        self.col_texto = []
-        for col in df.columns:
-            if any(pattern in col for pattern in ['Cor', 'Expl', 'Explicação', 'Acordar', ' - ']):
-                self.col_texto.append(col)
-        
-        # Colunas Likert
-        self.col_likert = [col for col in df.columns if col.startswith('F07') or 
-                          (col.startswith('F11') and 'Tempo' not in col and col not in self.col_texto)]
-        
-        # Colunas de Tempo
-        self.col_tempo = []
-        t_cols = [col for col in df.columns if col.startswith('T') and col not in self.col_texto]
-        tempo_cols = [col for col in df.columns if 'Tempo' in col and col not in self.col_texto]
-        self.col_tempo = list(set(t_cols + tempo_cols))
-        
-        # ✅ CRÍTICO: Filtrar apenas os targets que REALMENTE existem no DataFrame
-        targets_existentes = [col for col in self.col_targets if col in df.columns]
+    def _classificar_colunas(self, colunas, descartar=()) -> PlanoColunas:
+        """
+        Classifica todas as colunas. O plano é memorizado pela tupla de nomes do
+        cabeçalho: uploads com o mesmo layout não repetem a classificação.
+        """
+        self.plano = plano_colunas(tuple(colunas), tuple(descartar))
+        self.col_texto = list(self.plano.col_texto)
+        self.col_likert = list(self.plano.col_likert)
+        self.col_tempo = list(self.plano.col_tempo)
+        self.col_nao_likert = list(self.plano.col_nao_likert)
+        return self.plano
+    
+    def _montar_buffer(self, df: pd.DataFrame, descartar) -> pd.DataFrame:
+        """
+        Modo pipeline da limpeza: monta o buffer de trabalho a partir do upload (que
+        não é alterado). As colunas numéricas são convertidas direto para o bloco
+        float64; as demais recebem a mesma conversão de `limpar_dados` e são
+        inseridas nas suas posições originais.
+        """
+        plano = self._classificar_colunas(df.columns, descartar)
+        colunas = plano.colunas
+        col_texto = set(plano.col_texto)
+        candidatas = plano.col_numericas
+        
+        bloco = np.empty((len(df), len(candidatas)), dtype='float64', order='F')
+        colunas_bloco = []
+        convertidas = {}
+        for col in candidatas:
+            serie = pd.to_numeric(df[col], errors='coerce')
+            if serie.dtype in ['float64', 'int64']:
+                bloco[:, len(colunas_bloco)] = serie.to_numpy(dtype='float64', na_value=np.nan)
+                colunas_bloco.append(col)
+            else:
+                # Ex.: booleanos, que o modo padrão mantém com o próprio dtype
+                convertidas[col] = serie
+        
+        # Fatiar as primeiras colunas de um array Fortran não copia
+        self._bloco = bloco[:, :len(colunas_bloco)]
+        self._posicao_bloco = {col: j for j, col in enumerate(colunas_bloco)}
+        df_clean = pd.DataFrame(self._bloco, index=df.index, columns=colunas_bloco, copy=False)
+        
+        for posicao, col in enumerate(colunas):
+            if col in self._posicao_bloco:
+                continue
+            serie = convertidas.get(col, df[col])
+            if col == 'Data/Hora Último':
+                serie = self._converter_data(serie)
+            elif col in self.col_targets and col not in col_texto:
+                serie = pd.to_numeric(serie, errors='coerce')
+            if col in col_texto:
+                serie = serie.fillna('N/A').astype(str)
+            df_clean.insert(posicao, col, serie)
         
-        # Colunas NãoLikert (o que sobrou)
-        todas_classificadas = (self.col_id + self.col_datetime + targets_existentes + 
-                              self.col_texto + self.col_likert + self.col_tempo)
-        self.col_nao_likert = [col for col in df.columns if col not in todas_classificadas]
+        return df_clean
+    
+    def _posicoes_no_bloco(self, df: pd.DataFrame, colunas) -> list | None:
+        """
+        Posições das colunas no bloco float64, se TODAS ainda forem sustentadas por ele
+        (e podem ser alteradas direto em numpy); senão None.
+        """
+        if self._bloco is None:
+            return None
+        posicoes = []
+        for col in colunas:
+            j = self._posicao_bloco.get(col)
+            if j is None or not np.may_share_memory(df[col].to_numpy(), self._bloco[:, j]):
+                return None
+            posicoes.append(j)
+        return posicoes
+    
+    def _converter_data(self, serie: pd.Series) -> pd.Series:
+        """
+        Sem estado ajustado, o formato da data é inferido do primeiro valor do lote
+        (comportamento original). Com estado, a ordem dia/mês vem da referência, para
+        que '03/09/2025' seja a mesma data sozinho ou no meio de um lote.
+        """
+        if self.estado is None:
+            return pd.to_datetime(serie, errors='coerce')
+        return pd.to_datetime(serie, errors='coerce', dayfirst=self.estado.get("data_dayfirst", True))
     
-    def limpar_dados(self, df: pd.DataFrame) -> pd.DataFrame:
+    def limpar_dados(self, df: pd.DataFrame, copiar: bool = True, descartar=()) -> pd.DataFrame:
         """Remove colunas vazias e converte tipos de dados."""
-        df_clean = df.copy()
+        if not copiar:
+            return self._montar_buffer(df, descartar)
         
-        # Remover colunas __EMPTY
-        cols_to_drop = [col for col in df_clean.columns if '__EMPTY' in str(col)]
-        df_clean = df_clean.drop(columns=cols_to_drop, errors='ignore')
+        df_clean = df.copy()
         
         # Classificar colunas
-        self._classificar_colunas(df_clean)
+        plano = self._classificar_colunas(df_clean.columns, descartar)
+        
+        # Remover colunas __EMPTY (e as colunas descartadas por `processar`)
+        if plano.descartadas:
+            df_clean = df_clean.drop(columns=plano.descartadas, errors='ignore')
         
         # Converter Data/Hora
         if 'Data/Hora Último' in df_clean.columns:
-            df_clean['Data/Hora Último'] = pd.to_datetime(df_clean['Data/Hora Último'], errors='coerce')
+            df_clean['Data/Hora Último'] = self._converter_data(df_clean['Data/Hora Último'])
         
         # ✅ MUDANÇA: Converter apenas os targets que EXISTEM
-        targets_existentes = [col for col in self.col_targets if col in df_clean.columns]
+        targets_numericos = [col for col in plano.targets_existentes if col not in plano.col_texto]
         
         # Converter colunas numéricas
-        colunas_numericas = self.col_likert + self.col_tempo + self.col_nao_likert + targets_existentes
-        for col in colunas_numericas:
-            if col in df_clean.columns and col not in self.col_texto:
-                df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
+        for col in plano.col_numericas + targets_numericos:
+            df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
         
         # Garantir que colunas de texto sejam strings
         for col in self.col_texto:
@@ -78,134 +177,227 @@ class DataPreprocessor:
         
         return df_clean
     
-    def tratar_valores_especiais(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Substitui valores especiais por NaN."""
-        df_treated = df.copy()
-        
-        # Substituir 'N/A' por NaN (usando método correto para evitar warning)
-        df_treated = df_treated.replace('N/A', np.nan)
-        df_treated = df_treated.infer_objects(copy=False)  # ✅ Evita FutureWarning
-        
-        # Substituir -1, -1.0 e códigos de status por NaN
-        for col in self.col_likert + self.col_tempo + self.col_nao_likert:
-            if col in df_treated.columns:
+    def tratar_valores_especiais(self, df: pd.DataFrame, copiar: bool = True) -> pd.DataFrame:
+        """
+        Substitui valores especiais por NaN, com poucas operações vetorizadas:
+        1. 'N/A' nas colunas não numéricas, numa única passada
+        2. -1 e -1.0 nas colunas numéricas (Likert, Tempo, NãoLikert), numa única
+           máscara sobre o bloco float64
+        3. -1 e códigos de status nas colunas object desses grupos, de uma vez
+        """
+        df_treated = df.copy() if copiar else df
+        colunas_grupos = list(dict.fromkeys(
+            col for col in self.col_likert + self.col_tempo + self.col_nao_likert if col in df_treated.columns
+        ))
+        
+        # No modo pipeline, o bloco do buffer já contém as colunas numéricas dos grupos
+        posicoes = None if copiar else self._posicoes_no_bloco(df_treated, list(self._posicao_bloco))
+        colunas_bloco = set(self._posicao_bloco) if posicoes is not None else set()
+        
+        # 1. Substituir 'N/A' por NaN (colunas numéricas não têm texto)
+        demais = [
+            col for col in df_treated.columns
+            if col not in colunas_bloco and not pd.api.types.is_numeric_dtype(df_treated[col])
+        ]
+        if demais:
+            df_treated[demais] = df_treated[demais].replace('N/A', np.nan).infer_objects()
+        
+        # 2. Substituir -1 e -1.0 por NaN em todas as colunas numéricas de uma vez
+        if colunas_bloco:
+            self._bloco[self._bloco == -1] = np.nan
+        else:
+            numericas = [col for col in colunas_grupos if df_treated[col].dtype in ['float64', 'int64']]
+            if numericas:
+                bloco = df_treated[numericas].to_numpy(dtype='float64', copy=True)
+                bloco[bloco == -1] = np.nan
+                df_treated[numericas] = bloco
+                colunas_bloco = set(numericas)
+        
+        # 3. Colunas object dos grupos: -1 e códigos de status viram NaN, depois número
+        objetos = [col for col in colunas_grupos if col not in colunas_bloco and df_treated[col].dtype == 'object']
+        if objetos:
+            valores = df_treated[objetos]
+            valores = valores.mask(valores.isin([-1] + CODIGOS_STATUS))
+            df_treated[objetos] = valores.apply(pd.to_numeric, errors='coerce')
+        
+        # Demais dtypes (ex.: str, int32, float32) seguem coluna a coluna
+        for col in colunas_grupos:
+            if col not in colunas_bloco and col not in objetos:
                 df_treated.loc[df_treated[col] == -1, col] = np.nan
-                df_treated.loc[df_treated[col] == -1.0, col] = np.nan
-                
-                if df_treated[col].dtype == 'object':
-                    df_treated.loc[df_treated[col].isin(['00', '01', '02', '10', '11', '12']), col] = np.nan
-                    df_treated[col] = pd.to_numeric(df_treated[col], errors='coerce')
         
         return df_treated
     
-    def criar_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Cria todas as features de engenharia."""
-        df_featured = df.copy()
+    def criar_features(self, df: pd.DataFrame, copiar: bool = True) -> pd.DataFrame:
+        """
+        Cria todas as features de engenharia.
+        
+        As estatísticas por linha de cada grupo (Likert, Tempo, Q04, P, Qtd, F07, F11)
+        saem de `agregar_grupo`, que lê o bloco numérico do grupo uma única vez; as
+        features novas são montadas num dict e escritas no DataFrame de uma vez só,
+        no fim, na mesma ordem de antes. O DataFrame recebido nunca é alterado.
+        
+        Com `features` (conjunto podado em `podar_features`), só as features de
+        engenharia que estão nele são calculadas, e só as estatísticas que elas usam.
+        """
+        # Grupos de colunas vêm do plano memorizado, selecionados por posição
+        plano = self.plano if self.plano is not None else self._classificar_colunas(df.columns)
+        def grupo(nome):
+            return df.iloc[:, plano.posicoes[nome]]
+        
+        # Com o conjunto podado, só as features que os modelos consomem (e suas dependências)
+        def precisa(feature):
+            return self.features is None or feature in self.features
+        
+        novas = {}
+        def agregar(nome_grupo, estatisticas, limite=None):
+            pedidas = {feature: estatistica for feature, estatistica in estatisticas.items() if precisa(feature)}
+            if pedidas:
+                valores = agregar_grupo(grupo(nome_grupo), tuple(dict.fromkeys(pedidas.values())), limite)
+                for feature, estatistica in pedidas.items():
+                    novas[feature] = valores[estatistica]
         
         # 1. Features de Idade
-        if 'F0103' in df_featured.columns:
-            df_featured['Idade_Anos'] = df_featured['F0103'] * (84 - 53) + 53
+        if 'F0103' in df.columns and precisa('Idade_Anos'):
+            novas['Idade_Anos'] = df['F0103'] * (84 - 53) + 53
         
         # 2. Features Agregadas de Likert
-        likert_cols_valid = [col for col in self.col_likert if col in df_featured.columns]
-        if likert_cols_valid:
-            df_featured['Likert_Score_Medio'] = df_featured[likert_cols_valid].mean(axis=1)
-            df_featured['Likert_Score_Std'] = df_featured[likert_cols_valid].std(axis=1)
-            df_featured['Likert_Score_Min'] = df_featured[likert_cols_valid].min(axis=1)
-            df_featured['Likert_Score_Max'] = df_featured[likert_cols_valid].max(axis=1)
-            df_featured['Likert_Missing_Count'] = df_featured[likert_cols_valid].isnull().sum(axis=1)
+        if plano.grupos['likert']:
+            agregar('likert', {
+                'Likert_Score_Medio': 'media',
+                'Likert_Score_Std': 'std',
+                'Likert_Score_Min': 'min',
+                'Likert_Score_Max': 'max',
+                'Likert_Missing_Count': 'faltantes',
+            })
         
         # 3. Features de Tempo
-        tempo_cols_valid = [col for col in self.col_tempo if col in df_featured.columns]
-        if tempo_cols_valid:
-            df_featured['Tempo_Total'] = df_featured[tempo_cols_valid].sum(axis=1)
-            df_featured['Tempo_Medio'] = df_featured[tempo_cols_valid].mean(axis=1)
-            df_featured['Tempo_Std'] = df_featured[tempo_cols_valid].std(axis=1)
-            df_featured['Tempo_Min'] = df_featured[tempo_cols_valid].min(axis=1)
-            df_featured['Tempo_Max'] = df_featured[tempo_cols_valid].max(axis=1)
-            df_featured['Tem_Timeout'] = (df_featured[tempo_cols_valid] > 300).any(axis=1).astype(int)
+        if plano.grupos['tempo']:
+            agregar('tempo', {
+                'Tempo_Total': 'soma',
+                'Tempo_Medio': 'media',
+                'Tempo_Std': 'std',
+                'Tempo_Min': 'min',
+                'Tempo_Max': 'max',
+                'Tem_Timeout': 'excede',
+            }, limite=300)
         
         # 4. Features de Performance (Q04XX)
-        q04_cols = [col for col in df_featured.columns if col.startswith('Q04')]
-        if q04_cols:
-            df_featured['Performance_Score_Total'] = df_featured[q04_cols].sum(axis=1)
-            df_featured['Performance_Score_Medio'] = df_featured[q04_cols].mean(axis=1)
+        if plano.grupos['q04']:
+            agregar('q04', {'Performance_Score_Total': 'soma', 'Performance_Score_Medio': 'media'})
         
         # 5. Features de Perguntas P
-        p_cols = [col for col in df_featured.columns if col.startswith('P') and len(col) > 1 and col[1].isdigit()]
-        if p_cols:
-            df_featured['Respostas_P_Media'] = df_featured[p_cols].mean(axis=1)
-            df_featured['Respostas_P_Std'] = df_featured[p_cols].std(axis=1)
-            df_featured['Respostas_P_Missing'] = df_featured[p_cols].isnull().sum(axis=1)
+        if plano.grupos['p']:
+            agregar('p', {'Respostas_P_Media': 'media', 'Respostas_P_Std': 'std', 'Respostas_P_Missing': 'faltantes'})
         
         # 6. Features de Quantidade
-        qtd_cols = [col for col in df_featured.columns if col.startswith('Qtd')]
-        if qtd_cols:
-            df_featured['Quantidade_Total'] = df_featured[qtd_cols].sum(axis=1)
-            df_featured['Quantidade_Media'] = df_featured[qtd_cols].mean(axis=1)
+        if plano.grupos['qtd']:
+            agregar('qtd', {'Quantidade_Total': 'soma', 'Quantidade_Media': 'media'})
         
         # 7. Features de Razão
-        if 'QtdHorasDormi' in df_featured.columns and 'QtdHorasSono' in df_featured.columns:
-            df_featured['Razao_Sono'] = df_featured['QtdHorasDormi'] / (df_featured['QtdHorasSono'] + 1e-6)
+        if 'QtdHorasDormi' in df.columns and 'QtdHorasSono' in df.columns and precisa('Razao_Sono'):
+            novas['Razao_Sono'] = df['QtdHorasDormi'] / (df['QtdHorasSono'] + 1e-6)
         
-        if 'Q0413' in df_featured.columns and 'Q0414' in df_featured.columns:
-            df_featured['Razao_Q0413_Q0414'] = df_featured['Q0413'] / (df_featured['Q0414'] + 1e-6)
+        if 'Q0413' in df.columns and 'Q0414' in df.columns and precisa('Razao_Q0413_Q0414'):
+            novas['Razao_Q0413_Q0414'] = df['Q0413'] / (df['Q0414'] + 1e-6)
         
         # 8. Features Temporais
-        if 'Data/Hora Último' in df_featured.columns:
-            df_featured['Hora_do_Dia'] = df_featured['Data/Hora Último'].dt.hour
-            df_featured['Dia_da_Semana'] = df_featured['Data/Hora Último'].dt.dayofweek
-            df_featured['Fim_de_Semana'] = (df_featured['Dia_da_Semana'] >= 5).astype(int)
+        if 'Data/Hora Último' in df.columns:
+            if precisa('Hora_do_Dia'):
+                novas['Hora_do_Dia'] = df['Data/Hora Último'].dt.hour
+            if precisa('Dia_da_Semana'):
+                novas['Dia_da_Semana'] = df['Data/Hora Último'].dt.dayofweek
+            if precisa('Fim_de_Semana'):
+                novas['Fim_de_Semana'] = (novas['Dia_da_Semana'] >= 5).astype(int)
         
         # 9. Features de Consistência
-        f07_cols = [col for col in df_featured.columns if col.startswith('F07') and col[3:].isdigit()]
-        if f07_cols:
-            df_featured['Consistencia_F07'] = df_featured[f07_cols].std(axis=1)
+        if plano.grupos['f07']:
+            agregar('f07', {'Consistencia_F07': 'std'})
         
-        f11_cols = [col for col in df_featured.columns if col.startswith('F11') and col[3:].isdigit()]
-        if f11_cols:
-            df_featured['Consistencia_F11'] = df_featured[f11_cols].std(axis=1)
+        if plano.grupos['f11']:
+            agregar('f11', {'Consistencia_F11': 'std'})
         
         # ========== FEATURES ESPECIALIZADAS (CRÍTICAS PARA OS MODELOS) ==========
-        # Feature 1: Razão de Eficiência (Performance por Tempo)
-        if 'Performance_Score_Total' in df_featured.columns and 'Tempo_Total' in df_featured.columns:
-            df_featured['Eficiencia_Performance'] = (
-                df_featured['Performance_Score_Total'] / (df_featured['Tempo_Total'] + 1e-6)
-            )
-        
-        # Feature 2: Interação entre Atitude e Consistência
-        if 'Likert_Score_Medio' in df_featured.columns and 'Consistencia_F07' in df_featured.columns:
-            df_featured['Atitude_Consistente'] = (
-                df_featured['Likert_Score_Medio'] * df_featured['Consistencia_F07']
-            )
-        
-        # Feature 3: Idade ao Quadrado (Feature Polinomial)
-        if 'Idade_Anos' in df_featured.columns:
-            df_featured['Idade_Anos_Sq'] = df_featured['Idade_Anos'] ** 2
+        # Razão de Eficiência, Interação Atitude x Consistência e Idade ao Quadrado:
+        # fórmulas do grafo de features, as mesmas usadas por POST /prever
+        novas.update(calcular_derivadas(ChainMap(novas, df), self.features))
         
+        return self._anexar_features(df, novas)
+    
+    @staticmethod
+    def _anexar_features(df: pd.DataFrame, novas: dict) -> pd.DataFrame:
+        """
+        Escreve as features criadas com um único concat (sem cópia das colunas
+        existentes). Uma feature que já veio no upload é sobrescrita na posição dela,
+        como fazia a atribuição coluna a coluna.
+        """
+        novas = {nome: np.asarray(valores) for nome, valores in novas.items()}
+        existentes = {nome: novas.pop(nome) for nome in list(novas) if nome in df.columns}
+        
+        df_featured = pd.concat([df, pd.DataFrame(novas, index=df.index)], axis=1)
+        for nome, valores in existentes.items():
+            df_featured[nome] = valores
         return df_featured
     
-    def imputar_missing_values(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _imputar_mediana(self, df: pd.DataFrame, colunas: list, grupo: str, copiar: bool):
+        """
+        Imputa a mediana de cada coluna do grupo. No modo pipeline, se o grupo inteiro
+        está no bloco float64, preenche os NaN no próprio bloco; como o SimpleImputer,
+        uma coluna sem nenhum valor faz o grupo inteiro ficar sem imputação.
+        Com estado ajustado, usa as medianas da referência (nada é ajustado no lote).
+        """
+        posicoes = None if copiar else self._posicoes_no_bloco(df, colunas)
+        if self.estado is not None:
+            self._imputar_mediana_ajustada(df, colunas, grupo, posicoes)
+            return
+        
+        if posicoes is None:
+            # Import adiado: carregar o sklearn custa mais de 1 s no start da API
+            from sklearn.impute import SimpleImputer
+            try:
+                imputer = SimpleImputer(strategy='median')
+                df[colunas] = imputer.fit_transform(df[colunas])
+            except Exception as e:
+                logger.warning(f"  ⚠️ Erro ao imputar {grupo}: {e}")
+            return
+        
+        faltantes = [np.isnan(self._bloco[:, j]) for j in posicoes]
+        vazias = [col for col, falta in zip(colunas, faltantes) if falta.all()]
+        if vazias:
+            logger.warning(f"  ⚠️ Erro ao imputar {grupo}: colunas sem nenhum valor {vazias}")
+            return
+        for j, falta in zip(posicoes, faltantes):
+            if falta.any():
+                coluna = self._bloco[:, j]
+                coluna[falta] = np.median(coluna[~falta])
+    
+    def _imputar_mediana_ajustada(self, df: pd.DataFrame, colunas: list, grupo: str, posicoes: list | None):
+        medianas = self.estado["medianas"]
+        sem_mediana = [col for col in colunas if col not in medianas]
+        if sem_mediana:
+            logger.warning(f"  ⚠️ {grupo}: colunas sem mediana ajustada (ficam com NaN): {sem_mediana}")
+        
+        for i, col in enumerate(colunas):
+            if col not in medianas:
+                continue
+            if posicoes is not None:
+                coluna = self._bloco[:, posicoes[i]]
+                coluna[np.isnan(coluna)] = medianas[col]
+            else:
+                df[col] = df[col].astype('float64').fillna(medianas[col])
+    
+    def imputar_missing_values(self, df: pd.DataFrame, copiar: bool = True) -> pd.DataFrame:
         """Imputa valores ausentes usando estratégias apropriadas."""
-        df_imputed = df.copy()
+        df_imputed = df.copy() if copiar else df
         
         # Imputar Likert com mediana
         likert_to_impute = [col for col in self.col_likert if col in df_imputed.columns]
         if likert_to_impute:
-            try:
-                imputer = SimpleImputer(strategy='median')
-                df_imputed[likert_to_impute] = imputer.fit_transform(df_imputed[likert_to_impute])
-            except Exception as e:
-                print(f"  ⚠️ Erro ao imputar Likert: {e}")
+            self._imputar_mediana(df_imputed, likert_to_impute, "Likert", copiar)
         
         # Imputar Tempo com mediana
         tempo_to_impute = [col for col in self.col_tempo if col in df_imputed.columns]
         if tempo_to_impute:
-            try:
-                imputer = SimpleImputer(strategy='median')
-                df_imputed[tempo_to_impute] = imputer.fit_transform(df_imputed[tempo_to_impute])
-            except Exception as e:
-                print(f"  ⚠️ Erro ao imputar Tempo: {e}")
+            self._imputar_mediana(df_imputed, tempo_to_impute, "Tempo", copiar)
         
         # Imputar NãoLikert com mediana (EXCLUINDO os Targets)
         targets_existentes = [col for col in self.col_targets if col in df_imputed.columns]
@@ -216,11 +408,7 @@ class DataPreprocessor:
             and df_imputed[col].dtype in ['float64', 'int64']
         ]
         if naolikert_to_impute:
-            try:
-                imputer = SimpleImputer(strategy='median')
-                df_imputed[naolikert_to_impute] = imputer.fit_transform(df_imputed[naolikert_to_impute])
-            except Exception as e:
-                print(f"  ⚠️ Erro ao imputar NãoLikert: {e}")
+            self._imputar_mediana(df_imputed, naolikert_to_impute, "NãoLikert", copiar)
         
         # Preencher texto com 'UNKNOWN'
         texto_to_fill = [col for col in self.col_texto if col in df_imputed.columns]
@@ -231,58 +419,101 @@ class DataPreprocessor:
         for target in targets_existentes:
             try:
                 if df_imputed[target].isnull().any():
-                    # Calcular mediana apenas dos valores não-nulos
-                    mediana = df_imputed[target].median()
+                    # Mediana dos valores não-nulos da planilha inteira (ver `decidir_planilha`)
+                    mediana = self._decisoes["medianas_targets"].get(target, df_imputed[target].median())
                     if pd.notna(mediana):
                         df_imputed[target].fillna(mediana, inplace=True)
                     else:
                         # Se todos são NaN, preencher com 0
                         df_imputed[target].fillna(0, inplace=True)
-                    print(f"  ✓ Target '{target}' imputado (mediana: {mediana})")
+                    logger.debug(f"  ✓ Target '{target}' imputado (mediana: {mediana})")
             except Exception as e:
-                print(f"  ⚠️ Erro ao imputar {target}: {e}")
+                logger.warning(f"  ⚠️ Erro ao imputar {target}: {e}")
                 df_imputed[target].fillna(0, inplace=True)
         
         return df_imputed
     
-    def processar(self, df: pd.DataFrame) -> pd.DataFrame:
+    def decidir_planilha(self, df: pd.DataFrame) -> dict:
+        """
+        Decisões do pré-processamento que dependem da planilha inteira, e não de cada
+        linha: quais targets estão totalmente vazios (e são descartados), a mediana
+        de cada target e o dtype final das colunas cujo dtype depende dos dados
+        (targets inteiros sem ausentes, hora/dia da semana sem datas inválidas).
+        
+        `processar` calcula essas decisões no próprio lote; para processar uma
+        planilha em blocos com o mesmo resultado do lote inteiro, elas são
+        calculadas uma vez na planilha inteira e passadas a cada bloco.
+        """
+        decisoes = {"targets_vazios": [], "medianas_targets": {}, "dtypes": {}}
+        
+        # ✅ CRÍTICO: Se targets existem mas estão TODOS vazios, remover
+        if all(col in df.columns for col in self.col_targets):
+            decisoes["targets_vazios"] = [target for target in self.col_targets if df[target].isnull().all()]
+        
+        for target in self.col_targets:
+            if target in df.columns and target not in decisoes["targets_vazios"]:
+                valores = pd.to_numeric(df[target], errors='coerce')
+                decisoes["dtypes"][target] = valores.dtype
+                # Os Target* começam com 'T' e entram no grupo Tempo: o -1 vira NaN antes da imputação
+                decisoes["medianas_targets"][target] = valores.mask(valores == -1).median()
+        
+        # Sem nenhuma data inválida, .dt.hour/.dt.dayofweek são inteiros; com alguma, float
+        if 'Data/Hora Último' in df.columns:
+            tipo = self._converter_data(df['Data/Hora Último']).dt.hour.dtype
+            decisoes["dtypes"].update({'Hora_do_Dia': tipo, 'Dia_da_Semana': tipo})
+        
+        return decisoes
+    
+    def processar(self, df: pd.DataFrame, decisoes: dict | None = None) -> pd.DataFrame:
         """
         Método principal que executa todo o pipeline de pré-processamento.
         ✅ Agora lida corretamente com planilhas SEM colunas Target.
+        
+        `decisoes` (ver `decidir_planilha`) vêm da planilha inteira quando `df` é um
+        bloco dela; sem elas, são calculadas no próprio `df`.
         """
-        print("🔄 Iniciando pré-processamento...")
+        logger.info("🔄 Iniciando pré-processamento...")
+        self.tempos = {}
+        if decisoes is None:
+            decisoes = self.decidir_planilha(df)
+        self._decisoes = decisoes
         
         # ✅ NOVO: Detectar se os targets existem ANTES de processar
         tem_targets = all(col in df.columns for col in self.col_targets)
-        print(f"  📊 Targets na planilha: {'SIM' if tem_targets else 'NÃO'}")
+        logger.debug(f"  📊 Targets na planilha: {'SIM' if tem_targets else 'NÃO'}")
         
-        # ✅ CRÍTICO: Se targets existem mas estão TODOS vazios, remover
-        if tem_targets:
-            targets_totalmente_vazios = []
-            for target in self.col_targets:
-                if df[target].isnull().all():
-                    targets_totalmente_vazios.append(target)
-            
-            if targets_totalmente_vazios:
-                print(f"  ⚠️ Targets totalmente vazios detectados: {targets_totalmente_vazios}")
-                df = df.drop(columns=targets_totalmente_vazios)
-                tem_targets = False  # Tratar como se não tivesse targets
+        targets_totalmente_vazios = list(decisoes["targets_vazios"])
+        if tem_targets and targets_totalmente_vazios:
+            logger.warning(f"  ⚠️ Targets totalmente vazios detectados: {targets_totalmente_vazios}")
+            tem_targets = False  # Tratar como se não tivesse targets
+        
+        # No modo pipeline a limpeza monta o buffer de trabalho e as etapas seguintes o
+        # alteram no lugar; no modo padrão cada etapa trabalha sobre uma cópia
+        copiar = not self.modo_pipeline
         
         # 1. Limpeza inicial
-        df_clean = self.limpar_dados(df)
-        print(f"  ✓ Limpeza concluída: {df_clean.shape}")
+        inicio = time.perf_counter()
+        df_clean = self.limpar_dados(df, copiar=copiar, descartar=targets_totalmente_vazios)
+        self.tempos["limpeza"] = time.perf_counter() - inicio
+        logger.debug(f"  ✓ Limpeza concluída: {df_clean.shape}")
         
         # 2. Tratar valores especiais
-        df_treated = self.tratar_valores_especiais(df_clean)
-        print(f"  ✓ Valores especiais tratados")
+        inicio = time.perf_counter()
+        df_treated = self.tratar_valores_especiais(df_clean, copiar=copiar)
+        self.tempos["valores_especiais"] = time.perf_counter() - inicio
+        logger.debug(f"  ✓ Valores especiais tratados")
         
         # 3. Criar features
-        df_featured = self.criar_features(df_treated)
-        print(f"  ✓ Features criadas: {df_featured.shape}")
+        inicio = time.perf_counter()
+        df_featured = self.criar_features(df_treated, copiar=copiar)
+        self.tempos["features"] = time.perf_counter() - inicio
+        logger.debug(f"  ✓ Features criadas: {df_featured.shape}")
         
         # 4. Imputar missing values
-        df_final = self.imputar_missing_values(df_featured)
-        print(f"  ✓ Missing values imputados")
+        inicio = time.perf_counter()
+        df_final = self.imputar_missing_values(df_featured, copiar=copiar)
+        self.tempos["imputacao"] = time.perf_counter() - inicio
+        logger.debug(f"  ✓ Missing values imputados ({'medianas ajustadas' if self.estado is not None else 'medianas do lote'})")
         
         # ✅ NOVO: Se os targets NÃO existiam, criar colunas vazias para eles
         # (Isso evita erros no endpoint ao tentar adicionar previsões)
@@ -290,7 +521,87 @@ class DataPreprocessor:
             for target in self.col_targets:
                 if target not in df_final.columns:
                     df_final[target] = None
-            print(f"  ✓ Colunas de Target criadas (vazias)")
+            logger.debug(f"  ✓ Colunas de Target criadas (vazias)")
+        
+        # Um bloco sem ausentes numa coluna que os tem em outra parte da planilha
+        # sai com o dtype da planilha inteira (ex.: float64 em vez de int64)
+        for col, tipo in decisoes["dtypes"].items():
+            if col in df_final.columns and df_final[col].dtype != tipo:
+                df_final[col] = df_final[col].astype(tipo)
         
-        print(f"✅ Pré-processamento concluído! Shape final: {df_final.shape}")
-        return df_final
\ No newline at end of file
+        logger.info(f"✅ Pré-processamento concluído! Shape final: {df_final.shape}")
+        return df_final
+    
+    def fit(self, df: pd.DataFrame) -> "DataPreprocessor":
+        """
+        Ajusta o estado do pré-processamento numa base de referência: a mediana de
+        cada coluna Likert, Tempo e NãoLikert (após limpeza e valores especiais) e a
+        classificação das colunas da referência.
+        """
+        df_tratado = self.tratar_valores_especiais(self.limpar_dados(df))
+        
+        medianas = {}
+        for col in self.col_likert + self.col_tempo + self.col_nao_likert:
+            if col in df_tratado.columns and df_tratado[col].dtype in ['float64', 'int64']:
+                mediana = df_tratado[col].median()
+                if pd.notna(mediana):
+                    medianas[col] = float(mediana)
+        
+        self.estado = {
+            "medianas": medianas,
+            "colunas": list(self.plano.colunas),
+            "grupos": {
+                "texto": list(self.col_texto),
+                "likert": list(self.col_likert),
+                "tempo": list(self.col_tempo),
+                "nao_likert": list(self.col_nao_likert),
+            },
+            "data_dayfirst": _detectar_dayfirst(df['Data/Hora Último']) if 'Data/Hora Último' in df.columns else True,
+            "linhas_referencia": len(df),
+        }
+        return self
+    
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Pré-processa usando somente o estado ajustado (sem ajuste por upload)."""
+        if self.estado is None:
+            raise ValueError("DataPreprocessor não ajustado: chame fit() ou informe o estado salvo.")
+        return self.processar(df)
+    
+    def salvar_estado(self, caminho: Path):
+        joblib.dump(self.estado, caminho)
+    
+    @staticmethod
+    def carregar_estado(caminho: Path) -> dict:
+        return joblib.load(caminho)
+
+
+def _detectar_dayfirst(serie: pd.Series) -> bool:
+    """
+    Ordem dia/mês das datas em texto da referência (dd/mm/aaaa, padrão das planilhas,
+    ou mm/dd/aaaa). Se a referência já vem como datetime, assume dd/mm/aaaa.
+    """
+    partes = serie.dropna().astype(str).str.extract(r'^(\d{1,2})/(\d{1,2})/').dropna().astype(int)
+    if (partes[1] > 12).any() and not (partes[0] > 12).any():
+        return False
+    return True
+
+
+def carregar_ou_ajustar_estado(caminho_estado: Path, caminho_referencia: Path) -> dict | None:
+    """
+    Estado ajustado do pré-processamento, carregado no startup da API.
+    Usa o arquivo salvo junto dos modelos; se ele não existir (ou for mais antigo que
+    a base de referência), ajusta na referência e salva. Sem nenhum dos dois, None.
+    """
+    referencia_existe = caminho_referencia.exists()
+    if caminho_estado.exists() and (
+        not referencia_existe or caminho_estado.stat().st_mtime >= caminho_referencia.stat().st_mtime
+    ):
+        return DataPreprocessor.carregar_estado(caminho_estado)
+    
+    if not referencia_existe:
+        return None
+    
+    logger.info(f"🔧 Ajustando o pré-processamento em {caminho_referencia.name}...")
+    preprocessador = DataPreprocessor().fit(pd.read_parquet(caminho_referencia))
+    preprocessador.salvar_estado(caminho_estado)
+    return preprocessador.estado
@@ -1,14 +1,27 @@
 # /meu_projeto_backend/app/routers/analise.py
 
 import pandas as pd
-import joblib
 import json
+import logging
+import base64
+import hashlib
+import io
 import numpy as np
-from fastapi import APIRouter, HTTPException, Depends, status
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
 from pathlib import Path
 from typing import List, Dict, Any
 
 from app.security.auth import get_api_key
+from app.schemas.analise_schemas import EntradaConsulta, SaidaConsulta
+from app.consulta import DatasetEnxuto, IndiceDataset, indexar_codigos
+from app.core.cache import cache_jogadores
+from app.core.settings import settings
+from app.core.prontidao import prontidao
+from app.inference.registro import registro_modelos, marcar_versao
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/analise",
@@ -19,63 +32,291 @@ router = APIRouter(
 # Armazenamento em memória para todos os dados carregados
 artefatos_globais = {}
 
+# Formatos de /analise/dataset-completo -> media type da resposta
+FORMATOS_DATASET = {
+    "registros": "application/json",
+    "colunar": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _versao_arquivo(caminho: Path) -> str:
+    """Hash curto do conteúdo do arquivo (identifica a versão do dataset carregado)."""
+    digest = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for pedaco in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(pedaco)
+    return digest.hexdigest()[:16]
+
 # --- Carregamento dos Dados na Inicialização da API (VERSÃO COMPLETA) ---
 @router.on_event("startup")
+def iniciar_dados():
+    if prontidao.estado("dataset") != "pendente":
+        # Algumas versões do FastAPI executam o startup dos routers duas vezes
+        # (pelo app e pelo lifespan do router incluído)
+        return
+    carregar_dados_e_modelos()
+
+
 def carregar_dados_e_modelos():
     """
     Carrega todos os artefatos essenciais do disco para a memória.
     """
-    print("Iniciando carregamento de artefatos do disco...")
+    logger.info("Iniciando carregamento de artefatos do disco...")
+    prontidao.definir("dataset", "carregando")
     
     BASE_DIR = Path(__file__).resolve().parent.parent
     DATA_DIR = BASE_DIR / "data" / "processed"
-    RESULTS_DIR = BASE_DIR / "results"
     
     try:
-        # Carrega o DataFrame principal
+        # Carrega o dataset principal (mapeado em memória; colunas sob demanda no modo enxuto)
         path_parquet = DATA_DIR / "dados_processados.parquet"
-        artefatos_globais['dataframe'] = pd.read_parquet(path_parquet)
-        print(f"  ✅ DataFrame carregado de '{path_parquet}'")
+        with prontidao.medir("dataset"):
+            versao = _versao_arquivo(path_parquet)
+            dataset = DatasetEnxuto(
+                path_parquet, versao, enxuto=settings.DATASET_MODO_ENXUTO, diretorio_mapa=settings.DATASET_DIR_MAPA or None
+            )
+        artefatos_globais['dataset'] = dataset
+        artefatos_globais['versao_dataset'] = versao
+        logger.info(f"  ✅ Dataset carregado de '{path_parquet}' (versão {versao}, modo {'enxuto' if dataset.enxuto else 'completo'}, "
+              f"mapeado de '{dataset.arquivo_mapeado}')")
 
-        # --- MODIFICAÇÃO 1: Carregar relatórios para TODOS os targets ---
-        # (Lidando com a inconsistência de maiúsculas/minúsculas nos nomes das pastas)
-        target_folders = {"t1": "target1", "t2": "Target2", "t3": "Target3"}
-        
-        for key, folder_name in target_folders.items():
-            path_report = RESULTS_DIR / folder_name / "final_report.json"
-            
-            if path_report.exists():
-                with open(path_report, 'r', encoding='utf-8') as f:
-                    artefatos_globais[f'relatorio_{key}'] = json.load(f)
-                print(f"  ✅ Relatório do {key.upper()} carregado de '{path_report}'")
-            else:
-                print(f"  ⚠️ AVISO: Relatório para {key.upper()} não encontrado em '{path_report}'.")
+        with prontidao.medir("indices_dataset"):
+            indices = IndiceDataset(dataset, preguicoso=dataset.enxuto)
+        artefatos_globais['indices'] = indices
+        if dataset.enxuto:
+            logger.info("  ✅ Índices de consulta: montados por coluna na primeira consulta")
+        else:
+            logger.info(f"  ✅ Índices de consulta: {len(indices.ordenados)} colunas ordenadas, "
+                  f"{len(indices.bitmaps)} com bitmaps por categoria")
+
+        artefatos_globais['indice_codigos'] = (
+            indexar_codigos(dataset['Código de Acesso']) if 'Código de Acesso' in dataset.columns else {}
+        )
+        # Vetores montados a partir do dataset anterior deixam de valer
+        cache_jogadores.limpar()
+        logger.info(f"  ✅ Índice de jogadores: {len(artefatos_globais['indice_codigos'])} códigos de acesso")
+        # Os relatórios dos targets vêm do registro de artefatos (app.inference.registro),
+        # lidos uma vez junto dos modelos
 
     except FileNotFoundError as e:
-        print(f"❌ ERRO CRÍTICO: Arquivo essencial não encontrado durante a inicialização: {e}")
+        logger.error(f"❌ ERRO CRÍTICO: Arquivo essencial não encontrado durante a inicialização: {e}")
+        prontidao.definir("dataset", "erro", str(e))
+    else:
+        prontidao.definir("dataset", "pronto")
     
-    print("✅ Carregamento de artefatos concluído!")
+    logger.info("✅ Carregamento de artefatos concluído!")
 
 
 # --- ENDPOINTS DE CONSULTA (VERSÃO COMPLETA) ---
 
-@router.get("/dataset-completo", response_model=List[Dict[str, Any]])
-def get_dataset_completo():
-    """Retorna o dataset processado completo em formato JSON."""
-    if 'dataframe' not in artefatos_globais:
+def _codificar_cursor(versao: str, posicao: int) -> str:
+    return base64.urlsafe_b64encode(f"{versao}:{posicao}".encode()).decode().rstrip("=")
+
+
+def _decodificar_cursor(cursor: str, versao: str) -> int:
+    """Posição da próxima linha; o cursor só vale para a versão do dataset que o gerou."""
+    try:
+        texto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        versao_cursor, posicao = texto.rsplit(":", 1)
+        posicao = int(posicao)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+    if versao_cursor != versao:
+        raise HTTPException(
+            status_code=409,
+            detail="O dataset foi recarregado desde o início da paginação. Recomece sem cursor."
+        )
+    return max(posicao, 0)
+
+
+def _selecionar_campos(df: pd.DataFrame, pedidos: list | None) -> list:
+    if not pedidos:
+        return df.columns.tolist()
+    desconhecidos = [campo for campo in pedidos if campo not in df.columns]
+    if desconhecidos:
+        raise HTTPException(status_code=400, detail=f"Campo(s) inexistente(s) no dataset: {desconhecidos}")
+    return list(dict.fromkeys(pedidos))
+
+
+def _colunas_json(df: pd.DataFrame) -> dict:
+    """
+    Colunas como listas de valores nativos do Python, prontas para o `json.dumps`:
+    NaN/NaT/infinito viram None e datas saem em ISO 8601 (como no `to_dict` anterior).
+    """
+    colunas = {}
+    for col in df.columns:
+        serie = df[col]
+        if serie.dtype.kind == 'M':
+            valores = [None if pd.isna(v) else v.isoformat() for v in serie.tolist()]
+        elif serie.dtype.kind in 'iub':
+            valores = serie.tolist()
+        else:
+            valores = serie.tolist()
+            if serie.dtype.kind == 'f':
+                ausentes = ~np.isfinite(serie.to_numpy())
+            else:
+                ausentes = serie.isna().to_numpy()
+            if ausentes.any():
+                valores = [None if ausente else v for v, ausente in zip(valores, ausentes)]
+        colunas[str(col)] = valores
+    return colunas
+
+
+def posicao_do_jogador(codigo: str) -> int | None:
+    """Posição do jogador no dataset de análise (busca O(1) pelo Código de Acesso) ou None."""
+    return artefatos_globais.get('indice_codigos', {}).get(codigo)
+
+
+@router.get(
+    "/dataset-completo",
+    responses={
+        200: {"content": {media_type: {} for media_type in dict.fromkeys(FORMATOS_DATASET.values())}},
+        304: {"description": "Dataset não mudou desde o ETag informado em If-None-Match."},
+    },
+)
+def get_dataset_completo(
+    request: Request,
+    formato: str = Query("registros", description="'registros' (lista de objetos), 'colunar' ({coluna: [valores]}), 'arrow' (IPC stream) ou 'parquet'"),
+    campos: str | None = Query(None, description="Colunas a retornar, separadas por vírgula (padrão: todas)"),
+    limite: int | None = Query(None, ge=1, description="Máximo de linhas por página (padrão: todas as restantes)"),
+    cursor: str | None = Query(None, description="Cursor da próxima página, recebido no header X-Proximo-Cursor"),
+):
+    """
+    Retorna o dataset processado completo (ou uma página dele).
+
+    - Paginação por cursor: com `limite`, a resposta traz `X-Proximo-Cursor` (e um
+      header `Link` rel="next") enquanto houver linhas; `X-Total-Linhas` traz o total.
+    - `campos` projeta só as colunas pedidas.
+    - ETag: a versão (hash) do parquet carregado; com `If-None-Match` igual, a
+      resposta é 304 sem corpo.
+    """
+    if 'dataset' not in artefatos_globais:
+        raise HTTPException(status_code=503, detail="Dados ainda não carregados.")
+    if formato not in FORMATOS_DATASET:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato inválido. Use um de: {', '.join(FORMATOS_DATASET)}"
+        )
+
+    versao = artefatos_globais['versao_dataset']
+    etag = f'"{versao}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    df = artefatos_globais['dataset']
+    colunas = _selecionar_campos(df, [campo.strip() for campo in (campos or "").split(",") if campo.strip()])
+    inicio = _decodificar_cursor(cursor, versao) if cursor else 0
+    fim = len(df) if limite is None else min(inicio + limite, len(df))
+
+    headers["X-Total-Linhas"] = str(len(df))
+    if fim < len(df):
+        proximo = _codificar_cursor(versao, fim)
+        headers["X-Proximo-Cursor"] = proximo
+        parametros = dict(request.query_params)
+        parametros["cursor"] = proximo
+        headers["Link"] = f'<{request.url.include_query_params(**parametros)}>; rel="next"'
+
+    if formato in ("arrow", "parquet"):
+        # A tabela mapeada já tem o schema original do parquet: projeção e fatia não copiam
+        tabela = df.tabela.select(colunas).slice(inicio, max(fim - inicio, 0))
+        saida = io.BytesIO()
+        if formato == "arrow":
+            with pa.ipc.new_stream(saida, tabela.schema) as writer:
+                writer.write_table(tabela)
+        else:
+            pq.write_table(tabela, saida)
+        return Response(content=saida.getvalue(), media_type=FORMATOS_DATASET[formato], headers=headers)
+
+    dados = _colunas_json(df.linhas(slice(inicio, fim), colunas))
+    if formato == "registros":
+        dados = [dict(zip(dados, linha)) for linha in zip(*dados.values())]
+    return Response(
+        content=json.dumps(dados, ensure_ascii=False, allow_nan=False),
+        media_type=FORMATOS_DATASET[formato],
+        headers=headers
+    )
+
+@router.post("/consulta", response_model=SaidaConsulta)
+def consultar_dataset(entrada: EntradaConsulta):
+    """
+    Filtra, ordena e pagina o dataset processado no servidor, usando os índices
+    montados no carregamento, e retorna só a página pedida.
+
+    Filtros (todos precisam valer): `{"campo": "Target1", "min": 40, "max": 60}`,
+    `{"campo": "Cluster", "em": [0, 2]}` ou `{"campo": "Cor0202", "igual": "Azul"}`.
+    Com `ordenar_por` + `limite`, a resposta é o top-k (ausentes sempre no fim).
+    """
+    if 'indices' not in artefatos_globais:
+        raise HTTPException(status_code=503, detail="Dados ainda não carregados.")
+
+    df = artefatos_globais['dataset']
+    colunas = _selecionar_campos(df, entrada.campos)
+    try:
+        posicoes, total = artefatos_globais['indices'].consultar(
+            [filtro.model_dump() for filtro in entrada.filtros],
+            ordenar_por=entrada.ordenar_por,
+            decrescente=entrada.decrescente,
+            deslocamento=entrada.deslocamento,
+            limite=entrada.limite
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    dados = _colunas_json(df.linhas(posicoes, colunas))
+    resposta = {
+        "total_dataset": len(df),
+        "total_filtrado": total,
+        "deslocamento": entrada.deslocamento,
+        "limite": entrada.limite,
+        "linhas": [dict(zip(dados, linha)) for linha in zip(*dados.values())],
+    }
+    return Response(content=json.dumps(resposta, ensure_ascii=False, allow_nan=False), media_type="application/json")
+
+@router.get("/jogador/{codigo}", response_model=Dict[str, Any])
+def get_jogador(codigo: str):
+    """Retorna a linha de um jogador do dataset processado, buscada pelo Código de Acesso."""
+    if 'indice_codigos' not in artefatos_globais:
+        raise HTTPException(status_code=503, detail="Dados ainda não carregados.")
+    posicao = posicao_do_jogador(codigo)
+    if posicao is None:
+        raise HTTPException(status_code=404, detail=f"Jogador '{codigo}' não encontrado no dataset.")
+
+    dados = _colunas_json(artefatos_globais['dataset'].linhas([posicao]))
+    return Response(
+        content=json.dumps({col: valores[0] for col, valores in dados.items()}, ensure_ascii=False, allow_nan=False),
+        media_type="application/json"
+    )
+
+@router.get("/memoria", response_model=Dict[str, Any])
+def get_memoria():
+    """
+    Uso de memória do dataset de análise, por coluna: bytes mapeados do arquivo
+    (compartilhados entre os workers) e bytes materializados em pandas neste worker,
+    além dos índices de consulta já montados.
+    """
+    if 'dataset' not in artefatos_globais:
         raise HTTPException(status_code=503, detail="Dados ainda não carregados.")
-    return artefatos_globais['dataframe'].replace({np.nan: None}).to_dict('records')
+    memoria = artefatos_globais['dataset'].memoria()
+    memoria["bytes_indices"] = artefatos_globais['indices'].memoria()
+    memoria["colunas_indexadas"] = len(artefatos_globais['indices'].ordenados)
+    return memoria
 
 @router.get("/clusters", response_model=List[Dict[str, Any]])
 def get_analise_clusters():
     """Calcula e retorna a análise de centroides dos clusters."""
-    if 'dataframe' not in artefatos_globais:
+    if 'dataset' not in artefatos_globais:
         raise HTTPException(status_code=503, detail="Dados ainda não carregados.")
-    df = artefatos_globais['dataframe']
-    if 'Cluster' not in df.columns:
+    dataset = artefatos_globais['dataset']
+    if 'Cluster' not in dataset.columns:
         raise HTTPException(status_code=404, detail="Coluna 'Cluster' não encontrada.")
     features_cluster = ['Quiz_Taxa_de_Acerto', 'Quiz_Tempo_Total', 'Performance_Score_Medio', 'Likert_Score_Medio']
-    cluster_analysis = df.groupby('Cluster')[features_cluster].mean().reset_index()
+    # Médias em float64, como no dataset original (o modo enxuto pode guardar float32)
+    df = dataset.linhas(colunas=['Cluster'] + features_cluster).astype({col: 'float64' for col in features_cluster})
+    cluster_analysis = df.groupby('Cluster', observed=True)[features_cluster].mean().reset_index()
     return cluster_analysis.to_dict('records')
 
 # --- MODIFICAÇÃO 2: Endpoint dinâmico para os relatórios ---
@@ -83,7 +324,9 @@ def get_analise_clusters():
 def get_relatorio_por_target(target_id: str):
     """
     Retorna o JSON do relatório final para um Target específico.
-    Use 't1', 't2', ou 't3' para o target_id.
+    Use 't1', 't2', ou 't3' para o target_id. O relatório é o da versão dos modelos
+    em uso no registro de artefatos; antes da primeira carga (modo sob demanda) ou
+    se ela falhou, é lido direto da pasta de resultados, sem carregar os modelos.
     """
     clean_target_id = target_id.lower()
     
@@ -91,9 +334,11 @@ def get_relatorio_por_target(target_id: str):
     if clean_target_id not in ["t1", "t2", "t3"]:
         raise HTTPException(status_code=400, detail="ID de Target inválido. Use 't1', 't2', ou 't3'.")
         
-    key = f"relatorio_{clean_target_id}"
+    relatorio, versao = registro_modelos.relatorio(f"target{clean_target_id[1]}")
+    if versao is not None:
+        marcar_versao(versao)
     
-    if key not in artefatos_globais:
+    if relatorio is None:
         raise HTTPException(status_code=404, detail=f"Relatório para {target_id} não foi carregado ou não existe.")
         
-    return artefatos_globais[key]
\ No newline at end of file
+    return relatorio
\ No newline at end of file
@@ -2,14 +2,27 @@ import warnings
 warnings.filterwarnings('ignore', category=UserWarning)
 warnings.filterwarnings('ignore', message='.*unpickle estimator.*')
 
-import joblib
+import asyncio
+import logging
+import numpy as np
 import pandas as pd
-import json
 from fastapi import APIRouter, Depends, HTTPException
-from pathlib import Path
 
 from app.security.auth import get_api_key
-from app.schemas.previsao_schemas import EntradaPrevisao, SaidaPrevisao
+from app.schemas.previsao_schemas import EntradaPrevisao, SaidaPrevisao, EntradaPrevisaoLote, SaidaPrevisaoLote
+from app.inference import pontuar_lote
+from app.core.settings import settings
+from app.core.workers import pool_trabalho
+from app.core.cache import cache_jogadores, cache_previsoes
+from app.core.prontidao import prontidao
+from app.core.metricas import metricas
+from app.inference.plano import vetorizar_registro, prever_vetor
+from app.inference.microbatch import MicroBatcher
+from app.inference.registro import registro_modelos, marcar_versao
+from app.preprocessing.dependencias import calcular_derivadas
+from app.routers.analise import artefatos_globais, posicao_do_jogador
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/prever",
@@ -17,192 +30,277 @@ router = APIRouter(
     dependencies=[Depends(get_api_key)]
 )
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-MODEL_DIR = BASE_DIR / "models"
+microbatcher = MicroBatcher(
+    janela_ms=settings.MICROBATCH_JANELA_MS,
+    tamanho_max=settings.MICROBATCH_TAMANHO_MAX,
+    executar=lambda func, *args: pool_trabalho.executar("previsao", func, *args)
+)
 
-artefatos = {}
-metadados_modelos = {}
 
 @router.on_event("startup")
-def carregar_modelos():
-    """Carrega todos os artefatos .pkl de cada subpasta de target."""
-    print("Carregando artefatos de Machine Learning (estrutura modular)...")
-    print(f"📁 Diretório de modelos: {MODEL_DIR}\n")
-    
-    target_folders = {"Target1": "target1", "Target2": "Target2", "Target3": "Target3"}
+def iniciar_modelos():
+    if prontidao.estado("modelos") != "pendente":
+        # Algumas versões do FastAPI executam o startup dos routers duas vezes
+        # (pelo app e pelo lifespan do router incluído)
+        return
+    if settings.MODELOS_CARREGAMENTO_PREGUICOSO:
+        prontidao.definir("modelos", "sob_demanda")
+        logger.info("💤 Modelos serão carregados na primeira requisição que precisar deles.")
+    else:
+        registro_modelos.carregar()
+    if settings.REGISTRO_OBSERVAR:
+        registro_modelos.iniciar_observador(settings.REGISTRO_INTERVALO_S)
+
 
-    for target_api, target_folder_name in target_folders.items():
-        key = target_api.lower()
-        folder_path = MODEL_DIR / target_folder_name
-        
+async def garantir_modelos() -> dict:
+    """
+    Versão atual dos modelos (registro de artefatos), usada pela requisição do
+    início ao fim e registrada na resposta (cabeçalho X-Versao-Modelos). No modo sob
+    demanda, a primeira requisição que precisa dos modelos os carrega; requisições
+    concorrentes esperam a mesma carga.
+    """
+    modelos = registro_modelos.atual
+    if modelos is None:
         try:
-            # Verificar qual versão do modelo existe
-            model_aprimorado_path = folder_path / "final_model_aprimorado.pkl"
-            model_normal_path = folder_path / "final_model.pkl"
-            
-            features_aprimoradas_path = folder_path / "selected_features_aprimoradas.pkl"
-            features_normal_path = folder_path / "selected_features.pkl"
-            
-            usar_aprimorado = model_aprimorado_path.exists()
-            
-            if usar_aprimorado:
-                model_path = model_aprimorado_path
-                features_path = features_aprimoradas_path if features_aprimoradas_path.exists() else features_normal_path
-                versao = "APRIMORADO"
-            else:
-                model_path = model_normal_path
-                features_path = features_normal_path
-                versao = "NORMAL"
-            
-            print(f"📊 {target_api}:")
-            print(f"   Versão: {versao}")
-            print(f"   Modelo: {model_path.name}")
-            print(f"   Features: {features_path.name}")
-
-            modelo_carregado = joblib.load(model_path)
-            
-            artefatos[key] = {
-                "modelo": modelo_carregado,
-                "scaler": joblib.load(folder_path / "scaler.pkl"),
-                "features": joblib.load(features_path),
-                "versao": versao
-            }
-            
-            # ========== MUDANÇA AQUI: SEMPRE PRIORIZAR REPORT APRIMORADO ==========
-            results_dir = folder_path.parent.parent / "results" / target_folder_name
-            
-            # Tentar carregar report aprimorado PRIMEIRO (independente do modelo)
-            report_aprimorado_path = results_dir / "final_report_aprimorado.json"
-            report_normal_path = results_dir / "final_report.json"
-            
-            # SEMPRE tentar o aprimorado primeiro
-            if report_aprimorado_path.exists():
-                report_path = report_aprimorado_path
-                print(f"   Report: final_report_aprimorado.json ✅")
-            else:
-                report_path = report_normal_path
-                print(f"   Report: final_report.json")
-            
-            if report_path.exists():
-                with open(report_path, 'r', encoding='utf-8') as f:
-                    report = json.load(f)
-                    metadados_modelos[key] = {
-                        "nome_modelo": report["model"]["name"],
-                        "parametros": report["model"]["best_params"],
-                        "versao": versao,
-                        "metricas_treino": {
-                            "r2": round(report["metrics"]["train"]["r2"], 4),
-                            "rmse": round(report["metrics"]["train"]["rmse"], 2),
-                            "mae": round(report["metrics"]["train"]["mae"], 2),
-                            "mape": round(report["metrics"]["train"].get("mape", 0), 2)  # <-- LINHA ADICIONADA
-                        },
-                        "metricas_teste": {
-                            "r2": round(report["metrics"]["test"]["r2"], 4),
-                            "rmse": round(report["metrics"]["test"]["rmse"], 2),
-                            "mae": round(report["metrics"]["test"]["mae"], 2),
-                            "mape": round(report["metrics"]["test"].get("mape", 0), 2)   # <-- LINHA ADICIONADA
-                        },
-                        "overfitting": {
-                            "diferenca_r2": round(report["overfitting_analysis"]["r2_difference"], 4),
-                            "queda_percentual": round(report["overfitting_analysis"]["relative_drop_percentage"], 2),
-                            "status": report["overfitting_analysis"]["status"]
-                        },
-                        "total_features": report["features"]["final_selected"],
-                        "features_originais": report["features"]["original_count"],
-                        "reducao_features": round(report["features"]["reduction_percentage"], 2)
-                    }
-            else:
-                print(f"   ⚠️ Nenhum report encontrado")
-                metadados_modelos[key] = {
-                    "nome_modelo": type(modelo_carregado).__name__,
-                    "parametros": {},
-                    "versao": versao,
-                    "metricas_treino": {"r2": None, "rmse": None, "mae": None, "mape": None}, # <-- ADICIONADO "mape"
-                    "metricas_teste": {"r2": None, "rmse": None, "mae": None, "mape": None},  # <-- ADICIONADO "mape"
-                    "overfitting": {"diferenca_r2": None, "queda_percentual": None, "status": "unknown"},
-                    "total_features": len(artefatos[key]["features"]),
-                    "features_originais": None,
-                    "reducao_features": None
-                }
-            
-            print(f"   ✅ R² Treino: {metadados_modelos[key]['metricas_treino']['r2']}")
-            print(f"   ✅ R² Teste: {metadados_modelos[key]['metricas_teste']['r2']}")
-            print(f"   ✅ MAPE Teste: {metadados_modelos[key]['metricas_teste']['mape']}%")
-            print(f"   ✅ Total Features: {metadados_modelos[key]['total_features']}\n")
-
-        except FileNotFoundError as e:
-            print(f"  ⚠️ AVISO: Falha ao carregar artefatos para {target_api}. Arquivo não encontrado: {e}\n")
+            modelos = await asyncio.to_thread(registro_modelos.garantir)
         except Exception as e:
-            print(f"  ❌ ERRO ao carregar {target_api}: {e}\n")
+            raise HTTPException(status_code=503, detail=f"Modelos indisponíveis: {e}")
+    marcar_versao(modelos["versao"])
+    return modelos
+
 
-    if not artefatos:
-        raise RuntimeError("Nenhum artefato de modelo foi carregado. A API não pode fazer previsões.")
+@router.on_event("shutdown")
+async def parar_microbatcher():
+    registro_modelos.parar_observador()
+    await microbatcher.parar()
 
-    print("=" * 70)
-    print("✅ Todos os artefatos disponíveis foram carregados!")
-    print("=" * 70)
+
+def features_calculadas(modelos: dict) -> frozenset | None:
+    """Features de engenharia que precisam ser calculadas para os modelos da versão (None = todas)."""
+    if not settings.PREPROCESSAMENTO_PODAR_FEATURES:
+        return None
+    return modelos["poda"]["necessarias"]
 
 
 # Resto do código permanece igual...
-def engenharia_de_features_especializada(df: pd.DataFrame) -> pd.DataFrame:
+def engenharia_de_features_especializada(df: pd.DataFrame, features: frozenset | None = None) -> pd.DataFrame:
     """
     Esta função REPLICA a engenharia de features que é feita nos notebooks
     de modelagem. Ela cria as colunas que não existem no 'dados_processados.parquet'.
+    As fórmulas vêm do grafo de features; com `features`, só essas são calculadas.
+    """
+    logger.debug("Executando engenharia de features especializada...")
+    novas = calcular_derivadas(df, features)
+    df_com_novas_features = df.assign(**novas)
+    
+    logger.debug("Novas features criadas: %s", [col for col in df_com_novas_features.columns if col not in df.columns])
+    return df_com_novas_features
+
+def engenharia_de_features_registro(dados: dict, features: frozenset | None = None) -> dict:
     """
-    print("Executando engenharia de features especializada...")
-    df_com_novas_features = df.copy()
+    Versão sem pandas de `engenharia_de_features_especializada` para um único jogador,
+    usada pelo plano de inferência de POST /prever.
+    """
+    def valor(registro, col):
+        v = registro[col]
+        return np.nan if v is None else float(v)
 
-    if 'Performance_Score_Total' in df.columns and 'Tempo_Total' in df.columns:
-        df_com_novas_features['Eficiencia_Performance'] = df_com_novas_features['Performance_Score_Total'] / (df_com_novas_features['Tempo_Total'] + 1e-6)
+    return {**dados, **calcular_derivadas(dados, features, obter=valor)}
 
-    if 'Likert_Score_Medio' in df.columns and 'Consistencia_F07' in df.columns:
-        df_com_novas_features['Atitude_Consistente'] = df_com_novas_features['Likert_Score_Medio'] * df_com_novas_features['Consistencia_F07']
+def _prever_com_dataframe(modelos: dict, dados_jogador: dict) -> dict:
+    """Caminho com DataFrame, usado quando o plano de inferência não pôde ser compilado."""
+    dados_df = pd.DataFrame([dados_jogador])
+    dados_enriquecidos_df = engenharia_de_features_especializada(dados_df, features_calculadas(modelos))
 
-    if 'Idade_Anos' in df.columns:
-        df_com_novas_features['Idade_Anos_Sq'] = df_com_novas_features['Idade_Anos']**2
-    
-    print("Novas features criadas: ", [col for col in df_com_novas_features.columns if col not in df.columns])
-    return df_com_novas_features
+    artefatos = modelos["artefatos"]
+    previsoes = {}
+
+    for target_name in ["Target1", "Target2", "Target3"]:
+        key = target_name.lower()
+        if key not in artefatos: continue
+
+        modelo = artefatos[key]["modelo"]
+        scaler = artefatos[key]["scaler"]
+        features_modelo = artefatos[key]["features"]
+        features_scaler = scaler.feature_names_in_
+
+        try:
+            dados_para_scaler = dados_enriquecidos_df[features_scaler]
+        except KeyError as e:
+            raise HTTPException(status_code=422, detail=f"A feature {e} (necessária para o pré-processamento) não foi encontrada. Verifique se o JSON de entrada está completo e se a função de engenharia está correta.")
+
+        dados_scaled_np = scaler.transform(dados_para_scaler)
+        dados_scaled_df = pd.DataFrame(dados_scaled_np, columns=features_scaler)
+        df_final_para_modelo = pd.concat([dados_scaled_df, dados_enriquecidos_df.drop(columns=features_scaler)], axis=1)
+
+        try:
+            dados_para_previsao = df_final_para_modelo[features_modelo]
+        except KeyError as e:
+            raise HTTPException(status_code=422, detail=f"A feature {e} (necessária para o modelo {target_name}) não foi encontrada após a engenharia de features.")
+
+        pred = modelo.predict(dados_para_previsao)[0]
+        previsoes[target_name] = float(pred)
+
+    return previsoes
+
+def _dados_do_jogador(codigo: str) -> dict:
+    """Linha do dataset de análise do jogador, como dicionário (404 se o código não existir)."""
+    posicao = posicao_do_jogador(codigo)
+    if posicao is None:
+        raise HTTPException(status_code=404, detail=f"Jogador '{codigo}' não encontrado.")
+    return artefatos_globais['dataset'].linhas([posicao]).iloc[0].to_dict()
+
+def _vetorizar(modelos: dict, dados_jogador: dict) -> np.ndarray:
+    try:
+        registro = engenharia_de_features_registro(dados_jogador, features_calculadas(modelos))
+        return vetorizar_registro(modelos["plano"], registro)
+    except KeyError as e:
+        raise HTTPException(status_code=422, detail=f"A(s) feature(s) {e} (necessária(s) para os modelos) não foi(ram) encontrada(s). Verifique se o JSON de entrada está completo.")
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def _vetor_do_jogador(modelos: dict, codigo: str) -> np.ndarray:
+    """
+    Vetor-união de um jogador conhecido: o guardado no cache por código (upload
+    recente ou consulta anterior) ou montado uma vez a partir do dataset de análise.
+    """
+    x = cache_jogadores.obter(codigo, modelos["versao"])
+    if x is None:
+        x = _vetorizar(modelos, _dados_do_jogador(codigo))
+        cache_jogadores.guardar(codigo, x, modelos["versao"])
+    return x
 
 @router.post("/", response_model=SaidaPrevisao)
 async def fazer_previsao(entrada: EntradaPrevisao):
     """
     Recebe os dados de um jogador, replica a engenharia de features
     e retorna as previsões para os três targets.
+
+    Com `codigo_acesso` no lugar de `dados_jogador`, pontua um jogador já conhecido
+    (dataset de análise ou upload recente) pelo vetor de features guardado em cache.
+
+    Jogadores já pontuados pela mesma versão dos modelos, com os mesmos valores nas
+    features que os modelos consomem, são respondidos pelo cache de previsões.
     """
+    modelos = await garantir_modelos()
+    versao = modelos["versao"]
+    plano = modelos["plano"]
+    metricas.contar_linhas(1)
+    chave = None
+    if entrada.dados_jogador is not None:
+        with metricas.etapa("cache_previsoes"):
+            chave = cache_previsoes.chave_registro(entrada.dados_jogador, versao)
+            previsoes = cache_previsoes.obter(chave, versao)
+        if previsoes is not None:
+            return SaidaPrevisao(**previsoes)
+
+    if plano:
+        with metricas.etapa("features", 1):
+            if entrada.codigo_acesso is not None:
+                x = _vetor_do_jogador(modelos, entrada.codigo_acesso)
+            else:
+                x = _vetorizar(modelos, entrada.dados_jogador)
+        if entrada.codigo_acesso is not None:
+            with metricas.etapa("cache_previsoes"):
+                chave = cache_previsoes.chave_vetor(x, versao)
+                previsoes = cache_previsoes.obter(chave, versao)
+            if previsoes is not None:
+                return SaidaPrevisao(**previsoes)
+
+        try:
+            with metricas.etapa("previsao", 1):
+                if settings.MICROBATCH_ATIVO:
+                    previsoes = await microbatcher.prever(plano, x)
+                else:
+                    previsoes = await pool_trabalho.executar("previsao", prever_vetor, plano, x)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Ocorreu um erro inesperado: {str(e)}")
+        cache_previsoes.guardar(chave, previsoes, versao)
+        return SaidaPrevisao(**previsoes)
+
+    dados_jogador = entrada.dados_jogador
+    if dados_jogador is None:
+        dados_jogador = _dados_do_jogador(entrada.codigo_acesso)
+        chave = cache_previsoes.chave_registro(dados_jogador, versao)
+        previsoes = cache_previsoes.obter(chave, versao)
+        if previsoes is not None:
+            return SaidaPrevisao(**previsoes)
     try:
-        dados_df = pd.DataFrame([entrada.dados_jogador])
-        dados_enriquecidos_df = engenharia_de_features_especializada(dados_df)
-        
-        previsoes = {}
-
-        for target_name in ["Target1", "Target2", "Target3"]:
-            key = target_name.lower()
-            if key not in artefatos: continue
-
-            modelo = artefatos[key]["modelo"]
-            scaler = artefatos[key]["scaler"]
-            features_modelo = artefatos[key]["features"]
-            features_scaler = scaler.feature_names_in_
-
-            try:
-                dados_para_scaler = dados_enriquecidos_df[features_scaler]
-            except KeyError as e:
-                raise HTTPException(status_code=422, detail=f"A feature {e} (necessária para o pré-processamento) não foi encontrada. Verifique se o JSON de entrada está completo e se a função de engenharia está correta.")
-
-            dados_scaled_np = scaler.transform(dados_para_scaler)
-            dados_scaled_df = pd.DataFrame(dados_scaled_np, columns=features_scaler)
-            df_final_para_modelo = pd.concat([dados_scaled_df, dados_enriquecidos_df.drop(columns=features_scaler)], axis=1)
-
-            try:
-                dados_para_previsao = df_final_para_modelo[features_modelo]
-            except KeyError as e:
-                raise HTTPException(status_code=422, detail=f"A feature {e} (necessária para o modelo {target_name}) não foi encontrada após a engenharia de features.")
-            
-            pred = modelo.predict(dados_para_previsao)[0]
-            previsoes[target_name] = float(pred)
-            
+        with metricas.etapa("previsao", 1):
+            previsoes = await pool_trabalho.executar("previsao", _prever_com_dataframe, modelos, dados_jogador)
+        cache_previsoes.guardar(chave, previsoes, versao)
         return SaidaPrevisao(**previsoes)
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ocorreu um erro inesperado: {str(e)}")
+
+def _prever_lote_dataframe(modelos: dict, dados_df: pd.DataFrame):
+    return pontuar_lote(engenharia_de_features_especializada(dados_df, features_calculadas(modelos)), modelos["artefatos"])
+
+@router.post("/lote", response_model=SaidaPrevisaoLote)
+async def fazer_previsao_lote(entrada: EntradaPrevisaoLote):
+    """
+    Recebe MUITOS jogadores de uma vez, como lista de registros ('jogadores') ou
+    no formato colunar ('colunas': {feature: [valores...]}), aplica a mesma
+    engenharia de features de POST /prever e retorna as previsões dos três
+    targets com um único predict por target.
+    """
+    modelos = await garantir_modelos()
+    try:
+        if entrada.jogadores is not None:
+            dados_df = pd.DataFrame.from_records(entrada.jogadores)
+        else:
+            dados_df = pd.DataFrame(entrada.colunas)
+
+        metricas.contar_linhas(len(dados_df))
+        with metricas.etapa("pontuacao", len(dados_df)):
+            df_previsoes, validos, erros = await pool_trabalho.executar("previsao", _prever_lote_dataframe, modelos, dados_df)
+
+        previsoes = {
+            target_name: [None if np.isnan(valor) else valor for valor in df_previsoes[target_name].tolist()]
+            for target_name in df_previsoes.columns
+        }
+
+        return SaidaPrevisaoLote(
+            total_jogadores=len(dados_df),
+            processados_com_sucesso=int(validos.sum()),
+            previsoes=previsoes,
+            erros=erros if erros else None
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ocorreu um erro inesperado: {str(e)}")
+
+@router.get("/microbatch/metricas")
+def get_metricas_microbatch():
+    """Distribuição de tamanho de lote e atraso de fila do micro-batching de POST /prever."""
+    return {"ativo": settings.MICROBATCH_ATIVO, **microbatcher.metricas()}
+
+@router.get("/cache/estatisticas")
+def get_estatisticas_cache():
+    """Acertos/faltas, taxa de acerto e memória do cache de previsões de POST /prever."""
+    return cache_previsoes.estatisticas()
+
+@router.get("/artefatos")
+def get_artefatos():
+    """Versão dos modelos em uso, hash de cada arquivo carregado e estado do observador de recarga."""
+    return registro_modelos.descrever()
+
+@router.post("/artefatos/recarregar")
+async def recarregar_artefatos():
+    """
+    Relê os artefatos do disco e publica uma nova versão, se o conteúdo mudou, sem
+    interromper as requisições em andamento (que terminam com a versão que pegaram).
+    """
+    try:
+        modelos = await asyncio.to_thread(registro_modelos.carregar)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ocorreu um erro inesperado: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=409, detail=f"Recarga rejeitada: {e}")
+    marcar_versao(modelos["versao"])
+    return registro_modelos.descrever()
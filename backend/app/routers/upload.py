@@ -1,8 +1,9 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status
 from pydantic import ValidationError
-import io
-import pandas as pd
 from app.security.auth import get_api_key
+from app.core.workers import pool_trabalho
+from app.core.metricas import metricas
+from app.ingestao import ler_abas_excel
 from app.schemas.upload_schemas import SessionActivityRow, FeatureRow
 
 MAX_FILE_SIZE_MB = 5
@@ -15,6 +16,30 @@ EXPECTED_SHEETS = {
     "Features": FeatureRow
 }
 
+def _validar_abas(dicionario_de_abas: dict) -> dict:
+    """Valida o conteúdo de cada aba esperada, linha por linha, com o schema correspondente."""
+    resultado_validado = {}
+   
+    for sheet_name, schema in EXPECTED_SHEETS.items():
+        df = dicionario_de_abas[sheet_name]
+        records = df.to_dict('records')
+       
+        try:
+            validated_data = [
+                schema(**{str(k): v for k, v in row.items()}).model_dump() 
+                for row in records
+            ]
+            resultado_validado[sheet_name] = validated_data
+       
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Erro de validação na aba '{sheet_name}'. Detalhes: {e.errors()}"
+            )
+    
+    return resultado_validado
+
+
 router = APIRouter(
     prefix="/upload",
     tags=["Upload de Arquivos"],
@@ -46,7 +71,10 @@ async def processar_planilha_excel(file: UploadFile = File(...)):
    
     # === CAMADA 2: Validação de Estrutura (Abas) ===
     try:
-        dicionario_de_abas = pd.read_excel(io.BytesIO(contents), sheet_name=None)
+        with metricas.etapa("leitura_abas"):
+            dicionario_de_abas = await pool_trabalho.executar("leitura", ler_abas_excel, contents, list(EXPECTED_SHEETS))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -61,24 +89,10 @@ async def processar_planilha_excel(file: UploadFile = File(...)):
             )
     
     # === CAMADA 3: Validação de Conteúdo (Linha por Linha) ===
-    resultado_validado = {}
-   
-    for sheet_name, schema in EXPECTED_SHEETS.items():
-        df = dicionario_de_abas[sheet_name]
-        records = df.to_dict('records')
-       
-        try:
-            validated_data = [
-                schema(**{str(k): v for k, v in row.items()}).model_dump() 
-                for row in records
-            ]
-            resultado_validado[sheet_name] = validated_data
-       
-        except ValidationError as e:
-            raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail=f"Erro de validação na aba '{sheet_name}'. Detalhes: {e.errors()}"
-            )
+    with metricas.etapa("validacao") as medicao:
+        resultado_validado = await pool_trabalho.executar("validacao", _validar_abas, dicionario_de_abas)
+        medicao["linhas"] = sum(len(linhas) for linhas in resultado_validado.values())
+    metricas.contar_linhas(medicao["linhas"])
     
     # ✅ NOVO: Verificar se os Targets estão presentes
     session_data = resultado_validado.get("Session Activities", [])
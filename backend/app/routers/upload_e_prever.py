@@ -1,10 +1,27 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
 import pandas as pd
+import numpy as np
 import io
-from fastapi.responses import StreamingResponse
+import itertools
+import json
+import logging
+import time
+from pathlib import Path
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from app.security.auth import get_api_key
 from app.preprocessing.preprocessor import DataPreprocessor
-from app.routers.previsao import artefatos, metadados_modelos
+from app.preprocessing.dependencias import FiltroColunas
+from app.ingestao import EXTENSOES_SUPORTADAS, ler_planilha
+from app.inference import pontuar_lote_sem_repeticoes
+from app.core.workers import pool_trabalho
+from app.core.cache import cache_resultados, cache_jogadores
+from app.core.settings import settings
+from app.core.metricas import metricas
+from app.exportacao import FORMATOS, criar_exportador
+from app.routers.previsao import features_calculadas, garantir_modelos
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/processar",
@@ -12,179 +29,504 @@ router = APIRouter(
     dependencies=[Depends(get_api_key)]
 )
 
-preprocessor = DataPreprocessor()
 
-@router.post("/excel-completo-com-preprocessamento")
-async def processar_excel_bruto_e_prever(file: UploadFile = File(...)):
+def _filtro_colunas(modelos: dict):
     """
-    📊 ENDPOINT COMPLETO COM PRÉ-PROCESSAMENTO:
-    1. Recebe Excel com dados BRUTOS de jogadores
-    2. Aplica TODO o pré-processamento (limpeza, features, imputação)
-    3. Faz previsão dos 3 targets para TODOS os jogadores
-    4. Retorna dados COMPLETOS processados + previsões + informações dos modelos
-    
-    ✅ Aceita planilhas COM ou SEM valores de Target1/2/3
+    Colunas brutas que precisam ser lidas do upload: as dependências das features
+    consumidas pelos modelos da versão (None = ler todas).
     """
-    
-    if file.filename is None:
+    if not settings.INGESTAO_PODAR_COLUNAS:
+        return None
+    return FiltroColunas(modelos["poda"]["consumidas"])
+
+
+def _validar_arquivo(filename: str | None):
+    if filename is None:
         raise HTTPException(
             status_code=400,
             detail="Nome do arquivo não foi fornecido"
         )
     
-    if not file.filename.endswith(('.xlsx', '.xls')):
+    if not filename.lower().endswith(EXTENSOES_SUPORTADAS):
         raise HTTPException(
             status_code=415,
-            detail="Arquivo deve ser Excel (.xlsx ou .xls)"
+            detail=f"Arquivo deve ser Excel (.xlsx ou .xls), CSV, Parquet ou Arrow ({', '.join(EXTENSOES_SUPORTADAS)})"
         )
+
+
+def _preprocessar(df_bruto: pd.DataFrame, estado: dict | None, features: frozenset | None,
+                  decisoes: dict | None = None) -> tuple[pd.DataFrame, dict]:
+    # Uma instância por upload: o DataPreprocessor guarda a classificação de colunas
+    # em atributos, e o pool de trabalho processa uploads em paralelo.
+    # O estado ajustado e o conjunto podado de features vão como argumento para
+    # também chegarem ao pool de processos, e a duração de cada etapa volta junto
+    # com o resultado. `decisoes` vêm da planilha inteira quando `df_bruto` é um bloco.
+    preprocessador = DataPreprocessor(
+        modo_pipeline=settings.PREPROCESSAMENTO_MODO_PIPELINE, estado=estado, features=features
+    )
+    df_processado = preprocessador.processar(df_bruto, decisoes)
+    return df_processado, preprocessador.tempos
+
+
+def _decidir_planilha(df_bruto: pd.DataFrame, estado: dict | None) -> dict:
+    return DataPreprocessor(estado=estado).decidir_planilha(df_bruto)
+
+
+async def _consultar_cache(contents: bytes, filename: str, modelos: dict) -> tuple[str | None, dict | None]:
+    """Chave do upload no cache de resultados (None se o cache está desligado) e o resultado guardado, se houver."""
+    if not cache_resultados.ativo:
+        return None, None
+    with metricas.etapa("cache_resultados"):
+        chave = await pool_trabalho.executar(
+            "cache", cache_resultados.chave,
+            contents, Path(filename).suffix.lower(), settings.INGESTAO_PODAR_COLUNAS,
+            settings.PREPROCESSAMENTO_PODAR_FEATURES, versao=modelos["versao"]
+        )
+        resultado = await pool_trabalho.executar("cache", cache_resultados.obter, chave)
+    if resultado is not None:
+        logger.info(f"♻️ Resultado reaproveitado do cache: {resultado['total_jogadores']} jogadores")
+        metricas.contar_linhas(resultado["total_jogadores"])
+    return chave, resultado
+
+
+async def _ler_upload(contents: bytes, filename: str, modelos: dict) -> pd.DataFrame:
+    with metricas.etapa("leitura") as medicao:
+        df_bruto = await pool_trabalho.executar("leitura", ler_planilha, contents, filename, _filtro_colunas(modelos))
+        medicao["linhas"] = len(df_bruto)
+    metricas.contar_linhas(len(df_bruto))
+    logger.info(f"✅ Excel recebido: {len(df_bruto)} jogadores")
+    return df_bruto
+
+
+def _tem_targets_originais(df_bruto: pd.DataFrame) -> bool:
+    # ✅ NOVO: Verificar se os targets já existem na planilha
+    tem_targets_originais = all(col in df_bruto.columns for col in ['Target1', 'Target2', 'Target3'])
+    logger.debug(f"📊 Planilha {'TEM' if tem_targets_originais else 'NÃO TEM'} targets originais")
+    return tem_targets_originais
+
+
+def _garantir_colunas_target(df_processado: pd.DataFrame):
+    # ✅ CRÍTICO: Garantir que as colunas de Target existam no DataFrame processado
+    # (mesmo que vazias), para evitar erro "Columns must be same length as key"
+    for target_col in ['Target1', 'Target2', 'Target3']:
+        if target_col not in df_processado.columns:
+            df_processado[target_col] = None
+
+
+async def _pontuar_upload(contents: bytes, filename: str) -> tuple[dict, bool, dict]:
+    """
+    Leitura + pré-processamento + previsão de um upload, com cache endereçado pelo
+    conteúdo do arquivo (e pela versão dos modelos). Todas as etapas usam a mesma
+    versão dos modelos, mesmo que outra seja publicada durante o upload.
+    Retorna (resultado, veio_do_cache, versão dos modelos usada).
+
+    O resultado guarda o que os dois endpoints de /processar precisam para responder:
+        total_jogadores, tem_targets_originais
+        df_originais:  Target1/2/3 da planilha (numéricos) ou None
+        df_processado, df_previsoes, validos, erros (saída de `pontuar_lote`)
+    """
+    modelos = await garantir_modelos()
+    chave, resultado = await _consultar_cache(contents, filename, modelos)
+    if resultado is not None:
+        return resultado, True, modelos
     
-    try:
-        contents = await file.read()
-        df_bruto = pd.read_excel(io.BytesIO(contents), sheet_name='Session Activities')
-        
-        print(f"✅ Excel recebido: {len(df_bruto)} jogadores")
+    resultado = await _pontuar_planilha(await _ler_upload(contents, filename, modelos), modelos)
+    if chave is not None:
+        await pool_trabalho.executar("cache", cache_resultados.guardar, chave, resultado)
+    return resultado, False, modelos
+
+
+async def _pontuar_planilha(df_bruto: pd.DataFrame, modelos: dict) -> dict:
+    """Pré-processamento + previsão da planilha inteira (o resultado descrito em `_pontuar_upload`)."""
+    tem_targets_originais = _tem_targets_originais(df_bruto)
+    
+    # Aplicar pré-processamento
+    with metricas.etapa("preprocessamento", len(df_bruto)):
+        df_processado, tempos = await pool_trabalho.executar(
+            "preprocessamento", _preprocessar, df_bruto, modelos["estado"], features_calculadas(modelos)
+        )
+    for etapa, segundos in tempos.items():
+        metricas.observar_etapa(f"preprocessamento_{etapa}", segundos, len(df_bruto))
+    _garantir_colunas_target(df_processado)
+    
+    # Pontuar o lote inteiro de uma vez (um predict por target; jogadores repetidos uma vez só)
+    with metricas.etapa("pontuacao", len(df_processado)):
+        df_previsoes, validos, erros = await pool_trabalho.executar(
+            "previsao", pontuar_lote_sem_repeticoes, df_processado, modelos["artefatos"]
+        )
+    for erro in erros:
+        logger.warning(f"⚠️ Erro ao processar jogador {erro['linha']}: {erro['erro']}")
+    
+    # Vetores de features dos jogadores pontuados ficam disponíveis para POST /prever por código
+    await pool_trabalho.executar("cache", cache_jogadores.atualizar, df_processado, validos, modelos["versao"])
+    
+    return {
+        "total_jogadores": len(df_bruto),
+        "tem_targets_originais": tem_targets_originais,
+        "df_originais": (
+            df_bruto[['Target1', 'Target2', 'Target3']].apply(pd.to_numeric, errors='coerce')
+            if tem_targets_originais else None
+        ),
+        "df_processado": df_processado,
+        "df_previsoes": df_previsoes,
+        "validos": validos,
+        "erros": erros
+    }
+
+
+def _iterar_resultados(df_originais: pd.DataFrame | None, df_processado: pd.DataFrame, df_previsoes: pd.DataFrame,
+                       validos: np.ndarray, deslocamento: int = 0):
+    """
+    Gera o registro JSON de cada jogador pontuado com sucesso, na ordem das linhas.
+    `deslocamento` é a posição do bloco dentro da planilha (para o fallback do código).
+    """
+    # ✅ NOVO: Incluir valores originais dos targets (se existirem)
+    tem_targets_originais = df_originais is not None
+    if tem_targets_originais:
+        originais_por_linha = df_originais.astype(object).where(df_originais.notna(), None).to_dict('records')
+    
+    previsoes_por_linha = df_previsoes.to_dict('records')
+    registros = df_processado.to_dict('records')
+    
+    for idx in np.flatnonzero(validos):
+        jogador_dados = registros[idx]
+        codigo_acesso = jogador_dados.get('Código de Acesso', f'Jogador_{deslocamento+idx+1}')
+        previsoes_jogador = {
+            target: round(float(valor), 2)
+            for target, valor in previsoes_por_linha[idx].items()
+        }
         
-        # ✅ NOVO: Verificar se os targets já existem na planilha
-        tem_targets_originais = all(col in df_bruto.columns for col in ['Target1', 'Target2', 'Target3'])
-        print(f"📊 Planilha {'TEM' if tem_targets_originais else 'NÃO TEM'} targets originais")
+        # ✅ Serializar dados para JSON (converter tipos não-serializáveis)
+        dados_completos_processados = {}
+        for col, value in jogador_dados.items():
+            if pd.isna(value):
+                dados_completos_processados[col] = None
+            elif isinstance(value, (pd.Timestamp, pd.Timedelta)):
+                dados_completos_processados[col] = str(value)
+            elif isinstance(value, (int, float)):
+                dados_completos_processados[col] = float(value)
+            else:
+                dados_completos_processados[col] = str(value)
         
-        # Aplicar pré-processamento
-        df_processado = preprocessor.processar(df_bruto)
+        yield {
+            "codigo_acesso": codigo_acesso,
+            "previsoes": previsoes_jogador,
+            "valores_originais": originais_por_linha[idx] if tem_targets_originais else None,
+            "dados_processados_completos": dados_completos_processados
+        }
+
+
+def _montar_resultados(*args) -> list:
+    return list(_iterar_resultados(*args))
+
+
+def _resposta_json(conteudo: dict, headers: dict) -> JSONResponse:
+    """Resposta JSON serializada no pool de trabalho (a mesma codificação que o FastAPI aplicaria)."""
+    return JSONResponse(jsonable_encoder(conteudo), headers=headers)
+
+
+class _AcumuladorEstatisticas:
+    """
+    Acumula, jogador a jogador, as estatísticas das previsões (média/mín/máx) e o MAE
+    contra os valores originais, para que o resumo possa ser calculado em streaming.
+    """
+
+    def __init__(self, tem_targets_originais: bool):
+        self.tem_targets_originais = tem_targets_originais
+        self.total = 0
+        self._previstos = {target: [0.0, 0, None, None] for target in ["Target1", "Target2", "Target3"]}
+        self._comparacoes = {target: [0.0, 0] for target in ["Target1", "Target2", "Target3"]}
+
+    def adicionar(self, resultado: dict):
+        self.total += 1
+        for target, valor in resultado["previsoes"].items():
+            acumulado = self._previstos[target]
+            acumulado[0] += valor
+            acumulado[1] += 1
+            acumulado[2] = valor if acumulado[2] is None else min(acumulado[2], valor)
+            acumulado[3] = valor if acumulado[3] is None else max(acumulado[3], valor)
+
+            originais = resultado.get("valores_originais")
+            if originais and originais.get(target) is not None:
+                self._comparacoes[target][0] += abs(originais[target] - valor)
+                self._comparacoes[target][1] += 1
+
+    def estatisticas(self) -> dict:
+        estatisticas = {}
+        for target, (soma, quantidade, minimo, maximo) in self._previstos.items():
+            if quantidade:
+                estatisticas[f"{target.lower()}_media"] = round(soma / quantidade, 2)
+                estatisticas[f"{target.lower()}_min"] = round(minimo, 2)
+                estatisticas[f"{target.lower()}_max"] = round(maximo, 2)
+        return estatisticas
+
+    def metricas_comparacao(self) -> dict | None:
+        # ✅ NOVO: Calcular erro médio (MAE) se tiver valores originais
+        if not self.tem_targets_originais:
+            return None
+        metricas_comparacao = {}
+        for target, (soma_erros, quantidade) in self._comparacoes.items():
+            if quantidade:
+                metricas_comparacao[target.lower()] = {
+                    "mae": round(soma_erros / quantidade, 2),
+                    "total_comparacoes": quantidade
+                }
+        return metricas_comparacao
+
+
+def _modelos_utilizados(modelos: dict) -> dict:
+    metadados_modelos = modelos["metadados"]
+    return {
+        "Target1": metadados_modelos.get("target1", {}),
+        "Target2": metadados_modelos.get("target2", {}),
+        "Target3": metadados_modelos.get("target3", {})
+    }
+
+
+def _linha_ndjson(registro: dict) -> bytes:
+    return (json.dumps(registro, ensure_ascii=False) + "\n").encode('utf-8')
+
+
+def _blocos(resultado: dict, linhas_por_bloco: int):
+    """Fatias (inicio, df_originais, df_processado, df_previsoes, validos) de até `linhas_por_bloco` linhas."""
+    df_originais = resultado["df_originais"]
+    for inicio in range(0, max(len(resultado["df_processado"]), 1), linhas_por_bloco):
+        fatia = slice(inicio, inicio + linhas_por_bloco)
+        yield (
+            inicio,
+            df_originais.iloc[fatia] if df_originais is not None else None,
+            resultado["df_processado"].iloc[fatia],
+            resultado["df_previsoes"].iloc[fatia],
+            resultado["validos"][fatia]
+        )
+
+
+def _gerar_ndjson(resultado: dict, modelos: dict, linhas_por_bloco: int):
+    """
+    Modo streaming (NDJSON) de excel-completo-com-preprocessamento:
+    1. um registro 'cabecalho' com os metadados dos modelos e a lista de features
+    2. um registro 'jogador' (ou 'erro') por linha, serializados bloco a bloco
+    3. um registro 'resumo' final com as estatísticas e as métricas de comparação
+    """
+    df_processado = resultado["df_processado"]
+    tem_targets_originais = resultado["tem_targets_originais"]
+    yield _linha_ndjson({
+        "tipo": "cabecalho",
+        "total_jogadores": resultado["total_jogadores"],
+        "total_features": len(df_processado.columns),
+        "lista_features": df_processado.columns.tolist(),
+        "tem_targets_originais": tem_targets_originais,
+        "versao_modelos": modelos["versao"],
+        "modelos_utilizados": _modelos_utilizados(modelos)
+    })
+    
+    # Erros agrupados pelo bloco da linha, para saírem junto com os jogadores do bloco
+    erros_por_bloco = {}
+    for erro in resultado["erros"]:
+        erros_por_bloco.setdefault((erro["linha"] - 1) // linhas_por_bloco, []).append(erro)
+    
+    acumulador = _AcumuladorEstatisticas(tem_targets_originais)
+    for inicio, df_originais, bloco, df_previsoes, validos in _blocos(resultado, linhas_por_bloco):
+        for registro in _iterar_resultados(df_originais, bloco, df_previsoes, validos, inicio):
+            acumulador.adicionar(registro)
+            yield _linha_ndjson({"tipo": "jogador", **registro})
         
-        # ✅ CRÍTICO: Garantir que as colunas de Target existam no DataFrame processado
-        # (mesmo que vazias), para evitar erro "Columns must be same length as key"
-        for target_col in ['Target1', 'Target2', 'Target3']:
-            if target_col not in df_processado.columns:
-                df_processado[target_col] = None
+        for erro in erros_por_bloco.get(inicio // linhas_por_bloco, []):
+            yield _linha_ndjson({"tipo": "erro", **erro})
+    
+    yield _linha_ndjson({
+        "tipo": "resumo",
+        "status": "sucesso",
+        "total_jogadores": resultado["total_jogadores"],
+        "processados_com_sucesso": acumulador.total,
+        "com_erros": len(resultado["erros"]),
+        "estatisticas": acumulador.estatisticas(),
+        "metricas_comparacao": acumulador.metricas_comparacao()
+    })
+
+
+def _bloco_exportado(bloco: pd.DataFrame, df_previsoes: pd.DataFrame, tem_targets_originais: bool) -> pd.DataFrame:
+    # ✅ ADICIONAR previsões como NOVAS colunas (não sobrescrever)
+    # Linhas com erro ficam vazias no arquivo exportado
+    bloco = bloco.assign(**{
+        f'{target_name}_Previsto': df_previsoes[target_name].round(4) if target_name in df_previsoes.columns else None
+        for target_name in ["Target1", "Target2", "Target3"]
+    })
+    
+    # ✅ NOVO: Se tinha valores originais, renomear para diferenciá-los
+    if tem_targets_originais:
+        bloco = bloco.rename(columns={
+            'Target1': 'Target1_Original',
+            'Target2': 'Target2_Original',
+            'Target3': 'Target3_Original'
+        })
+    return bloco
+
+
+def _escrever_bloco(exportador, bloco: pd.DataFrame, df_previsoes: pd.DataFrame, tem_targets_originais: bool) -> bytes:
+    return exportador.escrever(_bloco_exportado(bloco, df_previsoes, tem_targets_originais))
+
+
+def _exportar_em_blocos(resultado: dict, exportador, linhas_por_bloco: int):
+    """
+    Serializa um resultado já pontuado (vindo do cache) em blocos de linhas,
+    entregando os bytes de cada bloco assim que ficam prontos (o arquivo exportado
+    nunca é montado inteiro em memória).
+    """
+    for _, _, bloco, df_previsoes, _ in _blocos(resultado, linhas_por_bloco):
+        yield _escrever_bloco(exportador, bloco, df_previsoes, resultado["tem_targets_originais"])
+    
+    yield from exportador.finalizar()
+
+
+async def _pontuar_e_exportar_em_blocos(df_bruto: pd.DataFrame, modelos: dict, exportador, formato: str,
+                                        linhas_por_bloco: int):
+    """
+    Pré-processa, pontua e exporta o upload bloco a bloco, entregando os bytes de
+    cada bloco assim que ficam prontos. Com o estado do pré-processamento ajustado
+    (medianas da referência) e as decisões que dependem da planilha inteira (targets
+    vazios, dtypes; ver `DataPreprocessor.decidir_planilha`) calculadas uma vez,
+    cada bloco é transformado sozinho com o mesmo resultado do lote inteiro, então
+    só a planilha lida fica inteira em memória: o DataFrame processado e as
+    previsões existem um bloco por vez. Todos os blocos saem com as colunas do
+    primeiro, na mesma ordem.
+
+    As etapas (pré-processamento, pontuação, exportação) são registradas uma vez
+    por requisição, com o tempo somado dos blocos.
+    """
+    total = len(df_bruto)
+    tem_targets_originais = _tem_targets_originais(df_bruto)
+    features = features_calculadas(modelos)
+    gasto = {"preprocessamento": 0.0, "pontuacao": 0.0, f"exportacao_{formato}": 0.0}
+    tempos_preprocessamento = {}
+    colunas = None
+    
+    try:
+        marco = time.perf_counter()
+        decisoes = await pool_trabalho.executar("preprocessamento", _decidir_planilha, df_bruto, modelos["estado"])
+        gasto["preprocessamento"] += time.perf_counter() - marco
         
-        resultados = []
-        erros = []
+        for inicio in range(0, max(total, 1), linhas_por_bloco):
+            marco = time.perf_counter()
+            df_processado, tempos = await pool_trabalho.executar(
+                "preprocessamento", _preprocessar,
+                df_bruto.iloc[inicio:inicio + linhas_por_bloco], modelos["estado"], features, decisoes
+            )
+            for etapa, segundos in tempos.items():
+                tempos_preprocessamento[etapa] = tempos_preprocessamento.get(etapa, 0.0) + segundos
+            _garantir_colunas_target(df_processado)
+            if colunas is None:
+                colunas = list(df_processado.columns)
+            elif list(df_processado.columns) != colunas:
+                df_processado = df_processado.reindex(columns=colunas)
+            gasto["preprocessamento"] += time.perf_counter() - marco
+            
+            marco = time.perf_counter()
+            df_previsoes, validos, erros = await pool_trabalho.executar(
+                "previsao", pontuar_lote_sem_repeticoes, df_processado, modelos["artefatos"], inicio
+            )
+            gasto["pontuacao"] += time.perf_counter() - marco
+            for erro in erros:
+                logger.warning(f"⚠️ Erro ao processar jogador {erro['linha']}: {erro['erro']}")
+            await pool_trabalho.executar("cache", cache_jogadores.atualizar, df_processado, validos, modelos["versao"])
+            
+            marco = time.perf_counter()
+            dados = await pool_trabalho.executar(
+                "serializacao", _escrever_bloco, exportador, df_processado, df_previsoes, tem_targets_originais
+            )
+            gasto[f"exportacao_{formato}"] += time.perf_counter() - marco
+            yield dados
         
-        for idx in range(len(df_processado)):
-            codigo_acesso = None
-            try:
-                linha = df_processado.iloc[idx]
-                jogador_dados = linha.to_dict()
-                codigo_acesso = jogador_dados.get('Código de Acesso', f'Jogador_{idx+1}')
-                
-                df_jogador = pd.DataFrame([jogador_dados])
-                previsoes_jogador = {}
-                
-                # Fazer previsões para cada target
-                for target_name in ["Target1", "Target2", "Target3"]:
-                    key = target_name.lower()
-                    
-                    if key not in artefatos:
-                        continue
-                    
-                    modelo = artefatos[key]["modelo"]
-                    scaler = artefatos[key]["scaler"]
-                    features_modelo = artefatos[key]["features"]
-                    features_scaler = scaler.feature_names_in_
-                    
-                    # Preparar dados para o scaler
-                    dados_para_scaler = df_jogador[features_scaler]
-                    dados_scaled = scaler.transform(dados_para_scaler)
-                    dados_scaled_df = pd.DataFrame(dados_scaled, columns=features_scaler)
-                    
-                    # Combinar dados scaled com features não-scaled
-                    df_final = pd.concat([
-                        dados_scaled_df, 
-                        df_jogador.drop(columns=features_scaler, errors='ignore')
-                    ], axis=1)
-                    
-                    # Fazer previsão
-                    dados_para_previsao = df_final[features_modelo]
-                    pred = modelo.predict(dados_para_previsao)[0]
-                    previsoes_jogador[target_name] = round(float(pred), 2)
-                
-                # ✅ Serializar dados para JSON (converter tipos não-serializáveis)
-                dados_completos_processados = {}
-                for col, value in jogador_dados.items():
-                    if pd.isna(value):
-                        dados_completos_processados[col] = None
-                    elif isinstance(value, (pd.Timestamp, pd.Timedelta)):
-                        dados_completos_processados[col] = str(value)
-                    elif isinstance(value, (int, float)):
-                        dados_completos_processados[col] = float(value)
-                    else:
-                        dados_completos_processados[col] = str(value)
-                
-                # ✅ NOVO: Incluir valores originais dos targets (se existirem)
-                valores_originais = {}
-                if tem_targets_originais:
-                    for target in ['Target1', 'Target2', 'Target3']:
-                        val = df_bruto.iloc[idx].get(target)
-                        valores_originais[target] = float(val) if pd.notna(val) else None
-                
-                resultados.append({
-                    "codigo_acesso": codigo_acesso,
-                    "previsoes": previsoes_jogador,
-                    "valores_originais": valores_originais if tem_targets_originais else None,
-                    "dados_processados_completos": dados_completos_processados
-                })
-                
-            except Exception as e:
-                print(f"⚠️ Erro ao processar jogador {idx+1}: {str(e)}")
-                codigo_fallback = codigo_acesso if codigo_acesso else f'Jogador_{idx+1}'
-                erros.append({
-                    "codigo_acesso": codigo_fallback,
-                    "erro": str(e),
-                    "linha": idx + 1
-                })
+        finalizacao = exportador.finalizar()
+        while True:
+            marco = time.perf_counter()
+            dados = await pool_trabalho.executar("serializacao", next, finalizacao, None)
+            gasto[f"exportacao_{formato}"] += time.perf_counter() - marco
+            if dados is None:
+                break
+            yield dados
+    finally:
+        for etapa, segundos in gasto.items():
+            metricas.observar_etapa(etapa, segundos, total)
+        for etapa, segundos in tempos_preprocessamento.items():
+            metricas.observar_etapa(f"preprocessamento_{etapa}", segundos, total)
+
+
+async def _primeiro_e_restante(primeiro: bytes, gerador):
+    yield primeiro
+    async for dados in gerador:
+        yield dados
+
+
+@router.post("/excel-completo-com-preprocessamento")
+async def processar_excel_bruto_e_prever(
+    file: UploadFile = File(...),
+    streaming: bool = Query(False, description="Se true, responde em NDJSON: cabeçalho, um jogador por linha e resumo final")
+):
+    """
+    📊 ENDPOINT COMPLETO COM PRÉ-PROCESSAMENTO:
+    1. Recebe Excel (ou CSV/Parquet/Arrow) com dados BRUTOS de jogadores
+    2. Aplica TODO o pré-processamento (limpeza, features, imputação)
+    3. Faz previsão dos 3 targets para TODOS os jogadores
+    4. Retorna dados COMPLETOS processados + previsões + informações dos modelos
+    
+    ✅ Aceita planilhas COM ou SEM valores de Target1/2/3
+    ✅ Com `?streaming=true`, cada jogador é enviado (NDJSON) assim que é serializado
+    ✅ Reenvios do mesmo arquivo são respondidos do cache (cabeçalho `X-Cache: HIT`)
+    """
+    
+    _validar_arquivo(file.filename)
+    
+    try:
+        contents = await file.read()
+        resultado, veio_do_cache, modelos = await _pontuar_upload(contents, file.filename)
+        cabecalho_cache = {"X-Cache": "HIT" if veio_do_cache else "MISS"}
         
-        resultados_sucesso = [r for r in resultados if "previsoes" in r]
+        # ✅ Modo streaming: NDJSON emitido jogador a jogador, bloco a bloco
+        if streaming:
+            return StreamingResponse(
+                metricas.cronometrar_gerador(
+                    _gerar_ndjson(resultado, modelos, settings.EXPORTACAO_LINHAS_POR_BLOCO),
+                    "serializacao_ndjson", resultado["total_jogadores"]
+                ),
+                media_type="application/x-ndjson",
+                headers=cabecalho_cache
+            )
         
-        # Calcular estatísticas das previsões
-        estatisticas = {}
-        if resultados_sucesso:
-            for target in ["Target1", "Target2", "Target3"]:
-                valores = [r["previsoes"][target] for r in resultados_sucesso if target in r["previsoes"]]
-                if valores:
-                    estatisticas[f"{target.lower()}_media"] = round(sum(valores) / len(valores), 2)
-                    estatisticas[f"{target.lower()}_min"] = round(min(valores), 2)
-                    estatisticas[f"{target.lower()}_max"] = round(max(valores), 2)
+        df_processado = resultado["df_processado"]
+        tem_targets_originais = resultado["tem_targets_originais"]
+        erros = resultado["erros"]
+        with metricas.etapa("serializacao", resultado["total_jogadores"]):
+            resultados = await pool_trabalho.executar(
+                "serializacao", _montar_resultados,
+                resultado["df_originais"], df_processado, resultado["df_previsoes"], resultado["validos"]
+            )
         
-        # ✅ NOVO: Calcular erro médio se tiver valores originais
-        metricas_comparacao = None
-        if tem_targets_originais:
-            metricas_comparacao = {}
-            for target in ["Target1", "Target2", "Target3"]:
-                valores_reais = []
-                valores_previstos = []
-                
-                for r in resultados_sucesso:
-                    if r.get("valores_originais") and r["valores_originais"].get(target) is not None:
-                        valores_reais.append(r["valores_originais"][target])
-                        valores_previstos.append(r["previsoes"][target])
-                
-                if valores_reais:
-                    # Calcular MAE (Mean Absolute Error)
-                    mae = sum(abs(r - p) for r, p in zip(valores_reais, valores_previstos)) / len(valores_reais)
-                    metricas_comparacao[target.lower()] = {
-                        "mae": round(mae, 2),
-                        "total_comparacoes": len(valores_reais)
-                    }
+        # Calcular estatísticas das previsões (e MAE, se tiver valores originais)
+        acumulador = _AcumuladorEstatisticas(tem_targets_originais)
+        for registro in resultados:
+            acumulador.adicionar(registro)
         
-        return {
+        conteudo = {
             "status": "sucesso",
-            "total_jogadores": len(df_bruto),
-            "processados_com_sucesso": len(resultados_sucesso),
+            "total_jogadores": resultado["total_jogadores"],
+            "processados_com_sucesso": acumulador.total,
             "com_erros": len(erros),
             "total_features": len(df_processado.columns),
             "lista_features": df_processado.columns.tolist(),
             "tem_targets_originais": tem_targets_originais,
-            "modelos_utilizados": {
-                "Target1": metadados_modelos.get("target1", {}),
-                "Target2": metadados_modelos.get("target2", {}),
-                "Target3": metadados_modelos.get("target3", {})
-            },
+            "versao_modelos": modelos["versao"],
+            "modelos_utilizados": _modelos_utilizados(modelos),
             "resultados": resultados,
             "erros": erros if erros else None,
-            "estatisticas": estatisticas,
-            "metricas_comparacao": metricas_comparacao  # ✅ NOVO
+            "estatisticas": acumulador.estatisticas(),
+            "metricas_comparacao": acumulador.metricas_comparacao()  # ✅ NOVO
         }
+        with metricas.etapa("resposta_json", acumulador.total):
+            return await pool_trabalho.executar("serializacao", _resposta_json, conteudo, cabecalho_cache)
         
+    except HTTPException:
+        raise
     except pd.errors.EmptyDataError:
         raise HTTPException(
             status_code=422,
@@ -203,104 +545,84 @@ async def processar_excel_bruto_e_prever(file: UploadFile = File(...)):
 
 
 @router.post("/excel-para-csv-processado")
-async def processar_e_exportar_csv(file: UploadFile = File(...)):
+async def processar_e_exportar_csv(
+    file: UploadFile = File(...),
+    formato: str = Query("csv", description="Formato do arquivo exportado: 'csv', 'parquet' ou 'xlsx'")
+):
     """
     📊 ENDPOINT COMPLETO (CSV):
-    1. Recebe Excel com dados BRUTOS de jogadores
+    1. Recebe Excel (ou CSV/Parquet/Arrow) com dados BRUTOS de jogadores
     2. Aplica TODO o pré-processamento
     3. Faz previsão dos 3 targets para TODOS os jogadores
-    4. Retorna um arquivo CSV completo com os dados processados e as previsões
+    4. Retorna um arquivo (CSV, Parquet ou XLSX) com os dados processados e as previsões,
+       gerado e enviado em blocos de linhas
     
     ✅ Aceita planilhas COM ou SEM valores de Target1/2/3
+    ✅ Pré-processamento e pontuação também em blocos: a memória não cresce com a planilha
+       além da própria planilha lida (o resultado não é guardado no cache de resultados)
+    ✅ Arquivos já processados por excel-completo-com-preprocessamento vêm do cache (cabeçalho `X-Cache: HIT`)
     """
-    if not file.filename or not file.filename.endswith(('.xlsx', '.xls')):
+    _validar_arquivo(file.filename)
+    
+    if formato not in FORMATOS:
         raise HTTPException(
-            status_code=415,
-            detail="Arquivo deve ser Excel (.xlsx ou .xls)"
+            status_code=400,
+            detail=f"Formato de exportação inválido. Use um de: {', '.join(FORMATOS)}"
         )
         
     try:
         contents = await file.read()
-        df_bruto = pd.read_excel(io.BytesIO(contents), sheet_name='Session Activities')
-        
-        # ✅ NOVO: Verificar se os targets já existem
-        tem_targets_originais = all(col in df_bruto.columns for col in ['Target1', 'Target2', 'Target3'])
+        modelos = await garantir_modelos()
+        _, resultado = await _consultar_cache(contents, file.filename, modelos)
+        veio_do_cache = resultado is not None
         
-        df_processado = preprocessor.processar(df_bruto)
+        if resultado is None:
+            df_bruto = await _ler_upload(contents, file.filename, modelos)
+            if modelos["estado"] is None:
+                # Sem estado ajustado, a imputação usa as medianas do lote inteiro:
+                # o pré-processamento não pode ser feito em blocos
+                logger.warning("⚠️ Sem estado ajustado do pré-processamento: exportação pontuada com o lote inteiro")
+                resultado = await _pontuar_planilha(df_bruto, modelos)
         
-        # ✅ CRÍTICO: Garantir que as colunas existam antes de adicionar previsões
-        for target_col in ['Target1', 'Target2', 'Target3']:
-            if target_col not in df_processado.columns:
-                df_processado[target_col] = None
-        
-        # Listas para armazenar previsões
-        previsoes_t1, previsoes_t2, previsoes_t3 = [], [], []
-        
-        for idx in range(len(df_processado)):
-            previsoes_jogador = {}
-            try:
-                linha = df_processado.iloc[idx]
-                df_jogador = pd.DataFrame([linha.to_dict()])
-                
-                for target_name in ["Target1", "Target2", "Target3"]:
-                    key = target_name.lower()
-                    if key not in artefatos: 
-                        continue
-                    
-                    modelo = artefatos[key]["modelo"]
-                    scaler = artefatos[key]["scaler"]
-                    features_modelo = artefatos[key]["features"]
-                    features_scaler = scaler.feature_names_in_
-
-                    dados_para_scaler = df_jogador[features_scaler]
-                    dados_scaled = scaler.transform(dados_para_scaler)
-                    dados_scaled_df = pd.DataFrame(dados_scaled, columns=features_scaler)
-                    
-                    df_final = pd.concat([
-                        dados_scaled_df, 
-                        df_jogador.drop(columns=features_scaler, errors='ignore')
-                    ], axis=1)
-                    
-                    dados_para_previsao = df_final[features_modelo]
-                    pred = modelo.predict(dados_para_previsao)[0]
-                    previsoes_jogador[target_name] = round(float(pred), 4)
-
-                previsoes_t1.append(previsoes_jogador.get("Target1"))
-                previsoes_t2.append(previsoes_jogador.get("Target2"))
-                previsoes_t3.append(previsoes_jogador.get("Target3"))
-
-            except Exception as e:
-                print(f"⚠️ Erro na predição para linha {idx+1}: {e}. Inserindo None.")
-                previsoes_t1.append(None)
-                previsoes_t2.append(None)
-                previsoes_t3.append(None)
-
-        # ✅ ADICIONAR previsões como NOVAS colunas (não sobrescrever)
-        df_processado['Target1_Previsto'] = previsoes_t1
-        df_processado['Target2_Previsto'] = previsoes_t2
-        df_processado['Target3_Previsto'] = previsoes_t3
-        
-        # ✅ NOVO: Se tinha valores originais, renomear para diferenciá-los
-        if tem_targets_originais:
-            df_processado = df_processado.rename(columns={
-                'Target1': 'Target1_Original',
-                'Target2': 'Target2_Original',
-                'Target3': 'Target3_Original'
-            })
-        
-        # Preparar o CSV para download
-        csv_buffer = io.StringIO()
-        df_processado.to_csv(csv_buffer, index=False, sep=';', decimal=',')
-        csv_buffer.seek(0)
+        # Nos dois caminhos o primeiro bloco é escrito antes da resposta começar, para
+        # que erros no arquivo (ex.: uma conversão que o formato não aceita) ainda
+        # virem um status HTTP de erro
+        if resultado is not None:
+            # Resultado já pontuado: só a escrita acontece bloco a bloco, à medida que a resposta é enviada
+            exportador = criar_exportador(formato, resultado["df_processado"])
+            blocos = metricas.cronometrar_gerador(
+                _exportar_em_blocos(resultado, exportador, settings.EXPORTACAO_LINHAS_POR_BLOCO),
+                f"exportacao_{formato}", resultado["total_jogadores"]
+            )
+            primeiro = await pool_trabalho.executar("serializacao", next, blocos, b"")
+            corpo = itertools.chain([primeiro], blocos)
+        else:
+            # Pré-processamento, pontuação e escrita bloco a bloco
+            exportador = criar_exportador(formato, df_bruto)
+            blocos = _pontuar_e_exportar_em_blocos(
+                df_bruto, modelos, exportador, formato, settings.EXPORTACAO_LINHAS_POR_BLOCO
+            )
+            corpo = _primeiro_e_restante(await anext(blocos), blocos)
         
         return StreamingResponse(
-            iter([csv_buffer.getvalue()]),
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=dados_processados_com_previsoes.csv"}
+            corpo,
+            media_type=exportador.media_type,
+            headers={
+                "Content-Disposition": f"attachment; filename=dados_processados_com_previsoes.{exportador.extensao}",
+                "X-Cache": "HIT" if veio_do_cache else "MISS"
+            }
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"❌ Erro fatal ao processar arquivo para CSV: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/cache/estatisticas")
+async def estatisticas_cache():
+    """Acertos/faltas e ocupação do cache de resultados dos uploads."""
+    return cache_resultados.estatisticas()
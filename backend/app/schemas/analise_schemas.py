@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Dict, Any, Optional
 
 # Define a estrutura do payload completo que esperamos do Colab
 class AnalisePayload(BaseModel):
@@ -37,4 +37,35 @@ class MetadataModelos(BaseModel):
     equipe: List[str]
     modelos: Dict[str, Any]
     total_features_dataset: int
-    total_jogadores: int
\ No newline at end of file
+    total_jogadores: int
+
+# Consulta em /analise/consulta: um filtro por campo, com intervalo (min/max),
+# igualdade (igual) ou pertinência a uma lista de valores (em)
+class FiltroConsulta(BaseModel):
+    campo: str
+    min: Optional[Any] = None
+    max: Optional[Any] = None
+    igual: Optional[Any] = None
+    em: Optional[List[Any]] = None
+
+    @model_validator(mode='after')
+    def validar_tipo(self):
+        tipos = [self.min is not None or self.max is not None, self.igual is not None, self.em is not None]
+        if sum(tipos) != 1:
+            raise ValueError(f"O filtro de '{self.campo}' deve usar exatamente um de: 'min'/'max', 'igual' ou 'em'.")
+        return self
+
+class EntradaConsulta(BaseModel):
+    filtros: List[FiltroConsulta] = []
+    ordenar_por: Optional[str] = None
+    decrescente: bool = False
+    deslocamento: int = Field(0, ge=0)
+    limite: int = Field(50, ge=1, le=1000)
+    campos: Optional[List[str]] = None
+
+class SaidaConsulta(BaseModel):
+    total_dataset: int
+    total_filtrado: int
+    deslocamento: int
+    limite: int
+    linhas: List[Dict[str, Any]]
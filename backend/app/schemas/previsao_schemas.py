@@ -1,15 +1,45 @@
 # /app/schemas/previsao_schemas.py
-from pydantic import BaseModel
-from typing import Dict, Any
+from pydantic import BaseModel, model_validator
+from typing import Dict, Any, List, Optional
 
-# O que a API espera receber: os dados de um jogador
+# O que a API espera receber: os dados de um jogador, OU só o Código de Acesso
+# de um jogador já conhecido (dataset de análise ou upload recente)
 class EntradaPrevisao(BaseModel):
     # Usamos um dicionário genérico. Em um projeto real, você poderia
     # definir cada uma das 100+ features aqui para validação máxima.
-    dados_jogador: Dict[str, Any]
+    dados_jogador: Optional[Dict[str, Any]] = None
+    codigo_acesso: Optional[str] = None
+
+    @model_validator(mode='after')
+    def validar_formato(self):
+        if (self.dados_jogador is None) == (self.codigo_acesso is None):
+            raise ValueError("Informe exatamente um dos campos: 'dados_jogador' ou 'codigo_acesso'.")
+        return self
 
 # O que a API vai retornar: as previsões
 class SaidaPrevisao(BaseModel):
     Target1: float
     Target2: float
-    Target3: float
\ No newline at end of file
+    Target3: float
+
+# Entrada em lote: OU uma lista de jogadores (registros), OU um dicionário
+# colunar {feature: [valores...]} com todas as listas do mesmo tamanho
+class EntradaPrevisaoLote(BaseModel):
+    jogadores: Optional[List[Dict[str, Any]]] = None
+    colunas: Optional[Dict[str, List[Any]]] = None
+
+    @model_validator(mode='after')
+    def validar_formato(self):
+        if (self.jogadores is None) == (self.colunas is None):
+            raise ValueError("Informe exatamente um dos campos: 'jogadores' (lista de registros) ou 'colunas' (formato colunar).")
+        if self.colunas is not None and len({len(valores) for valores in self.colunas.values()}) > 1:
+            raise ValueError("Todas as listas em 'colunas' devem ter o mesmo tamanho.")
+        return self
+
+# Saída em lote (colunar): uma lista de previsões por target, na ordem de entrada.
+# Jogadores que não puderam ser pontuados ficam com None e aparecem em 'erros'.
+class SaidaPrevisaoLote(BaseModel):
+    total_jogadores: int
+    processados_com_sucesso: int
+    previsoes: Dict[str, List[Optional[float]]]
+    erros: Optional[List[Dict[str, Any]]] = None
@@ -3,6 +3,8 @@ from fastapi.security import APIKeyHeader
 from app.core.settings import settings
 
 api_key_header = APIKeyHeader(name="X-API-Key")
+# Sem erro automático quando o cabeçalho falta: /metrics e /prontidao podem ser abertos por configuração
+api_key_header_opcional = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 async def get_api_key(api_key_header: str = Security(api_key_header)):
     """Verifica se a chave de API enviada no cabeçalho é válida."""
@@ -12,4 +14,14 @@ async def get_api_key(api_key_header: str = Security(api_key_header)):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Chave de API inválida ou ausente.",
-        )
\ No newline at end of file
+        )
+
+
+async def get_api_key_operacao(api_key_header: str | None = Security(api_key_header_opcional)):
+    """
+    Chave de API dos endpoints de operação (/metrics e /prontidao). Com
+    ENDPOINTS_OPERACAO_PUBLICOS=true (para probes e scrapers sem o cabeçalho), não é exigida.
+    """
+    if settings.ENDPOINTS_OPERACAO_PUBLICOS:
+        return None
+    return await get_api_key(api_key_header)
@@ -0,0 +1,126 @@
+"""
+Benchmark do avaliador compilado de ensembles de árvores (app/inference/arvores.py):
+o `predict` nativo com DataFrame (caminho de pontuar_lote) e com matriz numpy
+(caminho do plano de POST /prever) contra o percurso vetorizado dos arrays
+achatados e o modo automático usado pela API (compilado até
+INFERENCIA_COMPILADA_MAX_LINHAS linhas, nativo acima disso).
+
+Por padrão, treina em dados sintéticos um modelo de cada tipo suportado (XGBoost,
+Random Forest, Extra Trees e Gradient Boosting); com --pasta-modelos, usa os
+final_model*.pkl de cada pasta de target. A entrada tem NaN injetados para os
+modelos que os aceitam. O benchmark falha se alguma previsão compilada não for
+idêntica (valor e dtype) à do `predict` nativo.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.bench_arvores --lotes 1,16,256,4096,65536
+"""
+import argparse
+import sys
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.settings import settings  # noqa: E402
+from app.inference.arvores import compilar_ensemble  # noqa: E402
+from app.inference.scoring import _modelo_aceita_nan  # noqa: E402
+from benchmarks.bench_valores_especiais import cronometrar  # noqa: E402
+
+
+def treinar_modelos(n_features: int, semente: int = 0) -> dict:
+    """Um modelo de cada tipo suportado, treinado em um problema de regressão sintético."""
+    from sklearn.ensemble import ExtraTreesRegressor, GradientBoostingRegressor, RandomForestRegressor
+    from xgboost import XGBRegressor
+
+    rng = np.random.default_rng(semente)
+    features = [f"F{i:02d}" for i in range(n_features)]
+    X = pd.DataFrame(rng.normal(size=(5000, n_features)), columns=features)
+    y = X.iloc[:, 0] * 3 + np.sin(X.iloc[:, 1] * 2) - X.iloc[:, 2] * X.iloc[:, 3] + rng.normal(scale=0.1, size=len(X))
+    X_com_nan = X.mask(rng.random(X.shape) < 0.05)
+
+    modelos = {
+        "xgboost": XGBRegressor(n_estimators=300, max_depth=6, learning_rate=0.05, random_state=semente).fit(X_com_nan, y),
+        "random_forest": RandomForestRegressor(n_estimators=100, max_depth=10, random_state=semente, n_jobs=-1).fit(X, y),
+        "extra_trees": ExtraTreesRegressor(n_estimators=100, max_depth=10, random_state=semente, n_jobs=-1).fit(X, y),
+        "gradient_boosting": GradientBoostingRegressor(n_estimators=200, max_depth=3, random_state=semente).fit(X, y),
+    }
+    return {nome: (modelo, features) for nome, modelo in modelos.items()}
+
+
+def carregar_modelos(pasta: Path) -> dict:
+    """Modelo e lista de features de cada pasta de target (versão aprimorada, se houver)."""
+    modelos = {}
+    for subpasta in sorted(p for p in pasta.iterdir() if p.is_dir()):
+        for sufixo in ("_aprimorado", ""):
+            caminho_modelo = subpasta / f"final_model{sufixo}.pkl"
+            caminho_features = subpasta / f"selected_features{sufixo}.pkl"
+            if caminho_modelo.exists() and caminho_features.exists():
+                modelos[subpasta.name] = (joblib.load(caminho_modelo), list(joblib.load(caminho_features)))
+                break
+    return modelos
+
+
+def montar_entrada(modelo, features: list, linhas: int, semente: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(semente)
+    df = pd.DataFrame(rng.normal(size=(linhas, len(features))), columns=features)
+    if _modelo_aceita_nan(modelo):
+        df = df.mask(rng.random(df.shape) < 0.05)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lotes", default="1,16,256,4096,65536",
+                        help="Tamanhos de lote (linhas), separados por vírgula")
+    parser.add_argument("--features", type=int, default=20, help="Features dos modelos sintéticos")
+    parser.add_argument("--pasta-modelos", type=Path, default=None,
+                        help="Pasta com uma subpasta por target (ex.: app/models) em vez dos modelos sintéticos")
+    parser.add_argument("--max-linhas", type=int, default=settings.INFERENCIA_COMPILADA_MAX_LINHAS)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    lotes = [int(lote) for lote in args.lotes.split(",")]
+    if args.pasta_modelos is not None:
+        modelos = carregar_modelos(args.pasta_modelos)
+    else:
+        modelos = treinar_modelos(args.features)
+
+    for nome, (modelo, features) in modelos.items():
+        compilado = compilar_ensemble(modelo, features)
+        if compilado is None:
+            print(f"{nome}: {type(modelo).__name__} sem avaliador compilado; ignorado")
+            continue
+        automatico = compilar_ensemble(modelo, features, args.max_linhas)
+
+        print(f"{nome}: {compilado.descricao}, {compilado.total_arvores} árvores, "
+              f"profundidade {compilado.profundidade}, {len(compilado.feature)} nós "
+              f"(melhor de {args.repeticoes}, µs por lote)")
+        print(f"  {'linhas':>7} {'nativo df':>11} {'nativo np':>11} {'compilado':>11} "
+              f"{'automático':>11} {'ganho':>7}")
+        for linhas in lotes:
+            df = montar_entrada(modelo, features, linhas)
+            X = df.to_numpy(dtype='float64')
+
+            referencia = np.asarray(modelo.predict(df))
+            for saida in (compilado.prever(X), automatico.prever(X)):
+                assert saida.dtype == referencia.dtype, f"{nome}: dtype {saida.dtype} != {referencia.dtype}"
+                np.testing.assert_array_equal(saida, referencia, err_msg=f"{nome}, {linhas} linhas")
+
+            casos = {
+                "nativo df": cronometrar(lambda: modelo.predict(df), args.repeticoes),
+                "nativo np": cronometrar(lambda: modelo.predict(X), args.repeticoes),
+                "compilado": cronometrar(lambda: compilado.prever(X), args.repeticoes),
+                "automático": cronometrar(lambda: automatico.prever(X), args.repeticoes),
+            }
+            print(f"  {linhas:>7} " + " ".join(f"{segundos * 1e6:11.0f}" for segundos in casos.values())
+                  + f" {casos['nativo df'] / casos['automático']:6.1f}x")
+    print("Previsões compiladas idênticas às do predict nativo em todos os lotes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Microbenchmark de DataPreprocessor.criar_features: a versão original (uma passada
+`axis=1` do pandas por estatística e uma atribuição de coluna por feature) contra
+a versão com o kernel de agregação (cada grupo lido uma vez, todas as estatísticas
+numa passada e as features escritas com um único concat).
+
+A entrada é o JogadoresTeste.xlsx replicado até N linhas, com -1 injetados para
+haver NaN nos grupos. O benchmark falha se a saída não for idêntica à original.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.bench_features --linhas 20000
+"""
+import argparse
+import sys
+import warnings
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.preprocessing import DataPreprocessor  # noqa: E402
+from benchmarks.bench_valores_especiais import cronometrar, montar_upload  # noqa: E402
+
+
+def criar_features_original(preprocessador: DataPreprocessor, df: pd.DataFrame) -> pd.DataFrame:
+    """Cópia fiel da implementação anterior, usada como referência."""
+    df_featured = df.copy()
+    plano = preprocessador.plano
+    def grupo(nome):
+        return df_featured.iloc[:, plano.posicoes[nome]]
+
+    if 'F0103' in df_featured.columns:
+        df_featured['Idade_Anos'] = df_featured['F0103'] * (84 - 53) + 53
+    if plano.grupos['likert']:
+        likert = grupo('likert')
+        df_featured['Likert_Score_Medio'] = likert.mean(axis=1)
+        df_featured['Likert_Score_Std'] = likert.std(axis=1)
+        df_featured['Likert_Score_Min'] = likert.min(axis=1)
+        df_featured['Likert_Score_Max'] = likert.max(axis=1)
+        df_featured['Likert_Missing_Count'] = likert.isnull().sum(axis=1)
+    if plano.grupos['tempo']:
+        tempo = grupo('tempo')
+        df_featured['Tempo_Total'] = tempo.sum(axis=1)
+        df_featured['Tempo_Medio'] = tempo.mean(axis=1)
+        df_featured['Tempo_Std'] = tempo.std(axis=1)
+        df_featured['Tempo_Min'] = tempo.min(axis=1)
+        df_featured['Tempo_Max'] = tempo.max(axis=1)
+        df_featured['Tem_Timeout'] = (tempo > 300).any(axis=1).astype(int)
+    if plano.grupos['q04']:
+        q04 = grupo('q04')
+        df_featured['Performance_Score_Total'] = q04.sum(axis=1)
+        df_featured['Performance_Score_Medio'] = q04.mean(axis=1)
+    if plano.grupos['p']:
+        respostas_p = grupo('p')
+        df_featured['Respostas_P_Media'] = respostas_p.mean(axis=1)
+        df_featured['Respostas_P_Std'] = respostas_p.std(axis=1)
+        df_featured['Respostas_P_Missing'] = respostas_p.isnull().sum(axis=1)
+    if plano.grupos['qtd']:
+        qtd = grupo('qtd')
+        df_featured['Quantidade_Total'] = qtd.sum(axis=1)
+        df_featured['Quantidade_Media'] = qtd.mean(axis=1)
+    if 'QtdHorasDormi' in df_featured.columns and 'QtdHorasSono' in df_featured.columns:
+        df_featured['Razao_Sono'] = df_featured['QtdHorasDormi'] / (df_featured['QtdHorasSono'] + 1e-6)
+    if 'Q0413' in df_featured.columns and 'Q0414' in df_featured.columns:
+        df_featured['Razao_Q0413_Q0414'] = df_featured['Q0413'] / (df_featured['Q0414'] + 1e-6)
+    if 'Data/Hora Último' in df_featured.columns:
+        df_featured['Hora_do_Dia'] = df_featured['Data/Hora Último'].dt.hour
+        df_featured['Dia_da_Semana'] = df_featured['Data/Hora Último'].dt.dayofweek
+        df_featured['Fim_de_Semana'] = (df_featured['Dia_da_Semana'] >= 5).astype(int)
+    if plano.grupos['f07']:
+        df_featured['Consistencia_F07'] = grupo('f07').std(axis=1)
+    if plano.grupos['f11']:
+        df_featured['Consistencia_F11'] = grupo('f11').std(axis=1)
+    if 'Performance_Score_Total' in df_featured.columns and 'Tempo_Total' in df_featured.columns:
+        df_featured['Eficiencia_Performance'] = (
+            df_featured['Performance_Score_Total'] / (df_featured['Tempo_Total'] + 1e-6)
+        )
+    if 'Likert_Score_Medio' in df_featured.columns and 'Consistencia_F07' in df_featured.columns:
+        df_featured['Atitude_Consistente'] = (
+            df_featured['Likert_Score_Medio'] * df_featured['Consistencia_F07']
+        )
+    if 'Idade_Anos' in df_featured.columns:
+        df_featured['Idade_Anos_Sq'] = df_featured['Idade_Anos'] ** 2
+    return df_featured
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=20000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    upload = montar_upload(args.linhas)
+    casos = {}
+    for modo_pipeline in (False, True):
+        preprocessador = DataPreprocessor(modo_pipeline=modo_pipeline)
+        copiar = not modo_pipeline
+        df_tratado = preprocessador.tratar_valores_especiais(
+            preprocessador.limpar_dados(upload, copiar=copiar), copiar=copiar
+        )
+
+        referencia = criar_features_original(preprocessador, df_tratado)
+        pd.testing.assert_frame_equal(preprocessador.criar_features(df_tratado, copiar=copiar), referencia,
+                                      check_exact=True)
+
+        modo = "pipeline" if modo_pipeline else "padrão"
+        casos[f"original (modo {modo})"] = cronometrar(
+            lambda: criar_features_original(preprocessador, df_tratado), args.repeticoes)
+        casos[f"kernel (modo {modo})"] = cronometrar(
+            lambda: preprocessador.criar_features(df_tratado, copiar=copiar), args.repeticoes)
+    print("Saídas idênticas à implementação original (modo padrão e modo pipeline)")
+
+    print(f"criar_features em {args.linhas} linhas x {len(df_tratado.columns)} colunas "
+          f"(melhor de {args.repeticoes})")
+    for nome, segundos in casos.items():
+        referencia_s = casos[nome.replace("kernel", "original")]
+        print(f"  {nome:<28} {segundos * 1000:9.1f} ms  ({referencia_s / segundos:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark da ingestão de uploads: leitura antiga (pd.read_excel via openpyxl, todas
+as colunas) contra a camada de ingestão (aba única, motor calamine quando disponível,
+poda de colunas) e contra os formatos sem XML (CSV, Parquet, Arrow).
+
+A planilha de teste é o JogadoresTeste.xlsx replicado até N linhas.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.bench_ingestao --linhas 5000
+"""
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.feather as feather
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.ingestao import MOTOR_EXCEL, ler_planilha  # noqa: E402
+from app.preprocessing.dependencias import FiltroColunas  # noqa: E402
+
+PLANILHA_EXEMPLO = Path(__file__).resolve().parent.parent.parent / "JogadoresTeste.xlsx"
+
+# Conjunto de features representativo dos modelos, usado para a poda de colunas
+FEATURES_EXEMPLO = [
+    'Tempo_Total', 'Likert_Score_Medio', 'Performance_Score_Total', 'Eficiencia_Performance',
+    'Idade_Anos_Sq', 'Razao_Sono', 'Consistencia_F07', 'F0705'
+]
+
+
+def cronometrar(func, repeticoes: int) -> float:
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=5000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    base = pd.read_excel(PLANILHA_EXEMPLO, sheet_name='Session Activities')
+    df = pd.concat([base] * (args.linhas // len(base) + 1), ignore_index=True).head(args.linhas)
+    df['Data/Hora Último'] = df['Data/Hora Último'].astype(str)
+
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer) as writer:
+        df.to_excel(writer, sheet_name='Session Activities', index=False)
+        pd.DataFrame({'Coluna': ['F0101'], 'Features': ['Exemplo']}).to_excel(writer, sheet_name='Features', index=False)
+    xlsx = buffer.getvalue()
+    csv = df.to_csv(index=False, sep=';', decimal=',').encode('utf-8')
+    buffer = io.BytesIO()
+    df.to_parquet(buffer)
+    parquet = buffer.getvalue()
+    buffer = io.BytesIO()
+    feather.write_feather(df, buffer)
+    arrow = buffer.getvalue()
+
+    filtro = FiltroColunas(FEATURES_EXEMPLO)
+    colunas_lidas = sum(filtro(col) for col in df.columns)
+
+    casos = {
+        "antes: read_excel openpyxl (sheet_name=None, todas as abas)":
+            lambda: pd.read_excel(io.BytesIO(xlsx), sheet_name=None),
+        "antes: read_excel openpyxl ('Session Activities')":
+            lambda: pd.read_excel(io.BytesIO(xlsx), sheet_name='Session Activities'),
+        f"depois: xlsx ({MOTOR_EXCEL}), todas as colunas":
+            lambda: ler_planilha(xlsx, "x.xlsx"),
+        f"depois: xlsx ({MOTOR_EXCEL}), poda ({colunas_lidas}/{len(df.columns)} colunas)":
+            lambda: ler_planilha(xlsx, "x.xlsx", filtro),
+        "depois: csv, poda": lambda: ler_planilha(csv, "x.csv", filtro),
+        "depois: parquet, poda": lambda: ler_planilha(parquet, "x.parquet", filtro),
+        "depois: arrow, poda": lambda: ler_planilha(arrow, "x.arrow", filtro),
+    }
+
+    print(f"Ingestão de {args.linhas} linhas x {len(df.columns)} colunas (melhor de {args.repeticoes})")
+    referencia = None
+    for nome, func in casos.items():
+        segundos = cronometrar(func, args.repeticoes)
+        referencia = referencia or segundos
+        print(f"  {nome:<62} {segundos * 1000:9.1f} ms  ({referencia / segundos:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark de memória do pré-processamento: pico de RSS do DataPreprocessor no modo
+padrão (uma cópia do DataFrame por etapa) contra o modo pipeline (buffer único,
+alterado no lugar, com bloco numérico float64 contíguo), em função do número de linhas.
+
+Cada medição roda num processo novo: o upload sintético (JogadoresTeste.xlsx
+replicado até N linhas) é montado, o pico de RSS é zerado (/proc/self/clear_refs)
+e o pico durante `processar` é comparado ao RSS de antes.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.bench_memoria_preprocessamento --linhas 1000 10000 50000
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import resource
+import subprocess
+import sys
+import warnings
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.preprocessing import DataPreprocessor  # noqa: E402
+
+PLANILHA_EXEMPLO = Path(__file__).resolve().parent.parent.parent / "JogadoresTeste.xlsx"
+
+
+def _ler_status(campo: str) -> int | None:
+    """Valor (em KB) de um campo de /proc/self/status, ex.: VmRSS ou VmHWM."""
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith(campo + ":"):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _zerar_pico() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def medir(modo_pipeline: bool, linhas: int) -> dict:
+    """Executada no processo filho: mede o pico de RSS de um `processar`."""
+    warnings.filterwarnings('ignore')
+    base = pd.read_excel(PLANILHA_EXEMPLO, sheet_name='Session Activities')
+    df = pd.concat([base] * (linhas // len(base) + 1), ignore_index=True).head(linhas).copy()
+    del base
+    gc.collect()
+
+    pico_zerado = _zerar_pico()
+    rss_antes = _ler_status("VmRSS")
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = DataPreprocessor(modo_pipeline=modo_pipeline).processar(df)
+    pico = _ler_status("VmHWM") if pico_zerado else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        "linhas": linhas,
+        "modo_pipeline": modo_pipeline,
+        "entrada_mb": df.memory_usage(deep=True).sum() / 2**20,
+        "saida_mb": resultado.memory_usage(deep=True).sum() / 2**20,
+        "pico_acima_entrada_mb": (pico - rss_antes) / 1024,
+        "pico_exato": pico_zerado,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--medir", choices=["padrao", "pipeline"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(medir(args.medir == "pipeline", args.linhas[0])))
+        return
+
+    print("Pico de RSS do pré-processamento acima do RSS com o upload já em memória (MB)")
+    print(f"  {'linhas':>8} {'entrada':>9} {'saída':>9} {'padrão':>9} {'pipeline':>9} {'redução':>8}")
+    for linhas in args.linhas:
+        medicoes = {}
+        for modo in ("padrao", "pipeline"):
+            saida = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_memoria_preprocessamento",
+                 "--medir", modo, "--linhas", str(linhas)],
+                cwd=Path(__file__).resolve().parent.parent, capture_output=True, text=True, check=True
+            ).stdout
+            medicoes[modo] = json.loads(saida.strip().splitlines()[-1])
+
+        padrao = medicoes["padrao"]["pico_acima_entrada_mb"]
+        pipeline = medicoes["pipeline"]["pico_acima_entrada_mb"]
+        print(f"  {linhas:>8} {medicoes['padrao']['entrada_mb']:>9.1f} {medicoes['padrao']['saida_mb']:>9.1f} "
+              f"{padrao:>9.1f} {pipeline:>9.1f} {padrao / max(pipeline, 1e-9):>7.1f}x")
+
+    if not medicoes["padrao"]["pico_exato"]:
+        print("  (sem /proc/self/clear_refs: o pico inclui a montagem do upload)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Microbenchmark de DataPreprocessor.tratar_valores_especiais: a versão original
+(replace + infer_objects no DataFrame inteiro e dois `.loc` mascarados por coluna)
+contra a versão vetorizada (uma máscara sobre o bloco numérico e os códigos de
+status tratados de uma vez nas colunas object), nos modos padrão e pipeline.
+
+A entrada é o JogadoresTeste.xlsx replicado até N linhas, com -1, 'N/A' e códigos
+de status injetados. O benchmark falha se a saída não for idêntica à original.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.bench_valores_especiais --linhas 20000
+"""
+import argparse
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.preprocessing import DataPreprocessor  # noqa: E402
+
+PLANILHA_EXEMPLO = Path(__file__).resolve().parent.parent.parent / "JogadoresTeste.xlsx"
+
+
+def tratar_valores_especiais_original(preprocessador: DataPreprocessor, df: pd.DataFrame) -> pd.DataFrame:
+    """Cópia fiel da implementação anterior, usada como referência."""
+    df_treated = df.copy()
+    df_treated = df_treated.replace('N/A', np.nan)
+    df_treated = df_treated.infer_objects(copy=False)
+    for col in preprocessador.col_likert + preprocessador.col_tempo + preprocessador.col_nao_likert:
+        if col in df_treated.columns:
+            df_treated.loc[df_treated[col] == -1, col] = np.nan
+            df_treated.loc[df_treated[col] == -1.0, col] = np.nan
+            if df_treated[col].dtype == 'object':
+                df_treated.loc[df_treated[col].isin(['00', '01', '02', '10', '11', '12']), col] = np.nan
+                df_treated[col] = pd.to_numeric(df_treated[col], errors='coerce')
+    return df_treated
+
+
+def montar_upload(linhas: int) -> pd.DataFrame:
+    base = pd.read_excel(PLANILHA_EXEMPLO, sheet_name='Session Activities')
+    df = pd.concat([base] * (linhas // len(base) + 1), ignore_index=True).head(linhas).copy()
+
+    rng = np.random.default_rng(0)
+    numericas = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col]) and not col.startswith('Target')]
+    for col in numericas:
+        df.loc[rng.random(len(df)) < 0.05, col] = -1
+    df.loc[rng.random(len(df)) < 0.05, 'Código de Acesso'] = 'N/A'
+    return df
+
+
+def cronometrar(func, repeticoes: int) -> float:
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=20000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    upload = montar_upload(args.linhas)
+
+    # Entrada da etapa no modo padrão: saída de limpar_dados, com uma coluna NãoLikert
+    # que chega como object (números, 'N/A' e códigos de status)
+    preprocessador = DataPreprocessor()
+    df_limpo = preprocessador.limpar_dados(upload)
+    coluna_object = preprocessador.col_nao_likert[0]
+    rng = np.random.default_rng(1)
+    valores = df_limpo[coluna_object].astype(object)
+    valores[rng.random(len(valores)) < 0.1] = '01'
+    valores[rng.random(len(valores)) < 0.1] = 'N/A'
+    df_limpo[coluna_object] = valores
+
+    referencia = tratar_valores_especiais_original(preprocessador, df_limpo)
+    pd.testing.assert_frame_equal(preprocessador.tratar_valores_especiais(df_limpo), referencia, check_exact=True)
+
+    # Modo pipeline: a etapa altera o buffer no lugar, então cada execução recebe um buffer novo
+    pipeline = DataPreprocessor(modo_pipeline=True)
+    referencia_upload = tratar_valores_especiais_original(preprocessador, preprocessador.limpar_dados(upload))
+    saida_pipeline = pipeline.tratar_valores_especiais(pipeline.limpar_dados(upload, copiar=False), copiar=False)
+    pd.testing.assert_frame_equal(saida_pipeline, referencia_upload, check_exact=True)
+    print("Saídas idênticas à implementação original (modo padrão e modo pipeline)")
+
+    def etapa_pipeline():
+        buffer = pipeline.limpar_dados(upload, copiar=False)
+        inicio = time.perf_counter()
+        pipeline.tratar_valores_especiais(buffer, copiar=False)
+        return time.perf_counter() - inicio
+
+    casos = {
+        "original": cronometrar(lambda: tratar_valores_especiais_original(preprocessador, df_limpo), args.repeticoes),
+        "vetorizada (modo padrão)": cronometrar(lambda: preprocessador.tratar_valores_especiais(df_limpo), args.repeticoes),
+        "vetorizada (modo pipeline)": min(etapa_pipeline() for _ in range(args.repeticoes)),
+    }
+
+    print(f"tratar_valores_especiais em {args.linhas} linhas x {len(df_limpo.columns)} colunas "
+          f"(melhor de {args.repeticoes})")
+    referencia_s = casos["original"]
+    for nome, segundos in casos.items():
+        print(f"  {nome:<28} {segundos * 1000:9.1f} ms  ({referencia_s / segundos:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Gerador de jogadores sintéticos com o layout da aba 'Session Activities': as mesmas
+colunas, na mesma ordem e com os mesmos tipos do JogadoresTeste.xlsx (Likert F07/F11,
+tempos T*/Tempo*, Q04, P, Qtd, colunas de cor e de explicação, data da sessão e
+targets), faixas de valores tiradas da amostra e taxas de ausência realistas (NaN e
+o código -1 de "sem resposta" nas colunas P/T da primeira fase).
+
+A geração é determinística para uma mesma semente e número de linhas e não depende
+de nenhum arquivo externo.
+
+Uso (a partir da pasta backend), para gerar um upload de teste:
+    python -m benchmarks.gerador --linhas 100000 --saida /tmp/jogadores.xlsx
+"""
+import argparse
+import io
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ABA = 'Session Activities'
+
+CORES = np.array(['FFFFFF', '000000', 'FF0000', '00FF00', '0000FF', 'FFFF00', 'FF00FF', '00FFFF'])
+ALFABETO_CODIGO = np.frombuffer(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789', dtype='S1')
+
+# Colunas da aba, na ordem da planilha: (nome, tipo, mínimo, máximo, taxa de NaN, taxa de -1)
+#   inteiro: resposta inteira uniforme em [mínimo, máximo] (float quando tem ausências)
+#   real: valor uniforme em [mínimo, máximo] com 3 casas (tempos, proporções)
+#   explicacao: coluna de texto livre que chega numérica e quase sempre vazia
+COLUNAS = [
+    ('Código de Acesso', 'codigo', None, None, 0.0, 0.0),
+    ('F0101', 'inteiro', 0, 4, 0.0, 0.0),
+    ('F0102', 'inteiro', 0, 1, 0.0, 0.0),
+    ('F0103', 'real', 0.294118, 0.705882, 0.0, 0.0),
+    ('F0104', 'inteiro', 0, 4, 0.0, 0.0),
+    ('F0201', 'inteiro', 0, 6, 0.0, 0.0),
+    ('Cor0202', 'cor', None, None, 0.0, 0.0),
+    ('F0203', 'inteiro', 0, 13, 0.0, 0.0),
+    ('Cor0204', 'cor', None, None, 0.0, 0.0),
+    ('F0205', 'inteiro', 0, 2, 0.0, 0.0),
+    ('Cor0206', 'cor', None, None, 0.0, 0.0),
+    ('F0207', 'cor', None, None, 0.0, 0.0),
+    ('Cor0208', 'cor', None, None, 0.0, 0.0),
+    ('Cor0209Outro', 'cor', None, None, 0.0, 0.0),
+    ('L0210 (não likert)', 'inteiro', 0, 6, 0.0, 0.0),
+    ('F0299 - Explicação Tempo', 'explicacao', 0, 0, 1.0, 0.0),
+    ('Q0401', 'inteiro', 0, 17, 0.0, 0.0),
+    ('Q0402', 'inteiro', 0, 7, 0.0, 0.0),
+    ('Q0403', 'inteiro', 2, 19, 0.0, 0.0),
+    ('T0404', 'real', 0.0, 48.231, 0.0, 0.0),
+    ('Q0405', 'inteiro', 0, 13, 0.0, 0.0),
+    ('Q0406', 'inteiro', 0, 1, 0.0, 0.0),
+    ('Q0407', 'inteiro', 1, 14, 0.0, 0.0),
+    ('T0408', 'real', 0.0, 40.132, 0.0, 0.0),
+    ('Q0409', 'inteiro', 0, 10, 0.0, 0.0),
+    ('Q0410', 'inteiro', 0, 2, 0.0, 0.0),
+    ('Q0411', 'inteiro', 7, 17, 0.0, 0.0),
+    ('T0412', 'real', 0.0, 29.382, 0.0, 0.0),
+    ('Q0413', 'inteiro', 0, 40, 0.0, 0.0),
+    ('Q0414', 'inteiro', 0, 10, 0.0, 0.0),
+    ('Q0415', 'inteiro', 10, 50, 0.0, 0.0),
+    ('T0498', 'real', 0.0, 114.661, 0.0, 0.0),
+    ('T0499 - Explicação Tempo', 'explicacao', 0, 0, 0.9, 0.0),
+    ('P01', 'inteiro', 1, 4, 0.1, 0.03),
+    ('T01', 'real', 1.0, 40.232, 0.1, 0.03),
+    ('P02', 'inteiro', 1, 4, 0.1, 0.03),
+    ('T02', 'real', 1.0, 23.604, 0.1, 0.03),
+    ('P03', 'inteiro', 2, 4, 0.1, 0.0),
+    ('T03', 'real', 1.75, 98.269, 0.1, 0.0),
+    ('P05', 'inteiro', 1, 4, 0.1, 0.0),
+    ('T05', 'real', 10.205, 54.964, 0.1, 0.0),
+    ('P09', 'inteiro', 1, 3, 0.1, 0.0),
+    ('T09', 'real', 3.927, 26.475, 0.1, 0.0),
+    ('P12', 'inteiro', 1, 4, 0.1, 0.03),
+    ('T12', 'real', 1.0, 12.0, 0.1, 0.03),
+    ('P15', 'inteiro', 1, 4, 0.1, 0.0),
+    ('T15', 'real', 3.834, 38.448, 0.1, 0.0),
+    ('PTempoTotal', 'real', 0.0, 243.226, 0.0, 0.0),
+    ('PTempoTotalExpl', 'explicacao', 0, 0, 0.9, 0.0),
+    ('QtdComida', 'inteiro', 1, 2, 0.0, 0.0),
+    ('QtdPessoas', 'inteiro', 0, 2, 0.0, 0.0),
+    ('QtdSom', 'inteiro', 0, 3, 0.0, 0.0),
+    ('GameTempoTotal', 'real', 13.217, 27.581, 0.0, 0.0),
+    ('QtdDormir', 'inteiro', 1, 3, 0.0, 0.0),
+    ('QtdHorasDormi', 'inteiro', 1, 2, 0.0, 0.0),
+    ('QtdHorasSono', 'inteiro', 2, 3, 0.0, 0.0),
+    ('Acordar', 'inteiro', 2, 5, 0.0, 0.0),
+    *[(f'F07{i:02d}', 'inteiro', 1, 5, 0.0, 0.0) for i in range(5, 14)],
+    ('F1101', 'inteiro', 0, 3, 0.0, 0.0),
+    ('F1102', 'real', 0.5, 16.682, 0.0, 0.0),
+    ('F1103', 'inteiro', 1, 4, 0.0, 0.0),
+    ('F1104', 'real', 0.0, 7.144, 0.0, 0.0),
+    ('F1105', 'inteiro', 1, 3, 0.0, 0.0),
+    ('Tempo1106', 'real', 1.397, 6.55, 0.0, 0.0),
+    ('F1107', 'inteiro', 0, 4, 0.0, 0.0),
+    ('Tempo1108', 'real', 0.0, 9.196, 0.0, 0.0),
+    ('F1109', 'inteiro', 1, 3, 0.0, 0.0),
+    ('Tempo1110', 'real', 0.0, 6.933, 0.0, 0.0),
+    ('F1111', 'inteiro', 2, 4, 0.0, 0.0),
+    ('Tempo1112', 'real', 0.397, 9.715, 0.0, 0.0),
+    ('TempoTotal11', 'real', 3.596, 52.372, 0.0, 0.0),
+    ('T1199Expl', 'explicacao', 0, 0, 1.0, 0.0),
+    ('Q1201', 'inteiro', 0, 14, 0.0, 0.0),
+    ('Q1202', 'inteiro', 0, 0, 0.0, 0.0),
+    ('Q1203', 'inteiro', 24, 24, 0.0, 0.0),
+    ('T1204', 'real', 50.981, 211.956, 0.0, 0.0),
+    ('T1205Expl', 'explicacao', 0, 0, 1.0, 0.0),
+    ('Q1206', 'inteiro', 1, 17, 0.0, 0.0),
+    ('Q1207', 'inteiro', 0, 0, 0.0, 0.0),
+    ('Q1208', 'inteiro', 0, 24, 0.0, 0.0),
+    ('Q1209', 'real', 76.847, 300.0, 0.0, 0.0),
+    ('T1210Expl', 'explicacao', 1, 11, 0.8, 0.0),
+    *[(nome, 'inteiro', 1, 5, 0.0, 0.0)
+      for nome in ['P04', 'P08', 'P10', 'P12.1', 'P02.1', 'P03.1', 'P07', 'P09.1', 'P13']],
+    ('T04', 'real', 1.449, 12.699, 0.0, 0.0),
+    ('T08', 'real', 4.717, 17.636, 0.0, 0.0),
+    ('T10', 'real', 2.533, 15.101, 0.0, 0.0),
+    ('T12.1', 'real', 1.6, 13.349, 0.0, 0.0),
+    ('T02.1', 'real', 2.0, 16.494, 0.0, 0.0),
+    ('T03.1', 'real', 2.315, 19.366, 0.0, 0.0),
+    ('T07', 'real', 2.415, 22.681, 0.0, 0.0),
+    ('T09.1', 'real', 2.5, 12.183, 0.0, 0.0),
+    ('T13', 'real', 3.133, 19.166, 0.0, 0.0),
+    ('TempoTotal', 'real', 49.781, 133.561, 0.0, 0.0),
+    ('TempoTotalExpl', 'explicacao', 0, 0, 1.0, 0.0),
+    ('Data/Hora Último', 'data', None, None, 0.0, 0.0),
+    ('Target1', 'target', 20.0, 80.0, 0.05, 0.0),
+    ('Target2', 'target', 20.0, 80.0, 0.05, 0.0),
+    ('Target3', 'target', 20.0, 80.0, 0.05, 0.0),
+]
+
+
+def _codigos(rng: np.random.Generator, linhas: int) -> np.ndarray:
+    letras = ALFABETO_CODIGO[rng.integers(0, len(ALFABETO_CODIGO), size=(linhas, 12))]
+    return np.ascontiguousarray(letras).view('S12').ravel().astype(str)
+
+
+def _datas(rng: np.random.Generator, linhas: int) -> np.ndarray:
+    # Sessões ao longo de 2025, no formato dia/mês da planilha
+    segundos = rng.integers(0, 365 * 24 * 3600, size=linhas)
+    datas = pd.Timestamp('2025-01-01') + pd.to_timedelta(segundos, unit='s')
+    return datas.strftime('%d/%m/%Y %H:%M:%S').to_numpy()
+
+
+def gerar_jogadores(linhas: int, semente: int = 0, com_targets: bool = False) -> pd.DataFrame:
+    """
+    DataFrame de `linhas` jogadores sintéticos com o layout da aba 'Session Activities'.
+    Sem `com_targets`, Target1/2/3 vêm vazios (como num upload de jogadores novos).
+    """
+    rng = np.random.default_rng(semente)
+    colunas = {}
+    for nome, tipo, minimo, maximo, taxa_nan, taxa_menos_um in COLUNAS:
+        if tipo == 'codigo':
+            colunas[nome] = _codigos(rng, linhas)
+            continue
+        if tipo == 'cor':
+            colunas[nome] = CORES[rng.integers(0, len(CORES), size=linhas)]
+            continue
+        if tipo == 'data':
+            colunas[nome] = _datas(rng, linhas)
+            continue
+        if tipo == 'target' and not com_targets:
+            colunas[nome] = np.full(linhas, np.nan)
+            continue
+
+        if tipo in ('inteiro', 'explicacao'):
+            valores = rng.integers(minimo, maximo + 1, size=linhas)
+        else:
+            valores = np.round(rng.uniform(minimo, maximo, size=linhas), 3)
+        if taxa_nan or taxa_menos_um:
+            valores = valores.astype('float64')
+            sorteio = rng.random(linhas)
+            valores[sorteio < taxa_menos_um] = -1
+            valores[(sorteio >= taxa_menos_um) & (sorteio < taxa_menos_um + taxa_nan)] = np.nan
+        colunas[nome] = valores
+    return pd.DataFrame(colunas)
+
+
+def para_upload(df: pd.DataFrame, formato: str) -> bytes:
+    """Bytes do arquivo de upload no formato pedido ('xlsx' com a aba de dicionário, ou 'csv')."""
+    if formato == 'xlsx':
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer) as writer:
+            df.to_excel(writer, sheet_name=ABA, index=False)
+            pd.DataFrame({'Coluna': ['F0101'], 'Features': ['Exemplo']}).to_excel(writer, sheet_name='Features', index=False)
+        return buffer.getvalue()
+    if formato == 'csv':
+        # Mesmo formato regional do CSV exportado pela API (';' e decimal ',')
+        return df.to_csv(index=False, sep=';', decimal=',').encode('utf-8')
+    raise ValueError(f"Formato de upload não suportado: {formato}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=10000)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--com-targets", action="store_true", help="Preenche Target1/2/3 (padrão: vazios)")
+    parser.add_argument("--saida", type=Path, required=True, help="Arquivo .xlsx ou .csv a gerar")
+    args = parser.parse_args()
+
+    formato = args.saida.suffix.lower().lstrip('.')
+    df = gerar_jogadores(args.linhas, args.semente, args.com_targets)
+    args.saida.write_bytes(para_upload(df, formato))
+    print(f"{args.linhas} jogadores x {len(df.columns)} colunas gravados em {args.saida}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Suíte de benchmarks do caminho de upload, de ponta a ponta, sobre jogadores
+sintéticos (benchmarks/gerador.py) de 1 mil a 1 milhão de linhas:
+
+    ingestao_xlsx, ingestao_csv          ler_planilha sobre o arquivo gerado
+    preprocessamento_<etapa>             cada etapa de DataPreprocessor.processar
+    preprocessamento                     o processar inteiro
+    pontuacao                            pontuar_lote_sem_repeticoes
+    serializacao_json                    registros + JSON de excel-completo-com-preprocessamento
+    serializacao_ndjson                  modo streaming do mesmo endpoint
+    exportacao_csv                       excel-para-csv-processado
+
+Roda offline: os modelos são substitutos treinados na hora (XGBoost, Random Forest
+e Gradient Boosting, com scaler) sobre features que o pré-processamento produz, e o
+estado do pré-processamento é ajustado numa base sintética de referência. Cada etapa
+é medida `--repeticoes` vezes (vale a melhor) e o relatório JSON traz o commit, o
+ambiente, os parâmetros e, por tamanho e etapa, segundos e linhas por segundo.
+
+Com --comparar, o relatório anterior é comparado etapa a etapa e o comando termina
+com status 1 se alguma ficar mais lenta que a tolerância.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.suite --linhas 1000 10000 100000
+    python -m benchmarks.suite --linhas 1000 10000 100000 --comparar benchmarks/resultados/suite-<commit>.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.settings import settings  # noqa: E402
+from app.exportacao import criar_exportador  # noqa: E402
+from app.inference import pontuar_lote_sem_repeticoes  # noqa: E402
+from app.inference.arvores import compilar_ensemble  # noqa: E402
+from app.ingestao import MOTOR_EXCEL, ler_planilha  # noqa: E402
+from app.preprocessing import DataPreprocessor  # noqa: E402
+from app.routers.upload_e_prever import (  # noqa: E402
+    _exportar_em_blocos, _gerar_ndjson, _montar_resultados, _resposta_json
+)
+from benchmarks.gerador import gerar_jogadores, para_upload  # noqa: E402
+
+DIR_RESULTADOS = Path(__file__).resolve().parent / "resultados"
+VERSAO_RELATORIO = 1
+
+# Features dos modelos substitutos: brutas e de engenharia, com e sem scaler
+FEATURES_MODELOS = {
+    "target1": ['Tempo_Total', 'Likert_Score_Medio', 'Performance_Score_Total', 'Eficiencia_Performance',
+                'Idade_Anos_Sq', 'F0705', 'Q0413', 'T0404'],
+    "target2": ['Razao_Sono', 'Consistencia_F07', 'Respostas_P_Media', 'Tempo_Medio', 'F1102', 'QtdSom'],
+    "target3": ['Atitude_Consistente', 'Likert_Score_Std', 'Quantidade_Total', 'Tempo_Max', 'Q0415',
+                'GameTempoTotal', 'F0101'],
+}
+
+
+def _commit() -> tuple[str | None, bool]:
+    """Commit atual e se há alterações não commitadas (None fora de um repositório git)."""
+    raiz = Path(__file__).resolve().parent.parent
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=raiz, capture_output=True, text=True, check=True)
+        sujo = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=raiz,
+                              capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit.stdout.strip(), bool(sujo.stdout.strip())
+
+
+def _ambiente() -> dict:
+    import sklearn
+    import xgboost
+    return {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "scikit-learn": sklearn.__version__,
+        "xgboost": xgboost.__version__,
+        "motor_excel": MOTOR_EXCEL,
+    }
+
+
+def montar_artefatos(referencia: pd.DataFrame, semente: int = 0) -> dict:
+    """
+    Modelos substitutos no formato de `registro_modelos` (modelo, scaler, features e
+    avaliador compilado), treinados em jogadores de referência já pré-processados
+    com um alvo sintético.
+    """
+    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.preprocessing import StandardScaler
+    from xgboost import XGBRegressor
+
+    estimadores = {
+        "target1": XGBRegressor(n_estimators=200, max_depth=5, learning_rate=0.05, random_state=semente, n_jobs=1),
+        "target2": RandomForestRegressor(n_estimators=50, max_depth=8, random_state=semente, n_jobs=1),
+        "target3": GradientBoostingRegressor(n_estimators=100, max_depth=3, random_state=semente),
+    }
+    rng = np.random.default_rng(semente)
+    artefatos = {}
+    for key, modelo in estimadores.items():
+        features = FEATURES_MODELOS[key]
+        # O scaler cobre metade das features, como nos modelos reais (parte escalada, parte não)
+        escaladas = features[::2]
+        X = referencia[features].apply(pd.to_numeric, errors='coerce').fillna(0.0)
+        scaler = StandardScaler().fit(X[escaladas])
+        X[escaladas] = scaler.transform(X[escaladas])
+        y = X.to_numpy() @ rng.normal(size=len(features)) + rng.normal(scale=0.1, size=len(X))
+        modelo.fit(X, y)
+        artefatos[key] = {
+            "modelo": modelo,
+            "scaler": scaler,
+            "features": features,
+            "versao": "SINTETICO",
+            "compilado": (
+                compilar_ensemble(modelo, features, settings.INFERENCIA_COMPILADA_MAX_LINHAS)
+                if settings.INFERENCIA_COMPILADA else None
+            ),
+        }
+    return artefatos
+
+
+def medir(func, repeticoes: int) -> tuple[list, object]:
+    """Tempos de `repeticoes` execuções de `func` e o resultado da última."""
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = func()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos, resultado
+
+
+def rodar_tamanho(linhas: int, artefatos: dict, estado: dict, args) -> list:
+    """Mede todas as etapas para um upload de `linhas` jogadores."""
+    resultados = []
+
+    def registrar(etapa: str, tempos: list):
+        melhor = min(tempos)
+        resultados.append({
+            "linhas": linhas,
+            "etapa": etapa,
+            "segundos": melhor,
+            "mediana_s": statistics.median(tempos),
+            "linhas_por_segundo": linhas / melhor if melhor > 0 else None,
+        })
+        print(f"  {etapa:<38} {melhor * 1000:11.1f} ms  {linhas / melhor if melhor > 0 else float('inf'):14,.0f} linhas/s")
+
+    upload = gerar_jogadores(linhas, args.semente)
+
+    # Ingestão: o Excel é gerado só até --max-linhas-excel (escrever XLSX grande é lento)
+    formatos = ["csv"] + (["xlsx"] if linhas <= args.max_linhas_excel else [])
+    df_bruto = None
+    for formato in sorted(formatos, reverse=True):
+        conteudo = para_upload(upload, formato)
+        tempos, df_bruto = medir(lambda: ler_planilha(conteudo, f"upload.{formato}"), args.repeticoes)
+        registrar(f"ingestao_{formato}", tempos)
+        del conteudo
+
+    # Pré-processamento: cada etapa vem de DataPreprocessor.tempos
+    por_etapa = {}
+    tempos_total = []
+    df_processado = None
+    for _ in range(args.repeticoes):
+        preprocessador = DataPreprocessor(
+            modo_pipeline=settings.PREPROCESSAMENTO_MODO_PIPELINE, estado=estado
+        )
+        inicio = time.perf_counter()
+        df_processado = preprocessador.processar(df_bruto)
+        tempos_total.append(time.perf_counter() - inicio)
+        for etapa, segundos in preprocessador.tempos.items():
+            por_etapa.setdefault(etapa, []).append(segundos)
+    for etapa, tempos in por_etapa.items():
+        registrar(f"preprocessamento_{etapa}", tempos)
+    registrar("preprocessamento", tempos_total)
+
+    tempos, (df_previsoes, validos, erros) = medir(
+        lambda: pontuar_lote_sem_repeticoes(df_processado, artefatos), args.repeticoes
+    )
+    registrar("pontuacao", tempos)
+
+    resultado = {
+        "total_jogadores": len(df_bruto),
+        "tem_targets_originais": False,
+        "df_originais": None,
+        "df_processado": df_processado,
+        "df_previsoes": df_previsoes,
+        "validos": validos,
+        "erros": erros,
+    }
+    modelos = {"versao": "sintetico", "metadados": {}}
+
+    def serializar_json():
+        registros = _montar_resultados(None, df_processado, df_previsoes, validos)
+        return _resposta_json({"status": "sucesso", "resultados": registros, "erros": erros or None}, {}).body
+
+    tempos, _ = medir(serializar_json, args.repeticoes)
+    registrar("serializacao_json", tempos)
+
+    tempos, _ = medir(
+        lambda: b"".join(_gerar_ndjson(resultado, modelos, settings.EXPORTACAO_LINHAS_POR_BLOCO)), args.repeticoes
+    )
+    registrar("serializacao_ndjson", tempos)
+
+    tempos, _ = medir(
+        lambda: b"".join(_exportar_em_blocos(
+            resultado, criar_exportador("csv", df_processado), settings.EXPORTACAO_LINHAS_POR_BLOCO
+        )),
+        args.repeticoes
+    )
+    registrar("exportacao_csv", tempos)
+    return resultados
+
+
+def comparar(relatorio: dict, anterior: dict, tolerancia: float, min_diferenca_s: float) -> list:
+    """
+    Imprime a razão atual/anterior por etapa e devolve as regressões: etapas mais
+    lentas que a tolerância relativa e por mais que `min_diferenca_s` (ruído das etapas curtas).
+    """
+    base = {(r["linhas"], r["etapa"]): r["segundos"] for r in anterior["resultados"]}
+    print(f"\nComparação com {anterior.get('commit') or 'relatório anterior'} "
+          f"(tolerância {tolerancia:.0%}; razão = atual / anterior)")
+    regressoes = []
+    for r in relatorio["resultados"]:
+        antes = base.get((r["linhas"], r["etapa"]))
+        if not antes:
+            continue
+        razao = r["segundos"] / antes
+        marcador = ""
+        if razao > 1 + tolerancia and r["segundos"] - antes > min_diferenca_s:
+            marcador = "  ⚠️ regressão"
+            regressoes.append({**r, "segundos_anterior": antes, "razao": razao})
+        print(f"  {r['linhas']:>8} {r['etapa']:<38} {antes * 1000:11.1f} ms -> {r['segundos'] * 1000:11.1f} ms "
+              f"({razao:5.2f}x){marcador}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--max-linhas-excel", type=int, default=100000,
+                        help="Maior tamanho com ingestão de XLSX medida (acima disso só CSV)")
+    parser.add_argument("--saida", type=Path, default=None,
+                        help="Relatório JSON (padrão: benchmarks/resultados/suite-<commit>.json)")
+    parser.add_argument("--comparar", type=Path, default=None, help="Relatório anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.15,
+                        help="Aumento relativo de tempo tolerado na comparação antes de acusar regressão")
+    parser.add_argument("--min-diferenca-ms", type=float, default=5.0,
+                        help="Aumento absoluto mínimo (ms) para acusar regressão, abaixo disso é ruído")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+    import logging
+    logging.disable(logging.WARNING)
+
+    commit, sujo = _commit()
+    print(f"Suíte de benchmarks: commit {commit[:10] if commit else '?'}{' (com alterações)' if sujo else ''}, "
+          f"{args.repeticoes} repetições, semente {args.semente}")
+
+    # Estado do pré-processamento e modelos substitutos, ajustados numa base de referência
+    referencia = gerar_jogadores(5000, args.semente + 1)
+    estado = DataPreprocessor().fit(referencia).estado
+    referencia_processada = DataPreprocessor(estado=estado).processar(referencia)
+    artefatos = montar_artefatos(referencia_processada, args.semente)
+    # Aquecimento: imports preguiçosos e caches de layout fora das medições
+    DataPreprocessor(modo_pipeline=settings.PREPROCESSAMENTO_MODO_PIPELINE, estado=estado).processar(
+        gerar_jogadores(100, args.semente)
+    )
+
+    resultados = []
+    for linhas in args.linhas:
+        print(f"\n{linhas:,} linhas")
+        resultados.extend(rodar_tamanho(linhas, artefatos, estado, args))
+
+    relatorio = {
+        "versao_relatorio": VERSAO_RELATORIO,
+        "commit": commit,
+        "alteracoes_nao_commitadas": sujo,
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "ambiente": _ambiente(),
+        "parametros": {
+            "linhas": args.linhas,
+            "repeticoes": args.repeticoes,
+            "semente": args.semente,
+            "max_linhas_excel": args.max_linhas_excel,
+            "modo_pipeline": settings.PREPROCESSAMENTO_MODO_PIPELINE,
+            "inferencia_compilada": settings.INFERENCIA_COMPILADA,
+        },
+        "resultados": resultados,
+    }
+
+    saida = args.saida or DIR_RESULTADOS / f"suite-{(commit or 'sem-commit')[:10]}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(relatorio, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nRelatório gravado em {saida}")
+
+    if args.comparar is not None:
+        anterior = json.loads(args.comparar.read_text(encoding="utf-8"))
+        regressoes = comparar(relatorio, anterior, args.tolerancia, args.min_diferenca_ms / 1000)
+        if regressoes:
+            print(f"\n{len(regressoes)} etapa(s) mais lenta(s) que a tolerância")
+            sys.exit(1)
+        print("\nNenhuma regressão acima da tolerância")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Os testes importam o pacote `app` a partir da pasta backend, como a API e os benchmarks
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,63 @@
+"""
+Kernel de agregação por linha de `criar_features` (app/preprocessing/agregacao.py):
+mesmo resultado do pandas com `axis=1, skipna=True` quando o grupo tem NaN, e o
+resultado de cada linha não depende das demais linhas do lote (o que mantém a
+exportação em blocos idêntica à da planilha inteira). O grupo Tempo é somado na
+ordem do cabeçalho, a mesma em qualquer processo do pool.
+
+Uso (a partir da pasta backend):
+    python -m pytest tests/test_agregacao.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.preprocessing.agregacao import agregar_linhas
+from app.preprocessing.plano_colunas import PlanoColunas
+
+ESTATISTICAS = ('soma', 'media', 'std', 'min', 'max', 'faltantes')
+
+
+def _grupo(linhas: int = 300, colunas: int = 12, semente: int = 0) -> np.ndarray:
+    """Bloco de um grupo largo (mais de 8 colunas), em ordem Fortran como o do DataFrame, com NaN só na linha 0."""
+    rng = np.random.default_rng(semente)
+    valores = np.asfortranarray(rng.uniform(0, 50, size=(linhas, colunas)))
+    valores[0, ::3] = np.nan
+    return valores
+
+
+def test_igual_ao_pandas_com_nan():
+    valores = _grupo()
+    df = pd.DataFrame(valores)
+    resultado = agregar_linhas(valores, ESTATISTICAS)
+
+    np.testing.assert_array_equal(resultado['soma'], df.sum(axis=1).to_numpy())
+    np.testing.assert_array_equal(resultado['media'], df.mean(axis=1).to_numpy())
+    np.testing.assert_allclose(resultado['std'], df.std(axis=1).to_numpy(), rtol=1e-12)
+    np.testing.assert_array_equal(resultado['min'], df.min(axis=1).to_numpy())
+    np.testing.assert_array_equal(resultado['max'], df.max(axis=1).to_numpy())
+    np.testing.assert_array_equal(resultado['faltantes'], df.isna().sum(axis=1).to_numpy())
+
+
+@pytest.mark.parametrize("linhas_por_bloco", [1, 7, 64])
+def test_linha_nao_depende_do_lote(linhas_por_bloco):
+    """Um bloco sem NaN soma cada linha exatamente como o lote inteiro, que tem NaN em outra linha."""
+    valores = _grupo()
+    inteiro = agregar_linhas(valores, ESTATISTICAS)
+
+    for inicio in range(0, len(valores), linhas_por_bloco):
+        bloco = agregar_linhas(valores[inicio:inicio + linhas_por_bloco], ESTATISTICAS)
+        for estatistica in ESTATISTICAS:
+            np.testing.assert_array_equal(
+                bloco[estatistica], inteiro[estatistica][inicio:inicio + linhas_por_bloco],
+                err_msg=f"{estatistica}, linhas {inicio}+"
+            )
+
+
+def test_grupo_tempo_na_ordem_do_cabecalho():
+    """A ordem das colunas (e da soma de Tempo_Total) não pode depender da semente de hash do processo."""
+    cabecalho = ('Código de Acesso', 'T12', 'F0101', 'TempoTotal11', 'T01', 'T0404', 'PTempoTotal', 'Tempo1106', 'T02')
+    plano = PlanoColunas(cabecalho)
+
+    assert plano.col_tempo == ['T12', 'TempoTotal11', 'T01', 'T0404', 'PTempoTotal', 'Tempo1106', 'T02']
+    assert [cabecalho[i] for i in plano.posicoes['tempo']] == plano.col_tempo
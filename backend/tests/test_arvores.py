@@ -0,0 +1,168 @@
+"""
+Paridade do avaliador compilado de ensembles de árvores (app/inference/arvores.py)
+com o `predict` nativo de cada tipo de estimador suportado, em lotes aleatórios
+(com NaN nas features para os modelos que os aceitam), e o retorno ao `predict`
+nativo para estimadores não suportados e lotes acima de `max_linhas`.
+
+Uso (a partir da pasta backend):
+    python -m pytest tests/test_arvores.py
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBRegressor
+
+from app.inference import pontuar_lote
+from app.inference.arvores import ELEMENTOS_POR_BLOCO, compilar_ensemble
+from app.inference.scoring import _modelo_aceita_nan
+
+# O predict nativo recebe matrizes numpy, como no caminho do plano de POST /prever
+pytestmark = pytest.mark.filterwarnings("ignore:X does not have valid feature names")
+
+N_FEATURES = 8
+FEATURES = [f"F{i:02d}" for i in range(N_FEATURES)]
+
+# O avaliador compilado reproduz o predict nativo bit a bit; a tolerância é só a
+# margem de arredondamento do dtype de saída (float32 no XGBoost, float64 no sklearn)
+TOLERANCIA_RELATIVA = {np.dtype("float32"): 1e-6, np.dtype("float64"): 1e-12}
+
+# Lotes de uma linha, pequenos e grandes o bastante para ocupar vários blocos de ELEMENTOS_POR_BLOCO
+LOTES = [1, 7, 128, 2048]
+
+ESTIMADORES = {
+    "xgboost": lambda: XGBRegressor(n_estimators=60, max_depth=5, learning_rate=0.1, random_state=0, n_jobs=1),
+    "random_forest": lambda: RandomForestRegressor(n_estimators=40, max_depth=8, random_state=0, n_jobs=1),
+    "gradient_boosting": lambda: GradientBoostingRegressor(n_estimators=60, max_depth=3, random_state=0),
+}
+
+
+def _problema(linhas: int, semente: int, taxa_nan: float = 0.0) -> tuple[pd.DataFrame, np.ndarray]:
+    rng = np.random.default_rng(semente)
+    X = pd.DataFrame(rng.normal(size=(linhas, N_FEATURES)), columns=FEATURES)
+    y = X["F00"] * 3 + np.sin(X["F01"] * 2) - X["F02"] * X["F03"] + rng.normal(scale=0.1, size=linhas)
+    if taxa_nan:
+        X = X.mask(rng.random(X.shape) < taxa_nan)
+    return X, y.to_numpy()
+
+
+def _treinar(nome: str):
+    modelo = ESTIMADORES[nome]()
+    # Treino com NaN para os modelos que os aceitam: cada nó aprende a direção dos ausentes
+    X, y = _problema(3000, semente=0, taxa_nan=0.1 if _modelo_aceita_nan(modelo) else 0.0)
+    return modelo.fit(X, y)
+
+
+@pytest.fixture(scope="module", params=list(ESTIMADORES))
+def modelo(request):
+    return _treinar(request.param)
+
+
+class _PredictProibido:
+    """Substitui o estimador para garantir que o lote foi avaliado pelo percurso compilado."""
+
+    def predict(self, X):
+        raise AssertionError("o lote deveria ter sido avaliado pelo percurso compilado")
+
+
+class _PredictEspiao:
+    def __init__(self, modelo):
+        self.modelo = modelo
+        self.chamadas = 0
+
+    def predict(self, X):
+        self.chamadas += 1
+        return self.modelo.predict(X)
+
+
+def _predict_nativo(modelo, X: np.ndarray) -> np.ndarray:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return np.asarray(modelo.predict(X))
+
+
+def _conferir(compilado, modelo, X: np.ndarray):
+    referencia = _predict_nativo(modelo, X)
+    compilado.modelo = _PredictProibido()
+    try:
+        saida = compilado.prever(X)
+    finally:
+        compilado.modelo = modelo
+    assert saida.dtype == referencia.dtype
+    np.testing.assert_allclose(saida, referencia, rtol=TOLERANCIA_RELATIVA[referencia.dtype], atol=0)
+
+
+@pytest.mark.parametrize("linhas", LOTES)
+def test_paridade_com_predict_nativo(modelo, linhas):
+    compilado = compilar_ensemble(modelo, FEATURES)
+    assert compilado is not None, f"{type(modelo).__name__} deveria ser compilado"
+    X, _ = _problema(linhas, semente=linhas)
+    _conferir(compilado, modelo, X.to_numpy(dtype="float64"))
+
+
+@pytest.mark.parametrize("linhas", LOTES)
+def test_paridade_com_nan(modelo, linhas):
+    compilado = compilar_ensemble(modelo, FEATURES)
+    X, _ = _problema(linhas, semente=100 + linhas, taxa_nan=0.2)
+    X = X.to_numpy(dtype="float64", copy=True)
+    X[0, :] = np.nan  # uma linha inteira de ausentes percorre só os filhos padrão
+
+    if not compilado.aceita_nan:
+        # O estimador recusa NaN: a entrada vai para o predict nativo, que levanta o mesmo erro
+        with pytest.raises(ValueError):
+            modelo.predict(X)
+        with pytest.raises(ValueError):
+            compilado.prever(X)
+        return
+
+    _conferir(compilado, modelo, X)
+
+
+def test_lote_ocupa_varios_blocos(modelo):
+    compilado = compilar_ensemble(modelo, FEATURES)
+    linhas = 3 * ELEMENTOS_POR_BLOCO // compilado.total_arvores + 1
+    X, _ = _problema(linhas, semente=7, taxa_nan=0.05 if compilado.aceita_nan else 0.0)
+    _conferir(compilado, modelo, X.to_numpy(dtype="float64"))
+
+
+def test_lote_acima_de_max_linhas_usa_predict_nativo(modelo):
+    compilado = compilar_ensemble(modelo, FEATURES, max_linhas=16)
+    espiao = _PredictEspiao(modelo)
+    compilado.modelo = espiao
+    X, _ = _problema(17, semente=3)
+    X = X.to_numpy(dtype="float64")
+
+    np.testing.assert_array_equal(compilado.prever(X), _predict_nativo(modelo, X))
+    assert espiao.chamadas == 1
+    compilado.prever(X[:16])
+    assert espiao.chamadas == 1
+
+
+@pytest.mark.parametrize("estimador", [
+    LinearRegression(),
+    HistGradientBoostingRegressor(max_iter=20, random_state=0),
+    XGBRegressor(n_estimators=10, objective="reg:logistic", random_state=0, n_jobs=1),
+], ids=lambda estimador: type(estimador).__name__)
+def test_estimador_nao_suportado_usa_predict(estimador):
+    X, y = _problema(500, semente=0)
+    if estimador.get_params().get("objective") == "reg:logistic":
+        y = (y > 0).astype(float)
+    estimador.fit(X, y)
+    assert compilar_ensemble(estimador, FEATURES) is None
+
+    # pontuar_lote sem avaliador compilado cai no predict nativo do estimador
+    scaler = StandardScaler().fit(X[FEATURES[:4]])
+    artefatos = {"target1": {
+        "modelo": estimador, "scaler": scaler, "features": FEATURES,
+        "compilado": compilar_ensemble(estimador, FEATURES),
+    }}
+    previsoes, validos, erros = pontuar_lote(X, artefatos)
+
+    entrada = X.copy()
+    entrada[FEATURES[:4]] = scaler.transform(X[FEATURES[:4]])
+    assert validos.all() and not erros
+    np.testing.assert_array_equal(previsoes["Target1"].to_numpy(), np.asarray(estimador.predict(entrada), dtype=float))
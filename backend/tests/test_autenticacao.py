@@ -0,0 +1,33 @@
+"""
+Chave de API nos endpoints de operação (/metrics e /prontidao, app/main.py): exigida
+como nos demais endpoints, a menos que ENDPOINTS_OPERACAO_PUBLICOS esteja ligado.
+
+Uso (a partir da pasta backend):
+    python -m pytest tests/test_autenticacao.py
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.settings import settings
+from app.main import app
+
+ENDPOINTS_OPERACAO = ["/metrics", "/prontidao"]
+
+
+@pytest.fixture
+def cliente():
+    # Sem o `with`, o startup (carga de modelos e dataset) não roda: só as rotas são testadas
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("url", ENDPOINTS_OPERACAO)
+def test_endpoint_de_operacao_exige_chave(cliente, url):
+    assert cliente.get(url).status_code == 401
+    assert cliente.get(url, headers={"X-API-Key": "chave-errada"}).status_code == 401
+    assert cliente.get(url, headers={"X-API-Key": settings.API_SECRET_KEY}).status_code in (200, 503)
+
+
+@pytest.mark.parametrize("url", ENDPOINTS_OPERACAO)
+def test_endpoint_de_operacao_publico_por_configuracao(cliente, monkeypatch, url):
+    monkeypatch.setattr(settings, "ENDPOINTS_OPERACAO_PUBLICOS", True)
+    assert cliente.get(url).status_code in (200, 503)
@@ -0,0 +1,287 @@
+"""
+Exportação de POST /processar/excel-para-csv-processado (app/routers/upload_e_prever.py
+e app/exportacao):
+
+- os exportadores produzem o mesmo arquivo para qualquer tamanho de bloco, e o
+  Parquet aceita blocos cujo dtype de uma coluna difere do primeiro bloco;
+- pré-processar e pontuar o upload bloco a bloco, com o estado ajustado, produz o
+  mesmo arquivo que pontuar a planilha inteira e exportar o resultado (o caminho
+  de um upload já no cache), para qualquer tamanho de bloco, inclusive quando um
+  bloco tem um target inteiramente vazio, datas inválidas ou colunas de texto
+  vazias que o resto da planilha preenche.
+
+Uso (a partir da pasta backend):
+    python -m pytest tests/test_exportacao.py
+"""
+import asyncio
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+from app.core.cache import cache_jogadores
+from app.exportacao import criar_exportador
+from app.preprocessing import DataPreprocessor
+from app.routers.upload_e_prever import _exportar_em_blocos, _pontuar_e_exportar_em_blocos, _pontuar_planilha
+
+pytestmark = [
+    pytest.mark.filterwarnings("ignore:X does not have valid feature names"),
+    pytest.mark.filterwarnings("ignore::pandas.errors.PerformanceWarning"),
+]
+
+LINHAS = 120
+
+# Um bloco menor que o lote, um que não divide o lote e um maior que o lote inteiro
+LINHAS_POR_BLOCO = [7, 64, 10_000]
+
+LEITORES = {
+    "csv": lambda dados: pd.read_csv(io.BytesIO(dados), sep=";", decimal=","),
+    "parquet": lambda dados: pd.read_parquet(io.BytesIO(dados)),
+    "xlsx": lambda dados: pd.read_excel(io.BytesIO(dados)),
+}
+
+
+def _resultado() -> pd.DataFrame:
+    """Resultado no formato exportado, com colunas vazias em parte das linhas."""
+    rng = np.random.default_rng(3)
+    indices = np.arange(LINHAS)
+    return pd.DataFrame({
+        "Código de Acesso": [f"J{i:05d}" for i in indices],
+        "Likert_Score_Medio": rng.normal(size=LINHAS).round(6),
+        "Hora_do_Dia": rng.integers(0, 24, size=LINHAS),
+        "Cor0202": pd.Series([None if i <= 20 else f"cor{i % 4}" for i in indices], dtype=object),
+        "Target1_Original": np.where(indices < 10, indices * 1.5, np.nan),
+        "Target1_Previsto": rng.uniform(0, 100, size=LINHAS).round(4),
+    })
+
+
+def _exportar(df: pd.DataFrame, formato: str, linhas_por_bloco: int) -> bytes:
+    exportador = criar_exportador(formato, df)
+    partes = [exportador.escrever(df.iloc[inicio:inicio + linhas_por_bloco])
+              for inicio in range(0, len(df), linhas_por_bloco)]
+    return b"".join(partes) + b"".join(exportador.finalizar())
+
+
+@pytest.mark.parametrize("formato", list(LEITORES))
+def test_exportacao_igual_para_qualquer_tamanho_de_bloco(formato):
+    df = _resultado()
+    dados_referencia = _exportar(df, formato, LINHAS)
+    referencia = LEITORES[formato](dados_referencia)
+    assert len(referencia) == LINHAS
+
+    for linhas_por_bloco in LINHAS_POR_BLOCO:
+        dados = _exportar(df, formato, linhas_por_bloco)
+        exportado = LEITORES[formato](dados)
+        pd.testing.assert_frame_equal(exportado, referencia, check_exact=True, obj=f"blocos de {linhas_por_bloco}")
+        if formato == "csv":
+            assert dados == dados_referencia
+        if formato == "parquet":
+            assert pq.read_schema(io.BytesIO(dados)).remove_metadata() == \
+                pq.read_schema(io.BytesIO(dados_referencia)).remove_metadata()
+
+
+def test_parquet_aceita_blocos_com_dtypes_diferentes_do_primeiro():
+    """Blocos seguintes com coluna toda nula ou int64 que virou float64 são ajustados ao esquema do primeiro."""
+    exportador = criar_exportador("parquet", pd.DataFrame({"texto": ["a", "b", "c"]}))
+    blocos = [
+        pd.DataFrame({"inteiro": [1, 2], "texto": ["a", "b"], "vazia": pd.Series([None, None], dtype=object)}),
+        pd.DataFrame({"inteiro": [3.0, np.nan], "texto": pd.Series([None, None], dtype=object),
+                      "vazia": pd.Series([None, None], dtype=object)}),
+        pd.DataFrame({"inteiro": [5, 6], "texto": [None, "c"], "vazia": pd.Series([None, None], dtype=object)}),
+    ]
+    dados = b"".join(exportador.escrever(bloco) for bloco in blocos) + b"".join(exportador.finalizar())
+
+    tabela = pq.read_table(io.BytesIO(dados))
+    assert str(tabela.schema.field("inteiro").type) == "int64"
+    assert tabela.column("inteiro").to_pylist() == [1, 2, 3, None, 5, 6]
+    assert tabela.column("texto").to_pylist() == ["a", "b", None, None, None, "c"]
+    assert tabela.column("vazia").null_count == 6
+
+
+def test_parquet_valor_fora_do_esquema_e_erro():
+    exportador = criar_exportador("parquet", pd.DataFrame())
+    exportador.escrever(pd.DataFrame({"inteiro": [1, 2]}))
+    with pytest.raises(pa.ArrowInvalid):
+        exportador.escrever(pd.DataFrame({"inteiro": [1.5, np.nan]}))
+
+
+# ---------------------------------------------------------------------------
+# Pré-processamento e pontuação em blocos
+# ---------------------------------------------------------------------------
+
+CORES = np.array(['FFFFFF', '000000', 'FF0000', '00FF00'])
+
+
+def _jogadores(linhas: int, semente: int, com_targets: bool = False) -> pd.DataFrame:
+    """Planilha sintética com uma coluna de cada grupo do pré-processamento (Likert, Tempo, P, Qtd, texto...)."""
+    rng = np.random.default_rng(semente)
+    
+    def inteiros(minimo, maximo, ausentes=0.0):
+        valores = rng.integers(minimo, maximo + 1, size=linhas).astype('float64' if ausentes else 'int64')
+        if ausentes:
+            sorteio = rng.random(linhas)
+            valores[sorteio < ausentes / 3] = -1
+            valores[(sorteio >= ausentes / 3) & (sorteio < ausentes)] = np.nan
+        return valores
+    
+    def reais(minimo, maximo, ausentes=0.0):
+        valores = np.round(rng.uniform(minimo, maximo, size=linhas), 3)
+        valores[rng.random(linhas) < ausentes] = np.nan
+        return valores
+    
+    segundos = rng.integers(0, 365 * 24 * 3600, size=linhas)
+    df = pd.DataFrame({
+        'Código de Acesso': [f'J{semente}-{i:05d}' for i in range(linhas)],
+        'F0101': inteiros(0, 4),
+        'Cor0202': CORES[rng.integers(0, len(CORES), size=linhas)],
+        'L0210 (não likert)': inteiros(0, 6),
+        'Q0401': inteiros(0, 17),
+        'Q0402': inteiros(0, 7),
+        'T0404': reais(0, 48),
+        'P01': inteiros(1, 4, 0.15),
+        'T01': reais(1, 40, 0.1),
+        'P02': inteiros(1, 4, 0.15),
+        'T02': reais(1, 23, 0.1),
+        'PTempoTotal': reais(0, 243),
+        'QtdComida': inteiros(1, 2),
+        'QtdPessoas': inteiros(0, 2),
+        **{f'F07{i:02d}': inteiros(1, 5) for i in range(5, 10)},
+        'F1101': inteiros(0, 3),
+        'F1102': reais(0.5, 16),
+        'Tempo1106': reais(1.4, 6.5),
+        'TempoTotal11': reais(3.6, 52),
+        'Data/Hora Último': (pd.Timestamp('2025-01-01') + pd.to_timedelta(segundos, unit='s')).strftime('%d/%m/%Y %H:%M:%S'),
+    })
+    for target in ['Target1', 'Target2', 'Target3']:
+        df[target] = reais(20, 80, 0.05) if com_targets else np.nan
+    return df
+
+
+def _sem_targets() -> pd.DataFrame:
+    return _jogadores(LINHAS, semente=5)
+
+
+def _targets_parciais() -> pd.DataFrame:
+    """Planilha em que cada bloco pequeno vê os dados de um jeito diferente do lote inteiro."""
+    df = _jogadores(LINHAS, semente=8, com_targets=True)
+    # Target1 só nas primeiras linhas: os blocos seguintes o têm inteiramente vazio
+    df.loc[10:, "Target1"] = np.nan
+    # Target2 inteiro, com ausentes só no fim: os primeiros blocos o leem como int64
+    df["Target2"] = np.where(np.arange(LINHAS) < 100, np.arange(LINHAS) % 90, np.nan)
+    # Datas inválidas só no meio: os outros blocos não têm NaT na hora/dia da semana
+    df.loc[60:65, "Data/Hora Último"] = "sem data"
+    # Coluna de texto vazia no começo da planilha
+    df.loc[:20, "Cor0202"] = None
+    return df
+
+
+def _target_vazio() -> pd.DataFrame:
+    df = _targets_parciais()
+    df["Target3"] = np.nan
+    return df
+
+
+PLANILHAS = {
+    "sem_targets": _sem_targets,
+    "targets_parciais": _targets_parciais,
+    "target_vazio": _target_vazio,
+}
+
+
+@pytest.fixture(scope="module")
+def estado():
+    return DataPreprocessor().fit(_jogadores(600, semente=1)).estado
+
+
+@pytest.fixture(scope="module")
+def modelos(estado):
+    """
+    Modelos substitutos (um que aceita NaN, um que não) treinados na referência
+    pré-processada, no formato de `registro_modelos`.
+    """
+    referencia = DataPreprocessor(estado=estado).processar(_jogadores(600, semente=1))
+    features = ['F0101', 'Q04_Soma', 'P01', 'T01', 'PTempoTotal', 'QtdComida', 'F07_Media', 'F1102', 'Hora_do_Dia']
+    features = [col for col in features if col in referencia.columns]
+    rng = np.random.default_rng(0)
+    artefatos = {}
+    for key, modelo in [("target1", HistGradientBoostingRegressor(max_iter=30, random_state=0)),
+                        ("target2", RandomForestRegressor(n_estimators=10, max_depth=5, random_state=0)),
+                        ("target3", HistGradientBoostingRegressor(max_iter=30, random_state=1))]:
+        X = referencia[features].astype('float64').fillna(0.0)
+        scaler = StandardScaler().fit(X[features[::2]])
+        y = X.to_numpy() @ rng.normal(size=len(features))
+        artefatos[key] = {"modelo": modelo.fit(X, y), "scaler": scaler, "features": features, "versao": "TESTE"}
+    return {"versao": "teste", "estado": estado, "artefatos": artefatos, "poda": {"necessarias": None}}
+
+
+@pytest.fixture(autouse=True)
+def sem_cache_jogadores(monkeypatch):
+    # Os vetores dos jogadores sintéticos não devem ficar no cache global entre testes
+    monkeypatch.setattr(cache_jogadores, "max_jogadores", 0)
+
+
+async def _juntar(blocos) -> bytes:
+    return b"".join([parte async for parte in blocos])
+
+
+def _planilha_inteira(df_bruto: pd.DataFrame, modelos: dict, formato: str) -> bytes:
+    resultado = asyncio.run(_pontuar_planilha(df_bruto, modelos))
+    exportador = criar_exportador(formato, resultado["df_processado"])
+    return b"".join(_exportar_em_blocos(resultado, exportador, 64))
+
+
+def _em_blocos(df_bruto: pd.DataFrame, modelos: dict, formato: str, linhas_por_bloco: int) -> bytes:
+    exportador = criar_exportador(formato, df_bruto)
+    return asyncio.run(_juntar(
+        _pontuar_e_exportar_em_blocos(df_bruto, modelos, exportador, formato, linhas_por_bloco)
+    ))
+
+
+@pytest.mark.parametrize("planilha", list(PLANILHAS))
+def test_preprocessamento_em_blocos_igual_a_planilha_inteira(estado, planilha):
+    df_bruto = PLANILHAS[planilha]()
+    referencia = DataPreprocessor(estado=estado).processar(df_bruto)
+    decisoes = DataPreprocessor(estado=estado).decidir_planilha(df_bruto)
+    
+    for linhas_por_bloco in LINHAS_POR_BLOCO:
+        blocos = [
+            DataPreprocessor(estado=estado).processar(df_bruto.iloc[inicio:inicio + linhas_por_bloco], decisoes)
+            for inicio in range(0, LINHAS, linhas_por_bloco)
+        ]
+        processado = pd.concat([bloco[referencia.columns] for bloco in blocos])
+        pd.testing.assert_frame_equal(processado, referencia, check_exact=True, obj=f"blocos de {linhas_por_bloco}")
+
+
+@pytest.mark.parametrize("planilha", list(PLANILHAS))
+@pytest.mark.parametrize("formato", list(LEITORES))
+def test_exportacao_em_blocos_igual_a_planilha_inteira(modelos, formato, planilha):
+    df_bruto = PLANILHAS[planilha]()
+    dados_referencia = _planilha_inteira(df_bruto, modelos, formato)
+    referencia = LEITORES[formato](dados_referencia)
+    assert len(referencia) == LINHAS
+    assert {"Target1_Previsto", "Target2_Previsto", "Target3_Previsto"} <= set(referencia.columns)
+    
+    for linhas_por_bloco in LINHAS_POR_BLOCO:
+        dados = _em_blocos(df_bruto, modelos, formato, linhas_por_bloco)
+        exportado = LEITORES[formato](dados)
+        pd.testing.assert_frame_equal(exportado, referencia, check_exact=True, obj=f"blocos de {linhas_por_bloco}")
+        if formato == "csv":
+            assert dados == dados_referencia
+        if formato == "parquet":
+            assert pq.read_schema(io.BytesIO(dados)).remove_metadata() == \
+                pq.read_schema(io.BytesIO(dados_referencia)).remove_metadata()
+
+
+def test_target_parcial_nao_e_descartado(modelos):
+    """Um target vazio só em alguns blocos continua no arquivo, com os valores da planilha."""
+    df_bruto = _targets_parciais()
+    exportado = LEITORES["csv"](_em_blocos(df_bruto, modelos, "csv", 7))
+    
+    assert "Target1_Original" in exportado.columns
+    np.testing.assert_allclose(exportado["Target1_Original"].iloc[:10], df_bruto["Target1"].iloc[:10])
+    np.testing.assert_array_equal(exportado["Target2_Original"].iloc[:100], df_bruto["Target2"].iloc[:100])
@@ -0,0 +1,136 @@
+"""
+Carga do registro de artefatos (app/inference/registro.py) com reports corrompidos:
+o report inválido é tratado como ausente e só afeta os metadados do seu target,
+na carga inicial e na recarga a quente.
+
+Uso (a partir da pasta backend):
+    python -m pytest tests/test_registro.py
+"""
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+from app.inference.registro import TARGET_FOLDERS, RegistroArtefatos
+
+# O aquecimento passa matrizes numpy ao scaler, como o plano de POST /prever
+pytestmark = pytest.mark.filterwarnings("ignore:X does not have valid feature names")
+
+FEATURES = ["F0101", "F0102", "Q0413", "T0404"]
+
+REPORT = {
+    "model": {"name": "RandomForestRegressor", "best_params": {"n_estimators": 5}},
+    "metrics": {
+        "train": {"r2": 0.9, "rmse": 1.0, "mae": 0.5, "mape": 3.0},
+        "test": {"r2": 0.8, "rmse": 1.5, "mae": 0.7, "mape": 4.0},
+    },
+    "overfitting_analysis": {"r2_difference": 0.1, "relative_drop_percentage": 11.1, "status": "ok"},
+    "features": {"final_selected": len(FEATURES), "original_count": 10, "reduction_percentage": 60.0},
+}
+
+
+@pytest.fixture
+def raiz(tmp_path):
+    """Pastas de modelos e resultados com um modelo pequeno e um report válido por target."""
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(200, len(FEATURES))), columns=FEATURES)
+    y = X.sum(axis=1).to_numpy()
+    for pasta in TARGET_FOLDERS.values():
+        pasta_modelo = tmp_path / "models" / pasta
+        pasta_modelo.mkdir(parents=True)
+        joblib.dump(RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y), pasta_modelo / "final_model.pkl")
+        joblib.dump(StandardScaler().fit(X[FEATURES[:2]]), pasta_modelo / "scaler.pkl")
+        joblib.dump(FEATURES, pasta_modelo / "selected_features.pkl")
+
+        pasta_resultados = tmp_path / "results" / pasta
+        pasta_resultados.mkdir(parents=True)
+        (pasta_resultados / "final_report.json").write_text(json.dumps(REPORT), encoding="utf-8")
+    return tmp_path
+
+
+def _registro(raiz) -> RegistroArtefatos:
+    return RegistroArtefatos(
+        raiz / "models", raiz / "results", raiz / "models" / "preprocessador.pkl", raiz / "data" / "referencia.parquet"
+    )
+
+
+def test_report_corrompido_e_tratado_como_ausente(raiz):
+    (raiz / "results" / "target1" / "final_report.json").write_text('{"model": ', encoding="utf-8")
+
+    modelos = _registro(raiz).carregar()
+
+    assert set(modelos["artefatos"]) == {"target1", "target2", "target3"}
+    assert modelos["metadados"]["target1"]["nome_modelo"] == "RandomForestRegressor"
+    assert modelos["metadados"]["target1"]["metricas_teste"]["r2"] is None
+    assert modelos["relatorios"]["target1"] == {}
+    assert modelos["metadados"]["target2"]["metricas_teste"]["r2"] == 0.8
+
+
+def test_report_aprimorado_corrompido_usa_o_report_normal(raiz):
+    (raiz / "results" / "target1" / "final_report_aprimorado.json").write_bytes(b"\xff\xfe nao e json")
+
+    modelos = _registro(raiz).carregar()
+
+    assert modelos["metadados"]["target1"]["metricas_teste"]["r2"] == 0.8
+    assert set(modelos["relatorios"]["target1"]) == {"final_report.json"}
+
+
+def test_recarga_com_report_corrompido_publica_a_nova_versao(raiz):
+    registro = _registro(raiz)
+    anterior = registro.carregar()["versao"]
+
+    (raiz / "results" / "Target2" / "final_report.json").write_text("nao e json", encoding="utf-8")
+    modelos = registro.carregar()
+
+    assert modelos["versao"] != anterior
+    assert set(modelos["artefatos"]) == {"target1", "target2", "target3"}
+    assert modelos["metadados"]["target2"]["metricas_teste"]["r2"] is None
+
+
+def test_relatorio_sem_carregar_os_modelos(raiz):
+    """Antes da primeira carga (ou com um modelo que não carrega), o report vem da pasta de resultados."""
+    for pasta in TARGET_FOLDERS.values():
+        (raiz / "models" / pasta / "final_model.pkl").write_bytes(b"nao e um pickle")
+    registro = _registro(raiz)
+
+    relatorio, versao = registro.relatorio("target1")
+
+    assert relatorio == REPORT and versao is None
+    assert registro.atual is None
+    with pytest.raises(RuntimeError):
+        registro.carregar()
+    assert registro.relatorio("target2") == (REPORT, None)
+
+
+def test_relatorio_da_versao_publicada(raiz):
+    registro = _registro(raiz)
+    versao = registro.carregar()["versao"]
+
+    # O report em disco mudou, mas a versão em uso continua a carregada
+    (raiz / "results" / "target1" / "final_report.json").write_text("{}", encoding="utf-8")
+    assert registro.relatorio("target1") == (REPORT, versao)
+
+
+def test_estado_gerado_na_carga_nao_muda_a_assinatura(raiz):
+    """O preprocessador.pkl ajustado na carga já entra na assinatura: o observador não recarrega por causa dele."""
+    (raiz / "data").mkdir()
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        "Código de Acesso": [f"J{i:03d}" for i in range(50)],
+        "F0101": rng.integers(0, 5, size=50),
+        "P01": rng.integers(1, 5, size=50).astype("float64"),
+        "T01": rng.uniform(1, 40, size=50),
+        "Data/Hora Último": "01/01/2025 10:00:00",
+        "Target1": rng.uniform(20, 80, size=50),
+    }).to_parquet(raiz / "data" / "referencia.parquet")
+    registro = _registro(raiz)
+
+    modelos = registro.carregar()
+
+    assert modelos["estado"] is not None
+    assert (raiz / "models" / "preprocessador.pkl").exists()
+    assert registro.assinatura() == registro._assinatura_carregada